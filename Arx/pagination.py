@@ -0,0 +1,136 @@
+"""
+游标（keyset）分页
+按 (时间, id) 等排序字段记录上一页最后一条的位置，下一页用 WHERE 条件从该位置继续，
+不需要 OFFSET 跳过前面的行，也不需要每页统计总数。游标对客户端是不透明的字符串。
+"""
+import base64
+import json
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """游标格式错误或与排序字段不匹配"""
+
+
+def encode_cursor(values):
+    """把排序字段的值编码为URL安全的游标字符串"""
+    raw = json.dumps([_serialize(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, field_count):
+    """解析游标字符串，返回排序字段的原始值列表"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except (ValueError, UnicodeError):
+        raise InvalidCursor('无效的分页游标')
+    if not isinstance(values, list) or len(values) != field_count:
+        raise InvalidCursor('无效的分页游标')
+    return values
+
+
+def _serialize(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+class CursorPage:
+    """一页数据及下一页的游标"""
+
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def cursor_queryset(queryset, ordering, cursor=None):
+    """
+    返回从游标位置开始、按 ordering 排序的查询集（未切片、未执行）
+
+    Raises:
+        InvalidCursor: 游标无法解析
+    """
+    if cursor:
+        fields = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+        model_fields = [queryset.model._meta.get_field(name) for name, _ in fields]
+        raw_values = decode_cursor(cursor, len(fields))
+        try:
+            values = [field.to_python(value) for field, value in zip(model_fields, raw_values)]
+        except Exception:
+            raise InvalidCursor('无效的分页游标')
+        queryset = queryset.filter(_after(fields, values))
+    return queryset.order_by(*ordering)
+
+
+def cursor_paginate(queryset, ordering, cursor=None, page_size=10):
+    """
+    按游标取一页数据
+
+    Args:
+        queryset: 未排序、未切片的查询集
+        ordering: 排序字段，如 ('-time', '-id')；最后一个字段必须唯一（通常为id）
+        cursor: 上一页返回的 next_cursor，为空时从第一条开始
+        page_size: 每页数量
+
+    Returns:
+        CursorPage
+
+    Raises:
+        InvalidCursor: 游标无法解析
+    """
+    # 多取一条用于判断是否还有下一页
+    items = list(cursor_queryset(queryset, ordering, cursor)[:page_size + 1])
+    return page_from_items(items, ordering, page_size)
+
+
+def page_from_items(items, ordering, page_size):
+    """由多取了一条的结果生成 CursorPage"""
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = cursor_for(items[-1], ordering)
+    return CursorPage(items, next_cursor)
+
+
+def cursor_for(item, ordering):
+    """生成从 item 之后继续的游标（页码分页的响应中也返回，便于客户端切换到游标分页）"""
+    return encode_cursor([getattr(item, name.lstrip('-')) for name in ordering])
+
+
+def _after(fields, values):
+    """构造“排在游标位置之后”的条件：(a, b) 之后 = a之后 或 (a相等且b之后)"""
+    condition = Q()
+    for index, (name, descending) in enumerate(fields):
+        lookup = f'{name}__lt' if descending else f'{name}__gt'
+        clause = Q(**{lookup: values[index]})
+        for prev_index in range(index):
+            clause &= Q(**{fields[prev_index][0]: values[prev_index]})
+        condition |= clause
+    return condition
+
+
+def wants_cursor(request):
+    """请求中带有 cursor 参数（允许为空，表示第一页）时使用游标分页"""
+    return 'cursor' in request.GET
+
+
+def wants_total(request):
+    """游标分页默认不统计总数，include_total=1 时才统计"""
+    return request.GET.get('include_total', '').lower() in ('1', 'true', 'yes')
+
+
+def cursor_pagination_info(page, page_size, total=None):
+    """游标分页模式下的分页信息（total 仅在请求时统计）"""
+    info = {
+        'page_size': page_size,
+        'next_cursor': page.next_cursor,
+        'has_next': page.has_next,
+    }
+    if total is not None:
+        info['total'] = total
+    return info
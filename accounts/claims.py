@@ -0,0 +1,122 @@
+"""
+由JWT载荷构造的当前用户
+generate_token 生成的令牌已经包含 user_id、username、email 和 is_staff，
+登录/管理员装饰器和大多数视图只用到这些字段。中间件把 request.user 设为 ClaimsUser：
+读取这些字段直接返回载荷中的值，读取其他字段（或保存、比较等）时才查询完整的 User。
+
+载荷只在令牌签发后（登录时已查询过用户）JWT_CACHE_TTL 秒内代替数据库，之后按令牌查询用户，
+查询结果在令牌缓存中保留 JWT_CACHE_TTL 秒。因此其他进程（管理命令、其他工作进程）删除用户
+或撤销 is_staff 后，已签发的令牌最多 JWT_CACHE_TTL 秒后按新的用户数据处理。
+
+预期效果：令牌有效期为 TOKEN_LIFETIME（7天），只有登录后的前 JWT_CACHE_TTL 秒（默认60秒）
+使用载荷，此后的请求由令牌缓存的用户快照处理。每个令牌在每个工作进程中每 JWT_CACHE_TTL 秒
+查询一次用户，其余请求不查询数据库；例如客户端每5秒请求一次时，约 1/12 的请求查询用户，
+与只使用令牌缓存时相同。载荷节省的主要是登录后第一批请求（如进入首页时并发的几个接口）的查询。
+
+令牌签发后用户的 username、email 或 is_staff 被修改时，还会在默认缓存中记录修改时间，
+此前签发的令牌不再使用载荷，改为立即查询数据库；默认缓存是进程内缓存时，这条记录只对
+修改发生的进程有效，其他进程依靠上面的有效期。
+"""
+import time
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.utils.functional import SimpleLazyObject, empty
+from .models import TOKEN_LIFETIME, User
+from .token_cache import token_cache
+
+# User 属性 -> 载荷字段
+CLAIM_ATTRS = {
+    'id': 'user_id',
+    'pk': 'user_id',
+    'username': 'username',
+    'email': 'email',
+    'is_staff': 'is_staff',
+}
+
+# 写入载荷的用户字段，修改后此前签发的令牌载荷失效
+CLAIM_FIELDS = frozenset(('username', 'email', 'is_staff'))
+
+CHANGED_KEY_PREFIX = 'accounts:claims_changed'
+
+
+def _changed_key(user_id):
+    return f'{CHANGED_KEY_PREFIX}:{user_id}'
+
+
+def mark_claims_changed(user_id):
+    """记录用户载荷字段的修改时间（保留到此前签发的令牌全部过期）"""
+    cache.set(_changed_key(user_id), time.time(), int(TOKEN_LIFETIME.total_seconds()))
+
+
+def claims_current(payload):
+    """载荷中的用户字段是否仍然有效（签发后用户没有修改过这些字段）"""
+    if any(claim not in payload for claim in CLAIM_ATTRS.values()):
+        return False
+    changed_at = cache.get(_changed_key(payload['user_id']))
+    if changed_at is None:
+        return True
+    issued_at = payload.get('iat')
+    return isinstance(issued_at, (int, float)) and issued_at > changed_at
+
+
+def issued_recently(payload):
+    """令牌签发（登录时已查询过用户）距今不超过 JWT_CACHE_TTL 秒"""
+    issued_at = payload.get('iat')
+    return isinstance(issued_at, (int, float)) and time.time() - issued_at <= token_cache.ttl_seconds()
+
+
+def _use_claims(token, payload):
+    # 已缓存用户快照时使用快照（来自数据库，比载荷新），不再使用载荷
+    return claims_current(payload) and issued_recently(payload) and not token_cache.has_user(token)
+
+
+class ClaimsUser(SimpleLazyObject):
+    """
+    延迟加载的当前用户
+
+    载荷中的字段直接返回；isinstance、按用户过滤查询集（filter(user=request.user)）
+    和真值判断也不会触发查询。其他访问在第一次发生时加载完整的 User。
+    """
+
+    def __init__(self, func, claims=None):
+        self.__dict__['_claims'] = claims or {}
+        super().__init__(func)
+
+    # 包装的对象总是 User，不需要为 isinstance 加载
+    __class__ = property(lambda self: User)
+
+    def __getattr__(self, name):
+        if self._wrapped is empty:
+            if name in self._claims:
+                return self._claims[name]
+            if name == '_meta':
+                return User._meta
+            # 刚加载的 User 实例上只有 _state 和字段值（类上有对应的描述符），
+            # 其他属性不存在，不必为 hasattr 之类的探测加载
+            if name != '_state' and not hasattr(User, name):
+                raise AttributeError(name)
+        return super().__getattr__(name)
+
+    def __bool__(self):
+        return True
+
+
+def load_token_user(token):
+    """按令牌加载完整的用户，用户已不存在时拒绝访问"""
+    user = User.verify_token(token)
+    if user is None:
+        raise PermissionDenied('用户不存在或已被删除')
+    return user
+
+
+def user_from_payload(token, payload):
+    """
+    由已验证的令牌载荷构造 request.user
+
+    令牌刚签发且载荷有效时返回 ClaimsUser，否则按令牌查询用户（命中令牌缓存时不查询数据库，
+    用户不存在时返回None）。
+    """
+    if not _use_claims(token, payload):
+        return User.verify_token(token)
+    claims = {attr: payload[claim] for attr, claim in CLAIM_ATTRS.items()}
+    return ClaimsUser(lambda: load_token_user(token), claims)
@@ -16,18 +16,18 @@ def login_required(view_func):
     def wrapper(request, *args, **kwargs):
         # 详细的用户认证检查
         if not hasattr(request, 'user'):
-            logger.warning(f"Request has no user attribute for path: {request.path}")
+            logger.warning("Request has no user attribute for path: %s", request.path)
             return JsonResponse({'error': '认证信息缺失，请重新登录'}, status=401)
         
         if request.user is None:
-            logger.warning(f"Request user is None for path: {request.path}")
+            logger.warning("Request user is None for path: %s", request.path)
             return JsonResponse({'error': '用户未登录，请先登录'}, status=401)
         
         if not hasattr(request.user, 'id') or request.user.id is None:
-            logger.warning(f"Request user has no valid ID for path: {request.path}")
+            logger.warning("Request user has no valid ID for path: %s", request.path)
             return JsonResponse({'error': '用户信息异常，请重新登录'}, status=401)
         
-        logger.debug(f"User {request.user.username} accessing {request.path}")
+        logger.debug("User %s accessing %s", request.user.username, request.path)
         return view_func(request, *args, **kwargs)
     
     return wrapper
@@ -0,0 +1,135 @@
+"""
+账号密码哈希
+基于 Django 的密码哈希器实现（每个密码使用随机盐，成本参数可配置），算法列表由
+ACCOUNT_PASSWORD_HASHERS 配置：第一个用于新密码，其余只用于验证已有密码。
+用其他算法（包括旧版的 SHA-256 摘要）或旧成本参数保存的密码在登录成功后自动升级。
+
+成本参数：
+- ACCOUNT_PBKDF2_ITERATIONS：PBKDF2 迭代次数
+- ACCOUNT_SCRYPT_WORK_FACTOR：scrypt 的 N 参数（2的幂）
+可用 benchmark_login 命令按登录延迟预算选择。
+"""
+import hashlib
+import re
+from functools import lru_cache
+from django.conf import settings
+from django.contrib.auth import hashers as django_hashers
+from django.utils.crypto import constant_time_compare
+from django.utils.module_loading import import_string
+
+DEFAULT_PASSWORD_HASHERS = [
+    'accounts.hashers.PBKDF2PasswordHasher',
+    'accounts.hashers.ScryptPasswordHasher',
+    'accounts.hashers.LegacySHA256PasswordHasher',
+]
+
+DEFAULT_PBKDF2_ITERATIONS = 600000
+DEFAULT_SCRYPT_WORK_FACTOR = 2 ** 14
+
+# 旧版密码只保存了64位十六进制摘要，没有算法前缀
+LEGACY_HASH_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+class PBKDF2PasswordHasher(django_hashers.PBKDF2PasswordHasher):
+    """PBKDF2-SHA256，迭代次数由 ACCOUNT_PBKDF2_ITERATIONS 配置"""
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'ACCOUNT_PBKDF2_ITERATIONS', DEFAULT_PBKDF2_ITERATIONS)
+
+
+class ScryptPasswordHasher(django_hashers.ScryptPasswordHasher):
+    """scrypt，N 参数由 ACCOUNT_SCRYPT_WORK_FACTOR 配置"""
+
+    # 内存上限（不是实际占用）。默认的0使用OpenSSL的32MB上限，N >= 32768 时会超出
+    maxmem = 256 * 1024 * 1024
+
+    @property
+    def work_factor(self):
+        return getattr(settings, 'ACCOUNT_SCRYPT_WORK_FACTOR', DEFAULT_SCRYPT_WORK_FACTOR)
+
+
+class LegacySHA256PasswordHasher(django_hashers.BasePasswordHasher):
+    """
+    旧版密码：SHA-256(密码 + 全局固定盐)，数据库中只有十六进制摘要
+
+    只用于验证升级前保存的密码，登录成功后会改用首选算法重新保存。
+    """
+    algorithm = 'legacy_sha256'
+    fixed_salt = 'arx_user_salt'
+
+    def salt(self):
+        return self.fixed_salt
+
+    def encode(self, password, salt):
+        return hashlib.sha256((password + salt).encode('utf-8')).hexdigest()
+
+    def decode(self, encoded):
+        return {'algorithm': self.algorithm, 'hash': encoded, 'salt': self.fixed_salt}
+
+    def verify(self, password, encoded):
+        return constant_time_compare(self.encode(password, self.fixed_salt), encoded)
+
+    def safe_summary(self, encoded):
+        return {'algorithm': self.algorithm, 'hash': django_hashers.mask_hash(encoded)}
+
+    def harden_runtime(self, password, encoded):
+        pass
+
+
+@lru_cache
+def _load_hashers(paths):
+    return [import_string(path)() for path in paths]
+
+
+def get_hashers():
+    """按配置顺序返回哈希器实例，第一个为首选算法"""
+    return _load_hashers(tuple(getattr(settings, 'ACCOUNT_PASSWORD_HASHERS', DEFAULT_PASSWORD_HASHERS)))
+
+
+def identify_hasher(encoded):
+    """返回保存该密码使用的哈希器，无法识别时返回None"""
+    if not encoded:
+        return None
+    if LEGACY_HASH_RE.match(encoded):
+        algorithm = LegacySHA256PasswordHasher.algorithm
+    else:
+        algorithm = encoded.split('$', 1)[0]
+    for hasher in get_hashers():
+        if hasher.algorithm == algorithm:
+            return hasher
+    return None
+
+
+def make_password(password, hasher=None):
+    """用首选算法（或指定的哈希器）和随机盐生成密码哈希"""
+    hasher = hasher or get_hashers()[0]
+    return hasher.encode(password, hasher.salt())
+
+
+def check_password(password, encoded, setter=None):
+    """
+    验证密码
+
+    Args:
+        setter: 密码正确但需要升级（算法或成本参数不是首选）时调用 setter(password)
+
+    Returns:
+        bool: 密码是否正确
+    """
+    if password is None:
+        return False
+    hasher = identify_hasher(encoded)
+    if hasher is None:
+        return False
+
+    preferred = get_hashers()[0]
+    is_correct = hasher.verify(password, encoded)
+    hasher_changed = hasher.algorithm != preferred.algorithm
+    must_update = hasher_changed or preferred.must_update(encoded)
+    if not is_correct and not hasher_changed and must_update:
+        # 成本参数较低的旧哈希补足计算量，避免通过响应时间推断密码的保存方式
+        hasher.harden_runtime(password, encoded)
+    if is_correct and must_update and setter is not None:
+        setter(password)
+    return is_correct
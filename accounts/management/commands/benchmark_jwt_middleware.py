@@ -0,0 +1,89 @@
+"""
+JWT认证中间件开销测试的Django管理命令
+分别测量无令牌、视图只用载荷字段、视图访问完整用户（关闭/开启验证缓存）几种情况下
+中间件加视图读取用户字段的单请求耗时和数据库查询次数
+"""
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from accounts.middleware import JWTAuthMiddleware
+from accounts.models import User
+from accounts.token_cache import token_cache
+
+
+class Command(BaseCommand):
+    help = '测试JWT认证中间件的单请求开销'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=2000,
+            help='每种情况下处理的请求数',
+        )
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            default=None,
+            help='用于生成令牌的用户ID（默认取第一个用户）',
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(id=options['user_id']) if options['user_id'] else User.objects.order_by('id')
+        user = user.first()
+        if user is None:
+            raise CommandError('数据库中没有可用的用户，请先注册一个用户或指定 --user-id')
+
+        token = user.generate_token()
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+        factory = RequestFactory()
+        total = options['requests']
+
+        def claims_view(request):
+            # 登录装饰器和大多数视图只用到载荷中的字段
+            if request.user is not None:
+                request.user.id, request.user.username, request.user.is_staff
+            return HttpResponse('ok')
+
+        def full_user_view(request):
+            request.user.created_at
+            return HttpResponse('ok')
+
+        # (名称, 请求头, 视图, 验证缓存TTL)
+        cases = [
+            ('无令牌', {}, claims_view, None),
+            ('只用载荷字段', headers, claims_view, None),
+            ('完整用户（关闭缓存）', headers, full_user_view, 0),
+            ('完整用户（开启缓存）', headers, full_user_view, None),
+        ]
+
+        self.stdout.write(f"{'情况':<20} {'耗时/请求':>12} {'查询/请求':>10}")
+        original_ttl = token_cache.ttl
+        try:
+            for name, case_headers, view, ttl in cases:
+                middleware = JWTAuthMiddleware(view)
+                token_cache.clear()
+                token_cache.ttl = ttl
+                requests = [factory.get('/forum/posts/', **case_headers) for _ in range(total)]
+
+                # 先单独统计查询次数，避免查询记录影响计时
+                with CaptureQueriesContext(connection) as queries:
+                    for request in requests[:100]:
+                        middleware(request)
+                queries_per_request = len(queries) / min(total, 100)
+
+                token_cache.clear()
+                start = time.perf_counter()
+                for request in requests:
+                    middleware(request)
+                elapsed = time.perf_counter() - start
+
+                self.stdout.write(
+                    f'{name:<20} {elapsed / total * 1e6:>10.1f}µs {queries_per_request:>10.2f}'
+                )
+        finally:
+            token_cache.ttl = original_ttl
+            token_cache.clear()
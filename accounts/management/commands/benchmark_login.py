@@ -0,0 +1,113 @@
+"""
+登录密码验证性能测试的Django管理命令
+按不同的哈希算法和成本参数，用多个线程同时验证密码（模拟早高峰集中登录），
+统计每秒可完成的登录数和单次验证的 p50/p99 延迟，并给出满足延迟预算的最高成本
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from accounts.hashers import PBKDF2PasswordHasher, ScryptPasswordHasher, check_password, make_password
+
+# 算法 -> (哈希器, 成本参数对应的配置项)
+ALGORITHMS = {
+    'pbkdf2': (PBKDF2PasswordHasher, 'ACCOUNT_PBKDF2_ITERATIONS'),
+    'scrypt': (ScryptPasswordHasher, 'ACCOUNT_SCRYPT_WORK_FACTOR'),
+}
+
+
+def _percentile(sorted_values, percent):
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * percent / 100))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = '测试不同密码哈希成本下的登录吞吐量和延迟'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pbkdf2-costs',
+            type=str,
+            default='100000,260000,600000,870000',
+            help='要测试的PBKDF2迭代次数，逗号分隔（为空则跳过）',
+        )
+        parser.add_argument(
+            '--scrypt-costs',
+            type=str,
+            default='8192,16384,32768',
+            help='要测试的scrypt N参数，逗号分隔（为空则跳过）',
+        )
+        parser.add_argument(
+            '--logins',
+            type=int,
+            default=200,
+            help='每种成本下验证密码的次数',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=8,
+            help='同时进行的登录数（线程数）',
+        )
+        parser.add_argument(
+            '--budget-ms',
+            type=float,
+            default=250.0,
+            help='p99 登录延迟预算（毫秒）',
+        )
+
+    def handle(self, *args, **options):
+        cases = []
+        for algorithm, option in (('pbkdf2', 'pbkdf2_costs'), ('scrypt', 'scrypt_costs')):
+            try:
+                costs = [int(cost) for cost in options[option].split(',') if cost.strip()]
+            except ValueError:
+                raise CommandError(f"成本参数必须是整数: {options[option]}")
+            cases.extend((algorithm, cost) for cost in costs)
+        if not cases:
+            raise CommandError('没有要测试的成本参数')
+
+        budget = options['budget_ms'] / 1000
+        self.stdout.write(
+            f"每种成本验证 {options['logins']} 次，并发 {options['concurrency']}，"
+            f"p99 预算 {options['budget_ms']:.0f}ms"
+        )
+        self.stdout.write(f"{'算法':<8} {'成本':>8} {'登录/秒':>10} {'p50':>10} {'p99':>10}  满足预算")
+
+        best = {}
+        for algorithm, cost in cases:
+            rate, p50, p99 = self._measure(algorithm, cost, options['logins'], options['concurrency'])
+            within = p99 <= budget
+            if within:
+                best[algorithm] = cost
+            self.stdout.write(
+                f"{algorithm:<8} {cost:>8} {rate:>10.1f} {p50 * 1000:>8.1f}ms {p99 * 1000:>8.1f}ms  "
+                f"{'是' if within else '否'}"
+            )
+
+        for algorithm, (_, setting) in ALGORITHMS.items():
+            if algorithm in best:
+                self.stdout.write(f'{algorithm} 满足预算的最高成本: {setting} = {best[algorithm]}')
+
+    def _measure(self, algorithm, cost, logins, concurrency):
+        hasher_class, setting = ALGORITHMS[algorithm]
+        password = 'benchmark-password-123'
+
+        with override_settings(**{setting: cost}):
+            hasher = hasher_class()
+            encoded = make_password(password, hasher)
+            # 先验证一次，确保成本参数有效
+            if not hasher.verify(password, encoded):
+                raise CommandError(f'{algorithm} 哈希验证失败')
+
+            def login(_):
+                start = time.perf_counter()
+                check_password(password, encoded)
+                return time.perf_counter() - start
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                latencies = sorted(executor.map(login, range(logins)))
+            elapsed = time.perf_counter() - start
+
+        return logins / elapsed, _percentile(latencies, 50), _percentile(latencies, 99)
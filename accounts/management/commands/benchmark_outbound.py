@@ -0,0 +1,328 @@
+"""
+外发I/O（验证码邮件和Turnstile验证）性能测试的Django管理命令
+在本地启动一个模拟SMTP服务器和一个模拟Turnstile验证接口（不访问外网），
+用多个线程模拟并发请求，对比：
+- 邮件：请求线程中直接 send_mail（每封邮件新建连接） 与 提交到外发任务队列
+- Turnstile：每次 requests.post（无连接复用） 与 共用连接池的验证器
+并检查任务状态、验证结果和服务器收到的连接数
+"""
+import json
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from django.core.mail import send_mail
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from accounts.outbound import FAILED, SENT, OutboundJobQueue
+from accounts.turnstile import TurnstileVerifier
+
+FROM_EMAIL = 'noreply@example.com'
+# 模拟验证接口对该令牌返回验证失败
+INVALID_TOKEN = 'invalid-token'
+
+
+def _percentile(sorted_values, percent):
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * percent / 100))
+    return sorted_values[index]
+
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    """
+    只实现发信所需命令的模拟SMTP服务器（不加密、不认证）
+
+    每封邮件在 DATA 结束后等待 delay 秒再应答，模拟远程服务器的处理时间；
+    drop_every 大于0时每个连接收满 drop_every 封邮件后直接断开，模拟服务器关闭连接。
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, delay=0.0, drop_every=0):
+        super().__init__(('127.0.0.1', 0), FakeSMTPHandler)
+        self.delay = delay
+        self.drop_every = drop_every
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = 0
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+class FakeSMTPHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        received = 0
+        self._reply('220 fake-smtp ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].decode('ascii', 'replace').upper()
+            if command == 'EHLO':
+                self._reply('250-fake-smtp', '250 8BITMIME')
+            elif command == 'DATA':
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                time.sleep(server.delay)
+                with server.lock:
+                    server.messages += 1
+                self._reply('250 OK')
+                received += 1
+                if server.drop_every and received >= server.drop_every:
+                    return
+            elif command == 'QUIT':
+                self._reply('221 Bye')
+                return
+            else:
+                # HELO、MAIL、RCPT、RSET、NOOP
+                self._reply('250 OK')
+
+    def _reply(self, *lines):
+        self.wfile.write(''.join(f'{line}\r\n' for line in lines).encode('ascii'))
+
+
+class StubTurnstileServer(ThreadingHTTPServer):
+    """
+    模拟Turnstile验证接口：令牌为 INVALID_TOKEN 时验证失败，其余通过
+
+    每个请求等待 delay 秒再应答；fail_first 大于0时前 fail_first 个请求返回503，模拟接口暂时不可用。
+    """
+    daemon_threads = True
+
+    def __init__(self, delay=0.0, fail_first=0):
+        super().__init__(('127.0.0.1', 0), StubTurnstileHandler)
+        self.delay = delay
+        self.fail_first = fail_first
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+
+    def handle_error(self, request, client_address):
+        # 客户端超时后断开连接，应答写入失败属于预期情况
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/siteverify'
+
+
+class StubTurnstileHandler(BaseHTTPRequestHandler):
+    # 支持 keep-alive，客户端才能复用连接
+    protocol_version = 'HTTP/1.1'
+    # 响应头和响应体分两次写出，开启Nagle算法时会与客户端的延迟确认叠加出约40ms的等待
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        form = self.rfile.read(length).decode('utf-8')
+        with self.server.lock:
+            self.server.requests += 1
+            unavailable = self.server.requests <= self.server.fail_first
+        time.sleep(self.server.delay)
+        if unavailable:
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        success = f'response={INVALID_TOKEN}' not in form
+        body = json.dumps({
+            'success': success,
+            'error-codes': [] if success else ['invalid-input-response'],
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = '用本地模拟SMTP服务器和Turnstile接口测试外发I/O的请求延迟和连接复用'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--emails',
+            type=int,
+            default=200,
+            help='发送的验证码邮件数',
+        )
+        parser.add_argument(
+            '--verifications',
+            type=int,
+            default=200,
+            help='Turnstile验证次数',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=8,
+            help='同时处理的请求数（线程数）',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='外发任务队列的工作线程数',
+        )
+        parser.add_argument(
+            '--smtp-delay',
+            type=float,
+            default=0.05,
+            help='模拟SMTP服务器处理每封邮件的时间（秒）',
+        )
+        parser.add_argument(
+            '--verify-delay',
+            type=float,
+            default=0.02,
+            help='模拟Turnstile接口的响应时间（秒）',
+        )
+        parser.add_argument(
+            '--smtp-drop-every',
+            type=int,
+            default=0,
+            help='模拟SMTP服务器每个连接收满N封邮件后断开（测试重连和重试，0为不断开）',
+        )
+
+    def handle(self, *args, **options):
+        if min(options['emails'], options['verifications'], options['concurrency'], options['workers']) < 1:
+            raise CommandError('数量参数必须大于0')
+
+        smtp_server = FakeSMTPServer(options['smtp_delay'], options['smtp_drop_every'])
+        turnstile_server = StubTurnstileServer(options['verify_delay'])
+        for server in (smtp_server, turnstile_server):
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        try:
+            with override_settings(
+                EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+                EMAIL_HOST='127.0.0.1',
+                EMAIL_PORT=smtp_server.port,
+                EMAIL_USE_SSL=False,
+                EMAIL_USE_TLS=False,
+                EMAIL_HOST_USER='',
+                EMAIL_HOST_PASSWORD='',
+                EMAIL_TIMEOUT=10,
+                OUTBOUND_RETRY_BACKOFF=0.05,
+                TURNSTILE_VERIFY_URL=turnstile_server.url,
+                TURNSTILE_SECRET_KEY='benchmark-secret',
+                TURNSTILE_POOL_SIZE=options['concurrency'],
+            ):
+                self._benchmark_email(smtp_server, options)
+                self._benchmark_turnstile(turnstile_server, options)
+        finally:
+            for server in (smtp_server, turnstile_server):
+                server.shutdown()
+                server.server_close()
+
+    def _benchmark_email(self, server, options):
+        count, concurrency = options['emails'], options['concurrency']
+        self.stdout.write(
+            f"邮件：{count} 封，并发请求 {concurrency}，"
+            f"模拟服务器处理时间 {options['smtp_delay'] * 1000:.0f}ms"
+        )
+        self.stdout.write(f"{'方式':<10} {'请求/秒':>10} {'p50':>10} {'p99':>10} {'总耗时':>10} {'SMTP连接':>10}")
+
+        # 请求线程中直接发送
+        def send_directly(index):
+            send_mail('验证码', f'{index:06d}', FROM_EMAIL, [f'user{index}@example.com'])
+
+        self._reset(server)
+        rate, p50, p99, elapsed = self._run(send_directly, count, concurrency)
+        self._write_row('同步发送', rate, p50, p99, elapsed, server.connections)
+
+        # 提交到外发任务队列，请求只等待入队
+        outbound = OutboundJobQueue(workers=options['workers'], max_pending=count)
+        job_ids = []
+
+        def enqueue(index):
+            job_ids.append(outbound.send_email('验证码', f'{index:06d}', [f'user{index}@example.com'], FROM_EMAIL))
+
+        self._reset(server)
+        start = time.perf_counter()
+        rate, p50, p99, _ = self._run(enqueue, count, concurrency)
+        outbound.shutdown()
+        elapsed = time.perf_counter() - start
+        self._write_row('任务队列', rate, p50, p99, elapsed, server.connections)
+
+        statuses = [outbound.job_status(job_id)['status'] for job_id in job_ids]
+        stats = outbound.stats()
+        self.stdout.write(
+            f"任务状态：sent {statuses.count(SENT)}，failed {statuses.count(FAILED)}；"
+            f"重试 {stats['retries']} 次，服务器收到 {server.messages} 封"
+        )
+        if statuses.count(SENT) != count:
+            raise CommandError('有邮件任务未发送成功')
+
+    def _benchmark_turnstile(self, server, options):
+        count, concurrency = options['verifications'], options['concurrency']
+        self.stdout.write('')
+        self.stdout.write(
+            f"Turnstile：{count} 次验证，并发请求 {concurrency}，"
+            f"模拟接口响应时间 {options['verify_delay'] * 1000:.0f}ms"
+        )
+        self.stdout.write(f"{'方式':<10} {'请求/秒':>10} {'p50':>10} {'p99':>10} {'总耗时':>10} {'HTTP连接':>10}")
+
+        from django.conf import settings
+
+        # 原实现：每次新建连接，没有超时
+        def post_directly(_):
+            data = {'secret': settings.TURNSTILE_SECRET_KEY, 'response': 'token'}
+            return requests.post(settings.TURNSTILE_VERIFY_URL, data=data).json()['success']
+
+        self._reset(server)
+        rate, p50, p99, elapsed = self._run(post_directly, count, concurrency)
+        self._write_row('每次新建', rate, p50, p99, elapsed, server.connections)
+
+        verifier = TurnstileVerifier()
+        self._reset(server)
+        rate, p50, p99, elapsed = self._run(lambda _: verifier.verify('token', '127.0.0.1'), count, concurrency)
+        self._write_row('连接池', rate, p50, p99, elapsed, server.connections)
+
+        if not verifier.verify('token') or verifier.verify(INVALID_TOKEN):
+            raise CommandError('验证器返回的结果与模拟接口不一致')
+        verifier.close()
+
+    @staticmethod
+    def _reset(server):
+        with server.lock:
+            server.connections = 0
+            if hasattr(server, 'messages'):
+                server.messages = 0
+
+    @staticmethod
+    def _run(func, count, concurrency):
+        """用 concurrency 个线程执行 count 次 func，返回 (每秒次数, p50, p99, 总耗时)"""
+        def timed(index):
+            start = time.perf_counter()
+            func(index)
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = sorted(executor.map(timed, range(count)))
+        elapsed = time.perf_counter() - start
+        return count / elapsed, _percentile(latencies, 50), _percentile(latencies, 99), elapsed
+
+    def _write_row(self, name, rate, p50, p99, elapsed, connections):
+        self.stdout.write(
+            f"{name:<10} {rate:>10.1f} {p50 * 1000:>8.1f}ms {p99 * 1000:>8.1f}ms "
+            f"{elapsed:>9.2f}s {connections:>10}"
+        )
@@ -1,3 +1,4 @@
+from .claims import user_from_payload
 from .models import User
 import logging
 
@@ -8,6 +9,9 @@ class JWTAuthMiddleware:
     """
     JWT认证中间件
     从请求头中获取JWT令牌，验证并解析用户信息
+
+    令牌有效时 request.user 为由载荷构造的 ClaimsUser，只有视图用到载荷以外的
+    用户字段时才查询数据库。
     """
     
     def __init__(self, get_response):
@@ -16,10 +20,10 @@ class JWTAuthMiddleware:
     def __call__(self, request):
         # 跳过Django admin路径的认证中间件
         if request.path.startswith('/admin/'):
-            logger.debug(f"Skipping JWT auth for Django admin path: {request.path}")
+            logger.debug("Skipping JWT auth for Django admin path: %s", request.path)
             return self.get_response(request)
             
-        logger.debug(f"JWT middleware processing: {request.path}")
+        logger.debug("JWT middleware processing: %s", request.path)
             
         # 从请求头中获取JWT令牌
         auth_header = request.headers.get('Authorization')
@@ -51,26 +55,27 @@ class JWTAuthMiddleware:
             
         if token:
             try:
-                # 验证令牌
-                user = User.verify_token(token)
+                # 验证令牌（只验证签名和有效期，不查询数据库）
+                payload = User.decode_token(token)
+                user = user_from_payload(token, payload) if payload else None
                 
                 if user:
                     # 将用户信息添加到请求对象
                     request.user = user
                     request.auth = token
-                    logger.debug(f"User authenticated: {user.username} via {token_source}")
+                    logger.debug("User authenticated: %s via %s", user.username, token_source)
                 else:
-                    logger.warning(f"Token verification failed for token from {token_source}")
+                    logger.warning("Token verification failed for token from %s", token_source)
                     # 确保user为None
                     request.user = None
                     request.auth = None
             except Exception as e:
-                logger.error(f"Token verification error: {str(e)} (token from {token_source})")
+                logger.error("Token verification error: %s (token from %s)", e, token_source)
                 # 确保在异常情况下user为None
                 request.user = None
                 request.auth = None
         else:
-            logger.debug(f"No token found for path: {request.path}")
+            logger.debug("No token found for path: %s", request.path)
             # 确保在没有token的情况下user为None
             request.user = None
             request.auth = None
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_remove_focussettings_user_delete_focussession_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='verificationcode',
+            index=models.Index(condition=models.Q(('is_used', False)), fields=['email', '-created_at'], name='verify_code_email_idx'),
+        ),
+    ]
@@ -1,18 +1,24 @@
 from django.db import models
-import hashlib
 import re
 import jwt
 import datetime
+import time
 from django.conf import settings
 import uuid
 import random
 import string
 from django.utils import timezone
+from .hashers import check_password, make_password
+from .token_cache import token_cache
+
+# JWT令牌有效期
+TOKEN_LIFETIME = datetime.timedelta(days=7)
 
 # Create your models here.
 class User(models.Model):
     username = models.CharField(max_length=50, unique=True, verbose_name="用户名")
-    password = models.CharField(max_length=128, verbose_name="密码")
+    # scrypt 哈希在 N=2**14 时已有128个字符，N 更大时更长
+    password = models.CharField(max_length=256, verbose_name="密码")
     email = models.EmailField(unique=True, verbose_name="邮箱")
     phone = models.CharField(max_length=15, unique=True, null=True, blank=True, verbose_name="手机号码")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
@@ -36,15 +42,13 @@ class User(models.Model):
     
     @staticmethod
     def encrypt_password(password):
-        """对密码进行加密"""
-        salt = "arx_user_salt"
-        hash_obj = hashlib.sha256((password + salt).encode('utf-8'))
-        return hash_obj.hexdigest()
+        """对密码进行加密（首选哈希算法，每个密码使用随机盐）"""
+        return make_password(password)
     
     def generate_token(self):
         """生成JWT令牌"""
         # 设置过期时间为7天
-        expiry = datetime.datetime.now() + datetime.timedelta(days=7)
+        expiry = datetime.datetime.now() + TOKEN_LIFETIME
         
         # 创建载荷
         payload = {
@@ -52,6 +56,7 @@ class User(models.Model):
             'username': self.username,
             'email': self.email,
             'is_staff': self.is_staff,
+            'iat': int(time.time()),
             'exp': expiry
         }
         
@@ -65,30 +70,58 @@ class User(models.Model):
         return token
     
     @classmethod
-    def verify_token(cls, token):
-        """验证JWT令牌"""
+    def decode_token(cls, token):
+        """
+        验证JWT令牌的签名和有效期并返回载荷（不查询数据库）
+        
+        Returns:
+            dict: 令牌载荷，令牌无效或已过期时返回None
+        """
+        cached = token_cache.get(token)
+        if cached is not None:
+            return cached[0]
+        payload = cls._decode_jwt(token)
+        if payload is not None:
+            token_cache.set(token, payload)
+        return payload
+    
+    @staticmethod
+    def _decode_jwt(token):
         try:
-            # 解码令牌
-            payload = jwt.decode(
+            return jwt.decode(
                 token,
                 settings.SECRET_KEY,
                 algorithms=['HS256']
             )
-            
-            # 获取用户ID
-            user_id = payload.get('user_id')
-            
-            # 查询用户
-            user = cls.objects.get(id=user_id)
-            
-            return user
         except jwt.ExpiredSignatureError:
             # 令牌已过期
             return None
-        except (jwt.InvalidTokenError, cls.DoesNotExist):
-            # 令牌无效或用户不存在
+        except jwt.InvalidTokenError:
+            # 令牌无效
             return None
     
+    @classmethod
+    def verify_token(cls, token):
+        """验证JWT令牌（验证结果按令牌缓存，命中时不解码、不查询数据库）"""
+        cached = token_cache.get(token)
+        if cached is not None and cached[1] is not None:
+            payload, field_names, values = cached
+            return cls.from_db(cls.objects.db, field_names, values)
+        
+        payload = cached[0] if cached is not None else cls._decode_jwt(token)
+        if payload is None:
+            return None
+        
+        try:
+            # 查询用户
+            user = cls.objects.get(id=payload.get('user_id'))
+        except cls.DoesNotExist:
+            # 用户不存在
+            return None
+        
+        token_cache.set(token, payload, user)
+        return user
+    
     @classmethod
     def authenticate(cls, username=None, password=None):
         """验证用户登录"""
@@ -99,12 +132,17 @@ class User(models.Model):
             else:
                 user = cls.objects.get(username=username)
             
-            # 验证密码
-            encrypted_password = cls.encrypt_password(password)
-            if user.password == encrypted_password:
+            # 验证密码；使用旧算法或旧成本参数保存的密码验证通过后重新保存
+            def upgrade_password(raw_password):
+                user.password = raw_password
+                user.save(update_fields=['password'])
+            
+            if check_password(password, user.password, setter=upgrade_password):
                 return user
             return None
         except cls.DoesNotExist:
+            # 用户不存在时同样计算一次哈希，避免通过响应时间判断用户是否存在
+            make_password(password)
             return None
     
     @classmethod
@@ -153,6 +191,14 @@ class VerificationCode(models.Model):
         verbose_name = "验证码"
         verbose_name_plural = verbose_name
         ordering = ['-created_at']
+        indexes = [
+            # 查找邮箱最新的未使用验证码（部分索引，只包含未使用的验证码）
+            models.Index(
+                fields=['email', '-created_at'],
+                condition=models.Q(is_used=False),
+                name='verify_code_email_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.email}的验证码"
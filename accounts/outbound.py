@@ -0,0 +1,215 @@
+"""
+外发I/O任务队列
+发送邮件等耗时的外部调用放入后台线程池执行，视图立即返回任务ID，
+任务状态保存在缓存中，可通过状态接口查询。
+
+- 每个工作线程复用一个SMTP连接，空闲超过 OUTBOUND_SMTP_IDLE_TIMEOUT 秒或连接断开时重新建立
+- 发送失败按 OUTBOUND_EMAIL_MAX_ATTEMPTS 重试，两次尝试之间按 OUTBOUND_RETRY_BACKOFF 递增等待
+"""
+import atexit
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+
+logger = logging.getLogger(__name__)
+
+# 任务状态
+QUEUED = 'queued'
+RUNNING = 'running'
+SENT = 'sent'
+FAILED = 'failed'
+
+
+class OutboundJobQueue:
+    """外发任务队列（线程池 + 缓存中的任务状态）"""
+
+    def __init__(self, workers=None, max_pending=None, enabled=None):
+        self.workers = workers or getattr(settings, 'OUTBOUND_WORKERS', 4)
+        self.max_pending = max_pending or getattr(settings, 'OUTBOUND_QUEUE_SIZE', 1000)
+        # 关闭异步执行时在当前线程中直接发送（便于调试）
+        self.enabled = enabled if enabled is not None else getattr(settings, 'OUTBOUND_ASYNC', True)
+        self.job_ttl = getattr(settings, 'OUTBOUND_JOB_TTL', 3600)
+        self.max_attempts = getattr(settings, 'OUTBOUND_EMAIL_MAX_ATTEMPTS', 3)
+        self.retry_backoff = getattr(settings, 'OUTBOUND_RETRY_BACKOFF', 1.0)
+        self.smtp_idle_timeout = getattr(settings, 'OUTBOUND_SMTP_IDLE_TIMEOUT', 60)
+
+        self._executor = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # 所有工作线程打开的SMTP连接，关闭队列时统一断开
+        self._connections = []
+        self._shutdown = False
+
+        # 统计计数器
+        self._pending = 0
+        self._submitted = 0
+        self._sent = 0
+        self._failed = 0
+        self._rejected = 0
+        self._retries = 0
+        self._smtp_connects = 0
+
+    def send_email(self, subject, message, recipient_list, from_email=None):
+        """
+        提交一封邮件，立即返回任务ID
+
+        Raises:
+            OverflowError: 等待发送的任务已达上限
+        """
+        email = EmailMessage(subject, message, from_email, recipient_list)
+        job_id = uuid.uuid4().hex
+        self._set_status(job_id, QUEUED)
+
+        if not self.enabled or self._shutdown:
+            with self._lock:
+                self._submitted += 1
+                self._pending += 1
+            self._run(job_id, email)
+            return job_id
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                cache.delete(self._status_key(job_id))
+                raise OverflowError('外发任务队列已满')
+            self._submitted += 1
+            self._pending += 1
+        try:
+            self._get_executor().submit(self._run, job_id, email)
+        except RuntimeError:
+            # 线程池已在关闭（进程退出中），在当前线程中发送
+            self._run(job_id, email)
+        return job_id
+
+    def job_status(self, job_id):
+        """返回任务状态字典，任务不存在或已过期时返回None"""
+        return cache.get(self._status_key(job_id))
+
+    def shutdown(self, wait=True):
+        """停止接收新任务，等待已提交的任务完成并断开SMTP连接"""
+        with self._lock:
+            self._shutdown = True
+            executor = self._executor
+        if executor is not None:
+            executor.shutdown(wait=wait)
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            self._close_connection(connection)
+
+    def stats(self):
+        """返回队列深度和发送统计"""
+        with self._lock:
+            return {
+                'pending': self._pending,
+                'submitted': self._submitted,
+                'sent': self._sent,
+                'failed': self._failed,
+                'rejected': self._rejected,
+                'retries': self._retries,
+                'smtp_connects': self._smtp_connects,
+            }
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers,
+                        thread_name_prefix='outbound'
+                    )
+                    # 进程退出时把已提交的邮件发完
+                    atexit.register(self.shutdown)
+        return self._executor
+
+    def _run(self, job_id, email):
+        try:
+            for attempt in range(1, self.max_attempts + 1):
+                self._set_status(job_id, RUNNING, attempts=attempt)
+                try:
+                    self._send(email)
+                except Exception as e:
+                    # 连接可能已失效，下次尝试重新建立
+                    self._drop_connection()
+                    if attempt < self.max_attempts:
+                        with self._lock:
+                            self._retries += 1
+                        logger.warning("发送邮件失败（第%s次），准备重试: %s", attempt, e)
+                        time.sleep(self.retry_backoff * attempt)
+                        continue
+                    with self._lock:
+                        self._failed += 1
+                    logger.error("发送邮件失败，已放弃: %s", e)
+                    self._set_status(job_id, FAILED, attempts=attempt, error=str(e))
+                    return
+                with self._lock:
+                    self._sent += 1
+                self._set_status(job_id, SENT, attempts=attempt)
+                return
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _send(self, email):
+        email.connection = self._get_connection()
+        if not email.send():
+            raise RuntimeError('邮件未被服务器接收')
+        self._local.last_used = time.monotonic()
+
+    def _get_connection(self):
+        """返回当前工作线程的SMTP连接，必要时重新建立"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            idle = time.monotonic() - self._local.last_used
+            if idle <= self.smtp_idle_timeout:
+                return connection
+            # 服务器通常会断开长时间空闲的连接
+            self._drop_connection()
+
+        connection = get_connection(fail_silently=False)
+        connection.open()
+        self._local.connection = connection
+        self._local.last_used = time.monotonic()
+        with self._lock:
+            self._connections.append(connection)
+            self._smtp_connects += 1
+        return connection
+
+    def _drop_connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            return
+        self._local.connection = None
+        with self._lock:
+            if connection in self._connections:
+                self._connections.remove(connection)
+        self._close_connection(connection)
+
+    @staticmethod
+    def _close_connection(connection):
+        try:
+            connection.close()
+        except Exception as e:
+            logger.debug("关闭SMTP连接失败: %s", e)
+
+    def _set_status(self, job_id, status, attempts=0, error=None):
+        cache.set(self._status_key(job_id), {
+            'job_id': job_id,
+            'status': status,
+            'attempts': attempts,
+            'error': error,
+            'updated_at': time.time(),
+        }, self.job_ttl)
+
+    @staticmethod
+    def _status_key(job_id):
+        return f'accounts:outbound_job:{job_id}'
+
+
+# 全局外发任务队列
+outbound_queue = OutboundJobQueue()
@@ -0,0 +1,23 @@
+"""
+账号模型信号处理
+用户保存或删除时清除该用户的JWT验证缓存，并使此前签发的令牌载荷失效
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .claims import CLAIM_FIELDS, mark_claims_changed
+from .models import User
+from .token_cache import token_cache
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    token_cache.invalidate_user(instance.pk)
+    # 新用户还没有令牌；只修改了载荷以外的字段时令牌载荷仍然有效
+    if not created and (update_fields is None or CLAIM_FIELDS & set(update_fields)):
+        mark_claims_changed(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    token_cache.invalidate_user(instance.pk)
+    mark_claims_changed(instance.pk)
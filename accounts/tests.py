@@ -1,3 +1,366 @@
-from django.test import TestCase
+import threading
+import time
+from unittest import mock
+import jwt
+from django.conf import settings
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from .claims import ClaimsUser, user_from_payload
+from .hashers import make_password
+from .management.commands.benchmark_outbound import FROM_EMAIL, INVALID_TOKEN, FakeSMTPServer, StubTurnstileServer
+from .models import TOKEN_LIFETIME, User
+from .outbound import QUEUED, SENT, OutboundJobQueue
+from .token_cache import TokenCache, token_cache
+from .turnstile import TurnstileVerifier
 
-# Create your tests here.
+
+def issue_token(user, age):
+    """签发 age 秒前的令牌（字段与 generate_token 相同）"""
+    issued_at = int(time.time()) - age
+    payload = {
+        'user_id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'is_staff': user.is_staff,
+        'iat': issued_at,
+        'exp': issued_at + int(TOKEN_LIFETIME.total_seconds()),
+    }
+    return jwt.encode(payload, settings.SECRET_KEY, algorithm='HS256')
+
+
+@override_settings(JWT_CACHE_TTL=60)
+class ClaimsTrustWindowTests(TestCase):
+    """载荷只在令牌签发后 JWT_CACHE_TTL 秒内代替数据库，其他进程的修改最多 JWT_CACHE_TTL 秒后生效"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            username='alice', password='passw0rd1', email='alice@example.com', is_staff=True
+        )
+
+    def setUp(self):
+        # 创建用户时记录的载荷修改时间可能晚于取整后的签发时间
+        cache.clear()
+        token_cache.clear()
+
+    def _user(self, token):
+        return user_from_payload(token, User.decode_token(token))
+
+    def test_fresh_token_uses_claims(self):
+        token = issue_token(self.user, 0)
+
+        with self.assertNumQueries(0):
+            user = self._user(token)
+            self.assertIsInstance(user, ClaimsUser)
+            self.assertTrue(user.is_staff)
+
+    def test_old_token_checks_database_once(self):
+        token = issue_token(self.user, 120)
+
+        with self.assertNumQueries(1):
+            user = self._user(token)
+        self.assertNotIsInstance(user, ClaimsUser)
+        self.assertEqual(user.id, self.user.id)
+
+        # 查询结果缓存 JWT_CACHE_TTL 秒
+        with self.assertNumQueries(0):
+            self.assertEqual(self._user(token).id, self.user.id)
+
+    def test_old_token_checks_database_again_after_ttl(self):
+        token = issue_token(self.user, 120)
+        self._user(token)
+        now = time.time()
+
+        with mock.patch('accounts.token_cache.time.time', return_value=now + 59):
+            with self.assertNumQueries(0):
+                self._user(token)
+        with mock.patch('accounts.token_cache.time.time', return_value=now + 61):
+            with self.assertNumQueries(1):
+                self.assertNotIsInstance(self._user(token), ClaimsUser)
+
+    def test_revocation_without_signals_takes_effect_after_window(self):
+        # QuerySet.update 不发送信号，相当于在其他进程中修改
+        token = issue_token(self.user, 120)
+        User.objects.filter(id=self.user.id).update(is_staff=False)
+
+        self.assertFalse(self._user(token).is_staff)
+
+    def test_snapshot_overrides_stale_claims(self):
+        token = issue_token(self.user, 0)
+        User.objects.filter(id=self.user.id).update(is_staff=False)
+        # 本进程已查询过该用户（如视图读取了载荷以外的字段）
+        User.verify_token(token)
+
+        user = self._user(token)
+
+        self.assertNotIsInstance(user, ClaimsUser)
+        self.assertFalse(user.is_staff)
+
+    def test_deleted_user_is_rejected_after_window(self):
+        token = issue_token(self.user, 120)
+        User.objects.filter(id=self.user.id).delete()
+
+        self.assertIsNone(self._user(token))
+
+
+def cache_token(name):
+    """格式与JWT相同（header.payload.signature）的测试令牌"""
+    return f'header.payload.{name}'
+
+
+class TokenCacheTests(SimpleTestCase):
+    """令牌验证缓存：容量上限（LRU）、过期时间、按用户清除和命中统计"""
+
+    def test_least_recently_used_entry_is_evicted(self):
+        tokens = TokenCache(max_entries=2, ttl=60)
+        tokens.set(cache_token('a'), {'user_id': 1})
+        tokens.set(cache_token('b'), {'user_id': 2})
+        # 读取 a 后 b 成为最久未使用的记录
+        self.assertIsNotNone(tokens.get(cache_token('a')))
+
+        tokens.set(cache_token('c'), {'user_id': 3})
+
+        self.assertIsNone(tokens.get(cache_token('b')))
+        self.assertEqual(tokens.get(cache_token('a')), ({'user_id': 1}, None, None))
+        self.assertIsNotNone(tokens.get(cache_token('c')))
+        self.assertEqual(tokens.stats()['size'], 2)
+
+    def test_entry_expires_after_ttl_or_token_exp(self):
+        tokens = TokenCache(max_entries=10, ttl=60)
+        now = time.time()
+        tokens.set(cache_token('a'), {'user_id': 1})
+        # 令牌在缓存有效期之前过期时，按令牌的过期时间失效
+        tokens.set(cache_token('b'), {'user_id': 2, 'exp': now + 10})
+
+        with mock.patch('accounts.token_cache.time.time', return_value=now + 30):
+            self.assertIsNotNone(tokens.get(cache_token('a')))
+            self.assertIsNone(tokens.get(cache_token('b')))
+        with mock.patch('accounts.token_cache.time.time', return_value=now + 61):
+            self.assertIsNone(tokens.get(cache_token('a')))
+        self.assertEqual(tokens.stats()['size'], 0)
+
+    def test_same_signature_with_different_token_is_a_miss(self):
+        tokens = TokenCache(max_entries=10, ttl=60)
+        tokens.set('header.payload.sig', {'user_id': 1})
+
+        self.assertIsNone(tokens.get('header.forged.sig'))
+
+    def test_invalidate_user_removes_only_that_users_entries(self):
+        tokens = TokenCache(max_entries=10, ttl=60)
+        tokens.set(cache_token('a1'), {'user_id': 1})
+        tokens.set(cache_token('a2'), {'user_id': 1})
+        tokens.set(cache_token('b'), {'user_id': 2})
+
+        tokens.invalidate_user(1)
+
+        self.assertIsNone(tokens.get(cache_token('a1')))
+        self.assertIsNone(tokens.get(cache_token('a2')))
+        self.assertIsNotNone(tokens.get(cache_token('b')))
+        self.assertEqual(tokens._keys_by_user, {2: {'b'}})
+
+    def test_hit_and_miss_stats(self):
+        tokens = TokenCache(max_entries=10, ttl=60)
+        tokens.get(cache_token('a'))
+        tokens.set(cache_token('a'), {'user_id': 1})
+        tokens.get(cache_token('a'))
+        tokens.get(cache_token('a'))
+
+        self.assertEqual(tokens.stats(), {'size': 1, 'hits': 2, 'misses': 1})
+
+    def test_zero_ttl_disables_cache(self):
+        tokens = TokenCache(max_entries=10, ttl=0)
+        tokens.set(cache_token('a'), {'user_id': 1})
+
+        self.assertEqual(tokens.stats()['size'], 0)
+
+
+class VerifyTokenCacheTests(TestCase):
+    """verify_token 命中缓存时不解码令牌、不查询数据库；用户保存或删除后重新查询"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='alice', password='passw0rd1', email='alice@example.com')
+
+    def setUp(self):
+        token_cache.clear()
+        self.token = self.user.generate_token()
+
+    def test_hit_skips_decode_and_query(self):
+        User.verify_token(self.token)
+
+        with mock.patch('accounts.models.jwt.decode') as decode, self.assertNumQueries(0):
+            user = User.verify_token(self.token)
+        decode.assert_not_called()
+
+        expected = User.objects.get(id=self.user.id)
+        self.assertEqual(
+            [getattr(user, f.attname) for f in User._meta.concrete_fields],
+            [getattr(expected, f.attname) for f in User._meta.concrete_fields]
+        )
+        self.assertFalse(user._state.adding)
+        self.assertEqual(token_cache.stats()['hits'], 1)
+
+    def test_decoded_payload_is_reused(self):
+        # 中间件先解码令牌，之后查询用户时不再解码
+        User.decode_token(self.token)
+
+        with mock.patch('accounts.models.jwt.decode') as decode, self.assertNumQueries(1):
+            self.assertEqual(User.verify_token(self.token).id, self.user.id)
+        decode.assert_not_called()
+
+    def test_save_invalidates_snapshot(self):
+        User.verify_token(self.token)
+
+        user = User.objects.get(id=self.user.id)
+        user.phone = '13800000000'
+        user.save()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(User.verify_token(self.token).phone, '13800000000')
+
+    def test_delete_invalidates_snapshot(self):
+        User.verify_token(self.token)
+
+        User.objects.get(id=self.user.id).delete()
+
+        self.assertIsNone(User.verify_token(self.token))
+
+    def test_invalid_token_is_not_cached(self):
+        self.assertIsNone(User.verify_token(self.token + 'x'))
+        self.assertEqual(token_cache.stats()['size'], 0)
+
+
+class PasswordFieldTests(SimpleTestCase):
+    """提高成本参数后生成的哈希仍能保存（SQLite不检查长度，这里直接比较）"""
+
+    @override_settings(
+        ACCOUNT_PASSWORD_HASHERS=['accounts.hashers.ScryptPasswordHasher'],
+        ACCOUNT_SCRYPT_WORK_FACTOR=2 ** 17,
+    )
+    def test_scrypt_hash_fits_password_field(self):
+        encoded = make_password('passw0rd1')
+
+        self.assertGreater(len(encoded), 128)
+        self.assertLessEqual(len(encoded), User._meta.get_field('password').max_length)
+
+
+def start_server(test, server):
+    """在后台线程中运行模拟服务器，测试结束时关闭"""
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    test.addCleanup(server.server_close)
+    test.addCleanup(server.shutdown)
+    return server
+
+
+def smtp_settings(server):
+    return override_settings(
+        EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+        EMAIL_HOST='127.0.0.1',
+        EMAIL_PORT=server.port,
+        EMAIL_USE_SSL=False,
+        EMAIL_USE_TLS=False,
+        EMAIL_HOST_USER='',
+        EMAIL_HOST_PASSWORD='',
+        EMAIL_TIMEOUT=5,
+        OUTBOUND_RETRY_BACKOFF=0.01,
+    )
+
+
+class OutboundJobQueueTests(SimpleTestCase):
+    """外发任务队列：通过本地模拟SMTP服务器发送"""
+
+    def _queue(self, **kwargs):
+        # 在 smtp_settings 中创建（重试等待时间在创建时读取）
+        queue = OutboundJobQueue(**kwargs)
+        self.addCleanup(queue.shutdown)
+        return queue
+
+    def test_job_status_goes_from_queued_to_sent(self):
+        server = start_server(self, FakeSMTPServer(delay=0.2))
+        with smtp_settings(server):
+            queue = self._queue(workers=1)
+            # 唯一的工作线程正在发送第一封邮件，第二封仍在排队
+            queue.send_email('验证码', '000001', ['a@example.com'], FROM_EMAIL)
+            job_id = queue.send_email('验证码', '000002', ['b@example.com'], FROM_EMAIL)
+            self.assertEqual(queue.job_status(job_id)['status'], QUEUED)
+
+            queue.shutdown()
+
+        self.assertEqual(queue.job_status(job_id)['status'], SENT)
+        self.assertEqual(server.messages, 2)
+        self.assertEqual(server.connections, 1)
+
+    def test_dropped_connection_reconnects_and_retries(self):
+        server = start_server(self, FakeSMTPServer(drop_every=1))
+        with smtp_settings(server):
+            queue = self._queue(workers=1)
+            job_ids = [queue.send_email('验证码', f'{i:06d}', ['a@example.com'], FROM_EMAIL) for i in range(3)]
+            queue.shutdown()
+
+        self.assertEqual([queue.job_status(job_id)['status'] for job_id in job_ids], [SENT] * 3)
+        # 第一封之后每封邮件都先在已断开的连接上失败一次，再重新连接发送
+        self.assertEqual(queue.stats()['retries'], 2)
+        self.assertEqual(server.messages, 3)
+        self.assertEqual(server.connections, 3)
+
+    def test_full_queue_raises_overflow_error(self):
+        server = start_server(self, FakeSMTPServer(delay=0.2))
+        with smtp_settings(server):
+            queue = self._queue(workers=1, max_pending=1)
+            queue.send_email('验证码', '000001', ['a@example.com'], FROM_EMAIL)
+
+            with self.assertRaises(OverflowError):
+                queue.send_email('验证码', '000002', ['b@example.com'], FROM_EMAIL)
+            queue.shutdown()
+
+        self.assertEqual(queue.stats()['rejected'], 1)
+
+
+class SendVerificationCodeViewTests(TestCase):
+
+    def test_full_queue_returns_503(self):
+        server = start_server(self, FakeSMTPServer(delay=0.2))
+        with smtp_settings(server):
+            queue = OutboundJobQueue(workers=1, max_pending=1)
+            self.addCleanup(queue.shutdown)
+            queue.send_email('验证码', '000001', ['a@example.com'], FROM_EMAIL)
+
+            with mock.patch('accounts.views.outbound_queue', queue):
+                response = self.client.post(
+                    '/accounts/send-verification-code/', {'email': 'b@example.com'}, content_type='application/json'
+                )
+            queue.shutdown()
+
+        self.assertEqual(response.status_code, 503, response.content)
+
+
+@override_settings(TURNSTILE_SECRET_KEY='test-secret', TURNSTILE_READ_TIMEOUT=0.3)
+class TurnstileVerifierTests(SimpleTestCase):
+    """Turnstile验证器：通过本地模拟验证接口验证"""
+
+    def _verify(self, server, token):
+        verifier = TurnstileVerifier()
+        self.addCleanup(verifier.close)
+        with override_settings(TURNSTILE_VERIFY_URL=server.url):
+            return verifier.verify(token, '127.0.0.1')
+
+    def test_valid_and_invalid_tokens(self):
+        server = start_server(self, StubTurnstileServer())
+
+        self.assertTrue(self._verify(server, 'token'))
+        self.assertFalse(self._verify(server, INVALID_TOKEN))
+
+    def test_retries_server_errors(self):
+        server = start_server(self, StubTurnstileServer(fail_first=2))
+
+        self.assertTrue(self._verify(server, 'token'))
+        self.assertEqual(server.requests, 3)
+
+    def test_timeout_fails_without_retry(self):
+        # 读取超时时令牌可能已被验证过，不重试
+        server = start_server(self, StubTurnstileServer(delay=1))
+
+        start = time.monotonic()
+        self.assertFalse(self._verify(server, 'token'))
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(server.requests, 1)
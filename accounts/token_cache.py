@@ -0,0 +1,123 @@
+"""
+JWT验证结果缓存
+每个请求都要 jwt.decode 并按 user_id 查询用户。这里在进程内按令牌签名缓存解码后的载荷和用户字段快照，
+命中时不再解码令牌；有用户快照时直接由快照构造 User 实例，不再查询数据库。
+
+- 容量有上限（LRU），每条记录在 JWT_CACHE_TTL 秒后或令牌过期时失效；
+- 用户保存或删除时清除该用户的全部记录（其他进程的记录最多保留 JWT_CACHE_TTL 秒）。
+"""
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+
+
+def token_signature(token):
+    """JWT的签名部分（令牌的最后一段），作为缓存键"""
+    return token.rsplit('.', 1)[-1]
+
+
+class TokenCache:
+    """有容量上限和过期时间的令牌验证缓存"""
+
+    def __init__(self, max_entries=None, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _max_entries(self):
+        if self.max_entries is not None:
+            return self.max_entries
+        return getattr(settings, 'JWT_CACHE_SIZE', 1024)
+
+    def ttl_seconds(self):
+        """缓存记录的有效期（秒）"""
+        if self.ttl is not None:
+            return self.ttl
+        return getattr(settings, 'JWT_CACHE_TTL', 60)
+
+    def get(self, token):
+        """
+        返回缓存的 (payload, field_names, values)，不存在或已过期时返回None
+
+        只缓存了载荷时 field_names 和 values 为None
+        """
+        key = token_signature(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now or entry[1] != token:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def has_user(self, token):
+        """是否缓存了令牌的用户快照，即本进程在 ttl_seconds() 秒内查询过该用户（不计入命中统计）"""
+        key = token_signature(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] > time.time() and entry[1] == token and entry[2][1] is not None
+
+    def set(self, token, payload, user=None):
+        """缓存令牌的载荷和用户字段快照（user为None时只缓存载荷）"""
+        if self.ttl_seconds() <= 0 or self._max_entries() <= 0:
+            return
+        key = token_signature(token)
+        expires_at = time.time() + self.ttl_seconds()
+        exp = payload.get('exp')
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, exp)
+
+        if user is not None:
+            field_names = [field.attname for field in user._meta.concrete_fields]
+            snapshot = (payload, field_names, [getattr(user, name) for name in field_names])
+        else:
+            snapshot = (payload, None, None)
+        user_id = payload.get('user_id')
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (expires_at, token, snapshot, user_id)
+            self._keys_by_user.setdefault(user_id, set()).add(key)
+            while len(self._entries) > self._max_entries():
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id):
+        """清除指定用户的全部缓存记录（用户信息修改或删除后调用）"""
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+    def _remove(self, key):
+        # 调用方需持有锁
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._keys_by_user.get(entry[3])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[entry[3]]
+
+
+# 全局令牌验证缓存
+token_cache = TokenCache()
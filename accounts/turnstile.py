@@ -0,0 +1,96 @@
+"""
+Cloudflare Turnstile 人机验证
+所有请求共用一个带连接池的 requests.Session（复用到 Cloudflare 的 TLS 连接），
+并设置连接/读取超时，验证服务不可用时请求线程最多阻塞有限时间。
+
+配置：
+- TURNSTILE_CONNECT_TIMEOUT / TURNSTILE_READ_TIMEOUT：超时秒数
+- TURNSTILE_MAX_RETRIES：连接失败或返回5xx时的重试次数
+- TURNSTILE_POOL_SIZE：连接池大小（不小于并发请求线程数）
+"""
+import logging
+import threading
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+class TurnstileVerifier:
+    """Turnstile 令牌验证器"""
+
+    def __init__(self):
+        self.connect_timeout = getattr(settings, 'TURNSTILE_CONNECT_TIMEOUT', 3)
+        self.read_timeout = getattr(settings, 'TURNSTILE_READ_TIMEOUT', 5)
+        self.max_retries = getattr(settings, 'TURNSTILE_MAX_RETRIES', 2)
+        self.pool_size = getattr(settings, 'TURNSTILE_POOL_SIZE', 10)
+        self._session = None
+        self._lock = threading.Lock()
+
+    def verify(self, token, remote_ip=None):
+        """
+        验证令牌
+
+        Returns:
+            bool: 验证是否通过（请求失败或超时视为不通过）
+        """
+        data = {
+            'secret': settings.TURNSTILE_SECRET_KEY,
+            'response': token
+        }
+        if remote_ip:
+            data['remoteip'] = remote_ip
+
+        try:
+            response = self._get_session().post(
+                settings.TURNSTILE_VERIFY_URL,
+                data=data,
+                timeout=(self.connect_timeout, self.read_timeout)
+            )
+            result = response.json()
+        except Exception as e:
+            logger.error("Turnstile验证异常: %s", e)
+            return False
+
+        success = result.get('success', False)
+        if not success:
+            logger.warning("Turnstile验证失败，错误代码: %s", result.get('error-codes', []))
+        return success
+
+    def close(self):
+        with self._lock:
+            session, self._session = self._session, None
+        if session is not None:
+            session.close()
+
+    def _get_session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._create_session()
+        return self._session
+
+    def _create_session(self):
+        # 令牌只能验证一次：读取超时时服务器可能已经处理过该令牌，重试只会得到
+        # timeout-or-duplicate，因此只重试连接失败和5xx响应
+        retry = Retry(
+            total=self.max_retries,
+            connect=self.max_retries,
+            read=0,
+            status=self.max_retries,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset({'POST'}),
+            backoff_factor=0.2,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+
+# 全局验证器
+turnstile_verifier = TurnstileVerifier()
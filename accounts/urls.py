@@ -12,6 +12,7 @@ urlpatterns = [
     path('profile/', views.user_profile, name='user_profile'),
     path('profile/update/', views.update_profile, name='update_profile'),
     path('send-verification-code/', views.send_verification_code, name='send_verification_code'),
+    path('email-jobs/<str:job_id>/', views.email_job_status, name='email_job_status'),
     path('update-email/', views.update_email, name='update_email'),
    
     # 兴趣标签相关API
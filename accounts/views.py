@@ -2,13 +2,13 @@ from django.shortcuts import render, redirect
 from django.http import JsonResponse, HttpResponse 
 from django.views.decorators.csrf import csrf_exempt 
 import json 
-import requests 
 from .models import User, VerificationCode, School, InterestTag, UserInterest 
 from .decorators import admin_required, login_required 
+from .outbound import outbound_queue 
+from .turnstile import turnstile_verifier 
 from django.template.loader import render_to_string 
 import os 
 from django.conf import settings 
-from django.core.mail import send_mail 
 import random 
 import string 
 from django.utils import timezone 
@@ -25,27 +25,7 @@ def verify_turnstile(token, remote_ip=None):
         print("[开发环境] 人机验证自动通过") 
         return True 
      
-    data = { 
-        'secret': settings.TURNSTILE_SECRET_KEY, 
-        'response': token 
-    } 
-     
-    if remote_ip: 
-        data['remoteip'] = remote_ip 
-     
-    try: 
-        response = requests.post(settings.TURNSTILE_VERIFY_URL, data=data) 
-        result = response.json() 
-        success = result.get('success', False) 
-         
-        if not success: 
-            error_codes = result.get('error-codes', []) 
-            print(f"Turnstile验证失败，错误代码: {error_codes}") 
-         
-        return success 
-    except Exception as e: 
-        print(f"Turnstile验证异常: {str(e)}") 
-        return False 
+    return turnstile_verifier.verify(token, remote_ip) 
  
 # Create your views here. 
 @csrf_exempt 
@@ -71,24 +51,37 @@ def send_verification_code(request):
             created_at=timezone.now() 
         ) 
          
-        # 发送验证码邮件 
+        # 发送验证码邮件（在后台线程中发送，立即返回任务ID） 
         subject = '【Arx学习平台】邮箱验证码' 
         message = f'您的验证码是: {code}, 有效期10分钟。如非本人操作，请忽略此邮件。' 
         from_email = settings.EMAIL_HOST_USER 
         recipient_list = [email] 
          
         try: 
-            send_mail(subject, message, from_email, recipient_list) 
+            job_id = outbound_queue.send_email(subject, message, recipient_list, from_email) 
             return JsonResponse({ 
                 "success": True, 
-                "message": "验证码已发送，请查收邮件" 
+                "message": "验证码已发送，请查收邮件", 
+                "job_id": job_id 
             }) 
-        except Exception as e: 
-            return JsonResponse({"error": f"发送邮件失败: {str(e)}"}, status=500) 
+        except OverflowError: 
+            return JsonResponse({"error": "邮件发送繁忙，请稍后重试"}, status=503) 
              
     except Exception as e: 
         return JsonResponse({"error": f"发送验证码失败: {str(e)}"}, status=500) 
  
+def email_job_status(request, job_id): 
+    """查询邮件发送任务状态（queued / running / sent / failed）""" 
+    status = outbound_queue.job_status(job_id) 
+    if status is None: 
+        return JsonResponse({"error": "任务不存在或已过期"}, status=404) 
+     
+    return JsonResponse({ 
+        "job_id": job_id, 
+        "status": status['status'], 
+        "attempts": status['attempts'] 
+    }) 
+ 
 @csrf_exempt 
 def register(request): 
     """用户注册""" 
@@ -3,6 +3,7 @@ import json
 from accounts.models import User
 from django.utils import timezone
 from .models import ChatMessage
+from forum.moderation import moderation_service
 import logging
 from urllib.parse import parse_qs
 from asgiref.sync import sync_to_async
@@ -10,6 +11,9 @@ from asgiref.sync import sync_to_async
 # 获取logger
 logger = logging.getLogger(__name__)
 
+# 服务端生成的事件（进入/离开聊天室、错误提示）使用的发送者
+SYSTEM_SENDER = 'system'
+
 class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         # 从URL路径获取房间名
@@ -44,7 +48,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 {
                     'type': 'chat_message',
                     'message': f"{self.username} 离开了聊天室",
-                    'sender': 'system',
+                    'sender': SYSTEM_SENDER,
                     'timestamp': timezone.now().isoformat()
                 }
             )
@@ -69,15 +73,35 @@ class ChatConsumer(AsyncWebsocketConsumer):
             
             logger.info(f"收到消息: sender={sender}, message={message[:30]}...(截断), room={self.room_name}")
             
+            # 'system' 只用于服务端生成的事件，客户端不能以系统身份发送消息
+            if sender == SYSTEM_SENDER:
+                logger.warning(f"拒绝客户端以系统身份发送的消息: room={self.room_name}")
+                await self.send(text_data=json.dumps({
+                    'message': '无效的发送者',
+                    'sender': SYSTEM_SENDER,
+                    'timestamp': timestamp.isoformat()
+                }))
+                return
+            
+            # 内容审核检测（在专用线程池中执行，不阻塞事件循环）
+            is_valid, violations_list = await moderation_service.acheck_text(message, 'chat')
+            if not is_valid:
+                logger.info(f"消息包含违规内容，已拦截: sender={sender}, room={self.room_name}")
+                await self.send(text_data=json.dumps({
+                    'message': '消息包含违规内容，发送失败',
+                    'sender': SYSTEM_SENDER,
+                    'timestamp': timestamp.isoformat()
+                }))
+                return
+            
             # 保存消息到数据库
-            if sender != 'system':
-                try:
-                    # 保存消息并获取消息ID
-                    saved_message = await self.save_message(sender, message, self.room_name, timestamp)
-                    message_id = saved_message.id
-                    logger.info(f"消息已保存到数据库: id={message_id}, sender={sender}, room={self.room_name}")
-                except Exception as e:
-                    logger.error(f"保存消息失败: {str(e)}")
+            try:
+                # 保存消息并获取消息ID
+                saved_message = await self.save_message(sender, message, self.room_name, timestamp)
+                message_id = saved_message.id
+                logger.info(f"消息已保存到数据库: id={message_id}, sender={sender}, room={self.room_name}")
+            except Exception as e:
+                logger.error(f"保存消息失败: {str(e)}")
             
             # 发送消息到聊天室组
             await self.channel_layer.group_send(
@@ -95,7 +119,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
             logger.error(f"处理消息失败: {str(e)}")
             await self.send(text_data=json.dumps({
                 'message': '消息处理失败，请重试',
-                'sender': 'system',
+                'sender': SYSTEM_SENDER,
                 'timestamp': timezone.now().isoformat()
             }))
     
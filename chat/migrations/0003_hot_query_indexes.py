@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_hot_query_indexes'),
+        ('chat', '0002_alter_chatmessage_room_name'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['room_name', '-timestamp', '-id'], name='chat_msg_room_time_idx'),
+        ),
+    ]
@@ -9,6 +9,10 @@ class ChatMessage(models.Model):
 
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            # 聊天室历史记录：按 (timestamp, id) 从最新的消息向前翻页
+            models.Index(fields=['room_name', '-timestamp', '-id'], name='chat_msg_room_time_idx'),
+        ]
         verbose_name = '聊天消息'
         verbose_name_plural = '聊天消息'
 
@@ -1,3 +1,108 @@
+import datetime
+import json
+from unittest import mock
+from asgiref.sync import async_to_sync
 from django.test import TestCase
+from django.utils import timezone
+from accounts.models import User
+from forum.models import ViolationWord
+from forum.moderation import moderation_service
+from .consumers import ChatConsumer
+from .models import ChatMessage
 
-# Create your tests here.
+
+class ChatConsumerReceiveTests(TestCase):
+    """客户端发来的消息必须经过内容审核，且不能冒充系统消息"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create(username='alice', password='passw0rd1', email='alice@example.com')
+        ViolationWord.objects.create(word='违禁词', category='abuse', match_type='contains')
+
+    def setUp(self):
+        # 审核在专用线程池中执行；先在测试线程中编译词库，避免工作线程读取测试事务中的数据
+        moderation_service.check_text('预热')
+
+    def _receive(self, sender, message):
+        consumer = ChatConsumer()
+        consumer.room_name = 'room1'
+        consumer.room_group_name = 'chat_room1'
+        consumer.channel_layer = mock.Mock(group_send=mock.AsyncMock())
+        consumer.send = mock.AsyncMock()
+        async_to_sync(consumer.receive)(json.dumps({'message': message, 'sender': sender}))
+        return consumer
+
+    def _replies(self, consumer):
+        return [json.loads(call.kwargs['text_data'])['message'] for call in consumer.send.await_args_list]
+
+    def test_clean_message_is_saved_and_broadcast(self):
+        consumer = self._receive('alice', '大家好')
+
+        consumer.channel_layer.group_send.assert_awaited_once()
+        event = consumer.channel_layer.group_send.await_args.args[1]
+        self.assertEqual(event['sender'], 'alice')
+        self.assertEqual(ChatMessage.objects.get(id=event['id']).content, '大家好')
+
+    def test_violating_message_is_blocked(self):
+        consumer = self._receive('alice', '这是违禁词')
+
+        consumer.channel_layer.group_send.assert_not_awaited()
+        self.assertEqual(self._replies(consumer), ['消息包含违规内容，发送失败'])
+        self.assertFalse(ChatMessage.objects.exists())
+
+    def test_client_cannot_send_as_system(self):
+        for message in ('这是违禁词', '大家好'):
+            consumer = self._receive('system', message)
+
+            consumer.channel_layer.group_send.assert_not_awaited()
+            self.assertEqual(self._replies(consumer), ['无效的发送者'])
+        self.assertFalse(ChatMessage.objects.exists())
+
+
+class ChatHistoryCursorTests(TestCase):
+    """聊天记录游标分页：从最新的消息向更早的消息翻页，每页内最早的消息在前"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='alice', password='passw0rd1', email='alice@example.com')
+        ChatMessage.objects.bulk_create([
+            ChatMessage(sender=cls.user, content=f'消息{i}', room_name='room1') for i in range(7)
+        ])
+        ChatMessage.objects.create(sender=cls.user, content='其他房间', room_name='room2')
+        # 前三条时间相同，按id区分先后
+        base = timezone.now() - datetime.timedelta(hours=1)
+        for i, message in enumerate(ChatMessage.objects.filter(room_name='room1').order_by('id')):
+            message.timestamp = base + datetime.timedelta(seconds=max(i - 2, 0))
+            message.save(update_fields=['timestamp'])
+
+    def setUp(self):
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {self.user.generate_token()}'}
+
+    def _get(self, **params):
+        response = self.client.get('/chat/history/room1/', params, **self.auth)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response
+
+    def test_cursor_pages_walk_back_to_oldest(self):
+        pages = []
+        data = self._get(cursor='', limit=3).json()
+        pages.append([m['content'] for m in data['messages']])
+        while data['has_more']:
+            data = self._get(cursor=data['next_cursor'], limit=3).json()
+            pages.append([m['content'] for m in data['messages']])
+
+        self.assertEqual(pages, [['消息4', '消息5', '消息6'], ['消息1', '消息2', '消息3'], ['消息0']])
+
+    def test_list_format_returns_cursor_for_older_messages(self):
+        response = self._get(limit=3)
+
+        self.assertEqual([m['content'] for m in response.json()], ['消息4', '消息5', '消息6'])
+        older = self._get(cursor=response['X-Next-Cursor'], limit=3).json()
+        self.assertEqual([m['content'] for m in older['messages']], ['消息1', '消息2', '消息3'])
+        # offset 分页保持原来的行为
+        self.assertEqual([m['content'] for m in self._get(limit=3, offset=3).json()], ['消息1', '消息2', '消息3'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/chat/history/room1/', {'cursor': '!!'}, **self.auth)
+
+        self.assertEqual(response.status_code, 400)
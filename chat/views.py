@@ -10,9 +10,13 @@ from accounts.models import User
 from django.core.serializers.json import DjangoJSONEncoder
 import json
 from django.utils import timezone
+from Arx.pagination import InvalidCursor, cursor_for, cursor_paginate, wants_cursor
 
 # Create your views here.
 
+# 聊天记录从最新的消息开始向前翻页（id 保证顺序唯一）
+CHAT_HISTORY_ORDERING = ('-timestamp', '-id')
+
 @login_required
 def chat_room(request, school_id):
     """
@@ -77,6 +81,9 @@ def chat_history(request, room_name):
     获取聊天室的历史记录
     默认返回最近100条消息
     支持分页和指定消息数量
+
+    带 cursor 参数时按 (timestamp, id) 游标向更早的消息翻页，
+    返回 {messages, next_cursor, has_more}；否则保持原来的列表格式（limit/offset）
     """
     try:
         # 获取请求参数
@@ -88,9 +95,21 @@ def chat_history(request, room_name):
             limit = 100
             
         # 查询指定房间的历史消息
-        messages = ChatMessage.objects.filter(
-            room_name=room_name
-        ).order_by('-timestamp')[offset:offset+limit]
+        messages = ChatMessage.objects.filter(room_name=room_name).select_related('sender')
+        
+        if wants_cursor(request):
+            cursor_page = cursor_paginate(
+                messages, CHAT_HISTORY_ORDERING, cursor=request.GET.get('cursor'), page_size=limit
+            )
+            data = json.dumps({
+                # 最早的消息在前
+                'messages': list(reversed(cursor_page.items)),
+                'next_cursor': cursor_page.next_cursor,
+                'has_more': cursor_page.has_next
+            }, cls=ChatMessageEncoder)
+            return HttpResponse(data, content_type='application/json')
+        
+        messages = messages.order_by(*CHAT_HISTORY_ORDERING)[offset:offset+limit]
         
         # 将查询结果转换为列表并反转，使最早的消息在前
         message_list = list(reversed(messages))
@@ -98,7 +117,13 @@ def chat_history(request, room_name):
         # 使用自定义编码器序列化消息
         data = json.dumps(message_list, cls=ChatMessageEncoder)
         
-        return HttpResponse(data, content_type='application/json')
+        response = HttpResponse(data, content_type='application/json')
+        if len(message_list) == limit and message_list:
+            # 列表格式无法附带游标，通过响应头返回，客户端可改用游标继续加载更早的消息
+            response['X-Next-Cursor'] = cursor_for(message_list[0], CHAT_HISTORY_ORDERING)
+        return response
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
@@ -181,6 +206,16 @@ def send_message(request, room_name):
         if not content:
             return JsonResponse({'error': '消息内容不能为空'}, status=400)
         
+        # 内容审核检测
+        from forum.moderation import moderation_service
+        is_valid, violations_list = moderation_service.check_text(content, 'chat')
+        
+        if not is_valid:
+            return JsonResponse({
+                'error': '消息包含违规内容，发送失败',
+                'violation_details': violations_list
+            }, status=400)
+        
         # 创建消息记录
         message = ChatMessage.objects.create(
             room_name=room_name,
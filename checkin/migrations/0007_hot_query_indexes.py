@@ -0,0 +1,22 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_hot_query_indexes'),
+        ('checkin', '0006_remove_task_type'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usercheckin',
+            index=models.Index(condition=models.Q(('shared_to_community', True)), fields=['-checked_at', '-id'], name='checkin_community_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usercheckin',
+            index=models.Index(fields=['user', 'checkin_date'], name='checkin_user_date_idx'),
+        ),
+    ]
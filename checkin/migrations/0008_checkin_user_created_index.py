@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_hot_query_indexes'),
+        ('checkin', '0007_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='checkin',
+            index=models.Index(fields=['user', '-created_at'], name='checkin_user_created_idx'),
+        ),
+    ]
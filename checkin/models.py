@@ -22,6 +22,10 @@ class Checkin(models.Model):
         verbose_name = '打卡任务'
         verbose_name_plural = '打卡任务'
         ordering = ['-created_at']
+        indexes = [
+            # 用户创建的打卡任务，按创建时间倒序
+            models.Index(fields=['user', '-created_at'], name='checkin_user_created_idx'),
+        ]
         
     def __str__(self):
         return self.title
@@ -46,6 +50,10 @@ class Checkin(models.Model):
                 is_active=True
             ).first()
         
+        return self.status_dict(current_user, today_checkin, active_session)
+    
+    def status_dict(self, current_user, today_checkin, active_session):
+        """由已查询的今日打卡记录和活跃会话生成 to_dict 的数据（批量查询时使用）"""
         return {
             'id': self.id,
             'user_id': self.user.id,
@@ -151,6 +159,16 @@ class UserCheckin(models.Model):
         # 一个用户对一个打卡任务在同一天只能打卡一次
         unique_together = ('user', 'checkin_id', 'checkin_date')
         ordering = ['-checked_at']
+        indexes = [
+            # 社区打卡列表（部分索引，只包含已分享的记录）
+            models.Index(
+                fields=['-checked_at', '-id'],
+                condition=models.Q(shared_to_community=True),
+                name='checkin_community_idx'
+            ),
+            # 用户当天的打卡记录
+            models.Index(fields=['user', 'checkin_date'], name='checkin_user_date_idx'),
+        ]
         
     def __str__(self):
         checkin_name = self.checkin_title 
@@ -1,3 +1,100 @@
+import datetime
+import json
+from django.core.serializers.json import DjangoJSONEncoder
 from django.test import TestCase
+from django.utils import timezone
+from accounts.models import User
+from .models import Checkin, CheckinSession, UserCheckin
 
-# Create your tests here.
+
+class CheckinStatusTests(TestCase):
+    """打卡任务列表批量查询今日打卡和活跃会话，结果与逐个调用 to_dict 相同"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='alice', password='passw0rd1', email='alice@example.com')
+        today = timezone.now()
+        tasks = [Checkin.objects.create(user=cls.user, title=f'任务{i}', target_duration=30) for i in range(4)]
+        for i, task in enumerate(tasks):
+            Checkin.objects.filter(id=task.id).update(created_at=today - datetime.timedelta(minutes=i))
+        # 任务1今天已完成，任务2今天进行中，任务3只在昨天打过卡（“今天”与视图一样取 timezone.now().date()）
+        UserCheckin.objects.create(
+            user=cls.user, checkin_id=tasks[1].id, checkin_title='任务1', checkin_date=today.date(),
+            start_time=today, end_time=today, duration=60
+        )
+        UserCheckin.objects.create(
+            user=cls.user, checkin_id=tasks[2].id, checkin_title='任务2', checkin_date=today.date(), start_time=today
+        )
+        CheckinSession.objects.create(user=cls.user, checkin_id=tasks[2].id, checkin_title='任务2')
+        CheckinSession.objects.create(user=cls.user, checkin_id=tasks[1].id, checkin_title='任务1', is_active=False)
+        UserCheckin.objects.create(
+            user=cls.user, checkin_id=tasks[3].id, checkin_title='任务3',
+            checkin_date=(today - datetime.timedelta(days=1)).date()
+        )
+        # 其他用户的任务不返回
+        other = User.objects.create(username='bob', password='passw0rd1', email='bob@example.com')
+        Checkin.objects.create(user=other, title='其他任务')
+
+    def test_matches_to_dict_with_fixed_queries(self):
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {self.user.generate_token()}'}
+
+        # 任务、今日打卡记录、活跃会话各一次
+        with self.assertNumQueries(3):
+            response = self.client.get('/checkin/checkins/', **auth)
+
+        self.assertEqual(response.status_code, 200, response.content)
+        expected = [task.to_dict(current_user=self.user) for task in Checkin.objects.filter(user=self.user)]
+        self.assertEqual(response.json(), json.loads(json.dumps(expected, cls=DjangoJSONEncoder)))
+        self.assertEqual(
+            [(task['checked_today'], task['active_session'] is not None) for task in response.json()],
+            [(False, False), (True, False), (True, True), (False, False)]
+        )
+
+
+class CommunityCheckinCursorTests(TestCase):
+    """社区打卡游标分页：逐页取完与按页码分页的顺序一致"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='alice', password='passw0rd1', email='alice@example.com')
+        checkins = [
+            UserCheckin.objects.create(
+                user=cls.user, checkin_id=i, checkin_title=f'任务{i}', shared_to_community=i != 5
+            )
+            for i in range(6)
+        ]
+        # 前三条时间相同，按id区分先后
+        same_time = timezone.now() - datetime.timedelta(hours=1)
+        UserCheckin.objects.filter(id__in=[c.id for c in checkins[:3]]).update(checked_at=same_time)
+
+    def setUp(self):
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {self.user.generate_token()}'}
+
+    def _get(self, **params):
+        response = self.client.get('/checkin/community/', params, **self.auth)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_cursor_pages_match_page_numbers(self):
+        data = self._get(cursor='', page_size=2, include_total=1)
+        self.assertEqual(data['pagination']['total'], 5)
+        ids = [c['id'] for c in data['checkins']]
+        while data['pagination']['has_next']:
+            data = self._get(cursor=data['pagination']['next_cursor'], page_size=2)
+            self.assertNotIn('total', data['pagination'])
+            ids.extend(c['id'] for c in data['checkins'])
+
+        by_page = []
+        for page in range(1, 4):
+            by_page.extend(c['id'] for c in self._get(page=page, page_size=2)['checkins'])
+        self.assertEqual(ids, by_page)
+        self.assertEqual(
+            ids,
+            list(UserCheckin.objects.filter(shared_to_community=True).order_by('-checked_at', '-id')
+                 .values_list('id', flat=True))
+        )
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/checkin/community/', {'cursor': '!!'}, **self.auth)
+
+        self.assertEqual(response.status_code, 400)
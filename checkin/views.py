@@ -8,31 +8,60 @@ from django.utils import timezone
 from datetime import datetime, date
 import json
 from django.core.paginator import Paginator
+from Arx.pagination import (
+    InvalidCursor, cursor_for, cursor_paginate, cursor_pagination_info, wants_cursor, wants_total
+)
 
 # Create your views here.
 
+# 社区打卡记录的排序（id 保证顺序唯一，游标分页依赖这一点）
+COMMUNITY_CHECKIN_ORDERING = ('-checked_at', '-id')
+
 # 获取打卡任务
 @login_required
 def get_checkins(request):
-    """获取当前用户创建的或者可见的所有打卡任务，并标记打卡状态"""
+    """
+    获取当前用户创建的或者可见的所有打卡任务，并标记打卡状态
+
+    任务、今日打卡记录和活跃会话各用一次查询取出，不再逐个任务查询。
+    """
+    user_id = request.user.id
+    
     # 获取用户创建的任务
-    user_created_checkins = Checkin.objects.filter(user=request.user)
+    user_created_checkins = list(Checkin.objects.filter(user_id=user_id).select_related('user'))
+    if not user_created_checkins:
+        return JsonResponse([], safe=False)
     
     # 获取今天的日期
     today = timezone.now().date()
     
-    # 获取用户今天已打卡的任务ID
-    today_checkin_ids = UserCheckin.objects.filter(
-        user=request.user,
-        checkin_date=today
-    ).values_list('checkin_id', flat=True)
+    # 用户今天的打卡记录（每个任务每天最多一条）
+    today_checkins = {
+        user_checkin.checkin_id: user_checkin
+        for user_checkin in UserCheckin.objects.filter(
+            user_id=user_id,
+            checkin_date=today
+        ).select_related('user').order_by()
+    }
     
-    # 构建返回数据，标记用户已打卡的状态
-    data = []
-    for checkin in user_created_checkins:
-        checkin_data = checkin.to_dict(current_user=request.user)
-        # 使用模型的to_dict方法已经包含了checked_today状态和is_creator字段
-        data.append(checkin_data)
+    # 今天已开始但还没有结束的任务才需要返回活跃会话
+    unfinished_ids = [checkin_id for checkin_id, user_checkin in today_checkins.items() if not user_checkin.end_time]
+    active_sessions = {}
+    if unfinished_ids:
+        active_sessions = {
+            session.checkin_id: session
+            for session in CheckinSession.objects.filter(
+                user_id=user_id,
+                checkin_id__in=unfinished_ids,
+                is_active=True
+            ).select_related('user').order_by()
+        }
+    
+    # 构建返回数据，标记用户已打卡的状态（与逐个调用 to_dict 的结果相同）
+    data = [
+        checkin.status_dict(request.user, today_checkins.get(checkin.id), active_sessions.get(checkin.id))
+        for checkin in user_created_checkins
+    ]
             
     return JsonResponse(data, safe=False)
 
@@ -44,10 +73,25 @@ def get_community_checkins(request):
     page_size = int(request.GET.get('page_size', 10))
     
     # 获取已分享到社区的打卡记录
-    community_checkins = UserCheckin.objects.filter(shared_to_community=True).order_by('-checked_at')
+    community_checkins = UserCheckin.objects.filter(shared_to_community=True).select_related('user')
+    
+    # 带 cursor 参数时按 (checked_at, id) 游标分页，不统计总数（include_total=1 时才统计）
+    if wants_cursor(request):
+        try:
+            cursor_page = cursor_paginate(
+                community_checkins, COMMUNITY_CHECKIN_ORDERING,
+                cursor=request.GET.get('cursor'), page_size=page_size
+            )
+        except InvalidCursor as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        total = community_checkins.count() if wants_total(request) else None
+        return JsonResponse({
+            'checkins': [checkin.to_dict() for checkin in cursor_page.items],
+            'pagination': cursor_pagination_info(cursor_page, page_size, total)
+        })
     
     # 创建分页器
-    paginator = Paginator(community_checkins, page_size)
+    paginator = Paginator(community_checkins.order_by(*COMMUNITY_CHECKIN_ORDERING), page_size)
     
     # 获取当前页的数据
     current_page = paginator.get_page(page)
@@ -66,6 +110,10 @@ def get_community_checkins(request):
         'total_pages': paginator.num_pages,
         'has_next': current_page.has_next(),
         'has_prev': current_page.has_previous(),
+        'next_cursor': (
+            cursor_for(current_page[-1], COMMUNITY_CHECKIN_ORDERING)
+            if current_page.has_next() else None
+        ),
     }
             
     return JsonResponse({
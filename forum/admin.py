@@ -25,6 +25,18 @@ class PostAdmin(admin.ModelAdmin):
         })
     )
     
+    actions = ['rescan_posts']
+    
+    def rescan_posts(self, request, queryset):
+        """使用当前违规词库重新审核选中的帖子"""
+        from .rescan import ContentRescanner
+        stats = ContentRescanner().rescan_posts(queryset)
+        self.message_user(
+            request,
+            f"已重新审核 {stats['scanned']} 个帖子，拒绝 {stats['blocked']} 个，恢复 {stats['restored']} 个"
+        )
+    rescan_posts.short_description = "重新审核选中的帖子"
+    
     def save_model(self, request, obj, form, change):
         if obj.status == 'approved' and not obj.reviewed_by and not obj.auto_approved:
             obj.reviewed_by = request.user
@@ -80,10 +92,23 @@ class ViolationWordAdmin(admin.ModelAdmin):
     test_detection.short_description = "测试违规检测功能"
     
     def save_model(self, request, obj, form, change):
+        # 无效的正则表达式在表单校验（ViolationWord.clean）阶段即被拒绝，不会走到这里
         super().save_model(request, obj, form, change)
         # 保存后刷新缓存
         from .moderation import TextModerationService
         TextModerationService.refresh_cache()
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        # 删除后刷新缓存
+        from .moderation import TextModerationService
+        TextModerationService.refresh_cache()
+    
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        # 批量删除后刷新缓存
+        from .moderation import TextModerationService
+        TextModerationService.refresh_cache()
 
 
 @admin.register(ModerationLog)
@@ -153,16 +178,27 @@ class PostCommentAdmin(admin.ModelAdmin):
         return obj.content[:50] + '...' if len(obj.content) > 50 else obj.content
     content_preview.short_description = '评论内容预览'
     
-    actions = ['delete_comments', 'restore_comments']
+    actions = ['delete_comments', 'restore_comments', 'rescan_comments']
     
     def delete_comments(self, request, queryset):
         """批量软删除评论"""
+        post_ids = set(queryset.values_list('post_id', flat=True))
         updated = queryset.update(is_deleted=True)
+        Post.refresh_counters(post_ids)
         self.message_user(request, f'已删除 {updated} 条评论')
     delete_comments.short_description = "删除选中的评论"
     
     def restore_comments(self, request, queryset):
         """批量恢复评论"""
+        post_ids = set(queryset.values_list('post_id', flat=True))
         updated = queryset.update(is_deleted=False)
+        Post.refresh_counters(post_ids)
         self.message_user(request, f'已恢复 {updated} 条评论')
     restore_comments.short_description = "恢复选中的评论"
+    
+    def rescan_comments(self, request, queryset):
+        """使用当前违规词库重新审核选中的评论"""
+        from .rescan import ContentRescanner
+        stats = ContentRescanner().rescan_comments(queryset)
+        self.message_user(request, f"已重新审核 {stats['scanned']} 条评论，删除违规评论 {stats['blocked']} 条")
+    rescan_comments.short_description = "重新审核选中的评论"
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ForumConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'forum'
+
+    def ready(self):
+        # 注册信号处理（同步帖子全文检索索引）
+        from . import signals  # noqa: F401
+        # 注册部署检查（ETag版本号需要共享缓存）
+        from . import checks  # noqa: F401
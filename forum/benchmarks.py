@@ -0,0 +1,204 @@
+"""
+审核引擎基准测试工具
+生成可复现的中英文合成语料和违规词库，并测量审核服务的吞吐量和延迟
+"""
+import gc
+import string
+import time
+import tracemalloc
+from .matchers import CompiledLexicon
+from .moderation import TextModerationService
+from .normalizer import normalize_text
+
+
+# 常用汉字区间的前3000个字符
+CJK_CHARS = [chr(code) for code in range(0x4e00, 0x4e00 + 3000)]
+CATEGORIES = ['political', 'adult', 'violence', 'advertisement', 'abuse', 'other']
+
+# 合成词库中各匹配方式的比例
+MATCH_TYPE_WEIGHTS = {
+    'contains': 0.7,
+    'fuzzy': 0.15,
+    'exact': 0.14,
+    'regex': 0.01,
+}
+
+# 语料中穿插的标点和干扰字符
+NOISE_CHARS = list('，。！？、；：,.!?-_*#@ ')
+
+
+def random_cjk(rng, min_length, max_length):
+    return ''.join(rng.choice(CJK_CHARS) for _ in range(rng.randint(min_length, max_length)))
+
+
+def random_ascii(rng, min_length, max_length):
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(min_length, max_length)))
+
+
+def generate_lexicon(rng, size, match_type_weights=MATCH_TYPE_WEIGHTS):
+    """生成合成违规词库（中英文各半，覆盖四种匹配方式）"""
+    match_types = list(match_type_weights)
+    weights = [match_type_weights[m] for m in match_types]
+    words = []
+    seen = set()
+
+    while len(words) < size:
+        if rng.random() < 0.5:
+            word = random_cjk(rng, 2, 5)
+        else:
+            word = random_ascii(rng, 4, 9)
+        if word in seen:
+            continue
+        seen.add(word)
+
+        match_type = rng.choices(match_types, weights)[0]
+        pattern = ''
+        if match_type == 'regex':
+            # 模拟“关键词 + 联系方式”类广告正则
+            pattern = rf'{word}.{{0,10}}\d{{5,}}'
+
+        words.append({
+            'word': word,
+            'pattern': pattern,
+            'category': rng.choice(CATEGORIES),
+            'severity': rng.randint(1, 3),
+            'match_type': match_type,
+        })
+    return words
+
+
+def generate_text(rng, language, length):
+    """生成一段中文或英文合成文本"""
+    if language == 'zh':
+        parts = []
+        while sum(len(p) for p in parts) < length:
+            parts.append(random_cjk(rng, 4, 20))
+            parts.append(rng.choice(NOISE_CHARS))
+        return ''.join(parts)[:length]
+
+    words = []
+    while sum(len(w) + 1 for w in words) < length:
+        word = random_ascii(rng, 2, 9)
+        if rng.random() < 0.1:
+            word = word.capitalize()
+        words.append(word + (rng.choice(NOISE_CHARS) if rng.random() < 0.1 else ''))
+    return ' '.join(words)[:length]
+
+
+def insert_words(rng, text, lexicon, max_hits=3):
+    """在文本中随机插入少量违规词"""
+    for _ in range(rng.randint(0, max_hits)):
+        position = rng.randint(0, len(text))
+        text = text[:position] + rng.choice(lexicon)['word'] + text[position:]
+    return text
+
+
+def generate_posts(rng, lexicon, count, language, title_length=20, content_length=300):
+    """生成 (title, content) 形式的合成帖子，约一半帖子含违规词"""
+    posts = []
+    for _ in range(count):
+        title = generate_text(rng, language, title_length)
+        content = generate_text(rng, language, content_length)
+        if rng.random() < 0.5:
+            content = insert_words(rng, content, lexicon)
+        posts.append((title, content))
+    return posts
+
+
+class BenchmarkModerationService(TextModerationService):
+    """使用固定词库、不写审核日志的审核服务，用于隔离测量审核引擎本身"""
+
+    def __init__(self, lexicon):
+        super().__init__()
+        self._lexicon = lexicon
+
+    def _get_lexicon(self):
+        return self._lexicon
+
+    def _log_moderation(self, *args, **kwargs):
+        pass
+
+
+def percentile(sorted_values, q):
+    """从已排序的列表中取第q百分位"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def calibrate(loops=50000):
+    """测量一段与审核代码无关的固定纯Python计算的速度（次/秒），反映机器和解释器当前的速度"""
+    start = time.perf_counter()
+    counts = {}
+    for i in range(loops):
+        key = i % 1000
+        counts[key] = counts.get(key, 0) + len(str(i))
+    return loops / (time.perf_counter() - start)
+
+
+def run_case(words, posts, rounds=1):
+    """
+    测量一组词库和语料的审核性能
+
+    语料重复检测 rounds 轮，吞吐量取最快的一轮（减少其他进程干扰），延迟分布包含所有轮次。
+    每轮之前测量一次机器速度，relative_throughput 为每轮吞吐量与紧邻的机器速度之比
+    （每百万次计算可检测的帖子数）中最大的一个，用于在不同机器或负载下比较。
+
+    Returns:
+        dict: 构建耗时、峰值内存、帖子吞吐量、相对吞吐量、p50/p99延迟、标准化吞吐量
+    """
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    lexicon = CompiledLexicon(0, words)
+    build_ms = (time.perf_counter() - start) * 1000
+    service = BenchmarkModerationService(lexicon)
+    # 峰值内存包含词库编译和少量检测
+    for title, content in posts[:10]:
+        service.check_post(None, title, content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # 预热后测量吞吐量和延迟
+    for title, content in posts[:10]:
+        service.check_post(None, title, content)
+
+    timings = []
+    total = None
+    relative = None
+    for _ in range(rounds):
+        speed = calibrate()
+        blocked = 0
+        round_start = time.perf_counter()
+        for title, content in posts:
+            start = time.perf_counter()
+            is_valid, _, _ = service.check_post(None, title, content)
+            timings.append(time.perf_counter() - start)
+            blocked += not is_valid
+        elapsed = time.perf_counter() - round_start
+        total = elapsed if total is None else min(total, elapsed)
+        round_relative = len(posts) / elapsed / speed * 1000000
+        relative = round_relative if relative is None else max(relative, round_relative)
+    timings.sort()
+
+    texts = [text for post in posts for text in post]
+    normalize_total = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for text in texts:
+            normalize_text(text)
+        elapsed = time.perf_counter() - start
+        normalize_total = elapsed if normalize_total is None else min(normalize_total, elapsed)
+
+    return {
+        'build_ms': round(build_ms, 2),
+        'peak_memory_mb': round(peak / 1024 / 1024, 2),
+        'posts': len(posts),
+        'blocked': blocked,
+        'posts_per_sec': round(len(posts) / total, 1) if total else None,
+        'relative_throughput': round(relative, 2),
+        'p50_ms': round(percentile(timings, 50) * 1000, 4),
+        'p99_ms': round(percentile(timings, 99) * 1000, 4),
+        'normalize_per_sec': round(len(texts) / normalize_total, 1) if normalize_total else None,
+    }
@@ -0,0 +1,29 @@
+"""
+论坛的部署检查
+"""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# 只在当前进程内有效的缓存后端
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_version_cache(app_configs, **kwargs):
+    """ETag版本号和违规词库版本号保存在进程内缓存时，其他进程的修改不能立即生效"""
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        Warning(
+            '论坛读接口的ETag版本号和违规词库版本号保存在进程内缓存中：管理命令和其他工作进程'
+            '对帖子的修改最多要等 FORUM_VERSION_TTL 秒才会反映到304响应中，对违规词库的修改'
+            '（如 import_violation_words、init_violation_words）最多要等 MODERATION_VERSION_TTL 秒'
+            '才会在其他进程中生效',
+            hint='为 CACHES["default"] 配置Redis或Memcached等共享缓存',
+            id='forum.W001',
+        )
+    ]
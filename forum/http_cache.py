@@ -0,0 +1,122 @@
+"""
+论坛读接口的HTTP条件请求
+在默认缓存中为学校帖子列表、帖子、评论区和学校列表各保存一个版本号，写操作时递增。
+读接口用版本号（和当前用户、查询参数）计算ETag，客户端带 If-None-Match 且版本未变时
+只需一次缓存读取即可返回304，不再查询数据库和序列化数据。
+
+版本号只有保存在共享缓存（Redis、Memcached等）中，其他进程（管理命令、其他工作进程）的
+修改才能立即使ETag失效。版本号的有效期为 FORUM_VERSION_TTL 秒，到期后重新生成（递增不延长
+有效期），因此使用进程内缓存时，其他进程修改后的304响应最多持续这么长时间（见 forum.W001 检查）。
+"""
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_vary_headers
+
+VERSION_KEY_PREFIX = 'forum:version'
+
+DEFAULT_VERSION_TTL = 60
+
+# JWT令牌可能来自这些请求头，响应内容随当前用户变化
+AUTH_VARY_HEADERS = ('Authorization', 'X-Auth-Token', 'Cookie')
+
+
+def _version_key(scope, object_id):
+    return f'{VERSION_KEY_PREFIX}:{scope}:{object_id}'
+
+
+def school_scope(school_id):
+    """学校的帖子列表（帖子、计数和最新评论变化时都会变化）"""
+    return _version_key('school', school_id)
+
+
+def post_scope(post_id):
+    """帖子详情、点赞数和点赞列表"""
+    return _version_key('post', post_id)
+
+
+def comments_scope(post_id):
+    """帖子的评论区"""
+    return _version_key('comments', post_id)
+
+
+def schools_scope():
+    """学校列表"""
+    return _version_key('schools', 'all')
+
+
+def _version_ttl():
+    return getattr(settings, 'FORUM_VERSION_TTL', DEFAULT_VERSION_TTL)
+
+
+def _initial_version():
+    # 用毫秒时间戳初始化，缓存丢失后不会回退到客户端已见过的版本号
+    return int(time.time() * 1000)
+
+
+def get_versions(*keys):
+    """一次读取多个版本号，不存在的版本号就地初始化"""
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), _version_ttl())
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump(*keys):
+    """递增版本号，使对应读接口的ETag失效"""
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), _version_ttl())
+
+
+def touch_post(post_id, school_id, comments=False):
+    """帖子（及其评论区）发生变化"""
+    keys = [post_scope(post_id), school_scope(school_id)]
+    if comments:
+        keys.append(comments_scope(post_id))
+    bump(*keys)
+
+
+def touch_posts(post_ids, comments=False):
+    """批量修改帖子后使用（按帖子查询一次所属学校）"""
+    from .models import Post
+
+    post_ids = list(post_ids)
+    if not post_ids:
+        return
+    keys = set()
+    for post_id, school_id in Post.objects.filter(id__in=post_ids).values_list('id', 'school_id'):
+        keys.update((post_scope(post_id), school_scope(school_id)))
+        if comments:
+            keys.add(comments_scope(post_id))
+    bump(*keys)
+
+
+def make_etag(request, *versions):
+    """由版本号、当前用户和查询参数计算弱ETag"""
+    user = getattr(request, 'user', None)
+    user_id = getattr(user, 'id', None) or 0
+    raw = ':'.join(str(v) for v in versions) + f'|{user_id}|{request.GET.urlencode()}'
+    return f'W/"{hashlib.md5(raw.encode("utf-8")).hexdigest()}"'
+
+
+def conditional_read(request, etag, build_response):
+    """
+    ETag未变化时返回304，否则调用 build_response 生成完整响应
+
+    只为200响应设置ETag；响应随当前用户变化，只允许浏览器缓存，每次使用前都要重新验证。
+    """
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = build_response()
+        if response.status_code != 200:
+            return response
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, AUTH_VARY_HEADERS)
+    return response
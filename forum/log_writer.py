@@ -0,0 +1,166 @@
+"""
+审核日志异步批量写入器
+审核日志先放入内存队列，由后台线程按数量/时间阈值使用 bulk_create 批量写入数据库
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from django.conf import settings
+from django.db import connections
+from .models import ModerationLog
+
+logger = logging.getLogger(__name__)
+
+# 通知后台线程退出的哨兵对象
+_STOP = object()
+
+
+class ModerationLogWriter:
+    """审核日志异步批量写入器"""
+
+    def __init__(self, batch_size=None, flush_interval=None, max_queue_size=None, enabled=None):
+        self.batch_size = batch_size or getattr(settings, 'MODERATION_LOG_BATCH_SIZE', 100)
+        self.flush_interval = flush_interval or getattr(settings, 'MODERATION_LOG_FLUSH_INTERVAL', 2.0)
+        max_queue_size = max_queue_size or getattr(settings, 'MODERATION_LOG_QUEUE_SIZE', 10000)
+        # 关闭异步写入时直接同步写库（便于调试和测试）
+        self.enabled = enabled if enabled is not None else getattr(settings, 'MODERATION_LOG_ASYNC', True)
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._shutdown = False
+
+        # 统计计数器
+        self._enqueued = 0
+        self._written = 0
+        self._dropped = 0
+        self._failed = 0
+        self._flushes = 0
+
+    def enqueue(self, log):
+        """把一条未保存的审核日志放入写入队列"""
+        if not self.enabled or self._shutdown:
+            self._write([log])
+            return
+
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(log)
+            with self._lock:
+                self._enqueued += 1
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+            logger.warning("审核日志队列已满，丢弃一条日志")
+
+    def flush(self):
+        """在当前线程中立即写入队列里的全部日志"""
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                batch.append(item)
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def shutdown(self, timeout=5.0):
+        """停止后台线程，并写入剩余日志"""
+        with self._lock:
+            if self._shutdown:
+                return
+            self._shutdown = True
+            thread = self._thread
+
+        if thread is not None and thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            thread.join(timeout)
+
+        # 后台线程退出后仍可能有日志留在队列中
+        self.flush()
+
+    def stats(self):
+        """返回队列深度和写入统计"""
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'enqueued': self._enqueued,
+                'written': self._written,
+                'dropped': self._dropped,
+                'failed': self._failed,
+                'flushes': self._flushes,
+                'running': self._thread is not None and self._thread.is_alive(),
+            }
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            first_start = self._thread is None
+            self._thread = threading.Thread(
+                target=self._run,
+                name='moderation-log-writer',
+                daemon=True
+            )
+            self._thread.start()
+        if first_start:
+            # 进程退出时把队列中的日志写完
+            atexit.register(self.shutdown)
+
+    def _run(self):
+        while True:
+            batch, stop = self._next_batch()
+            if batch:
+                self._write(batch)
+                # 后台线程的数据库连接用完即关闭，避免长期占用
+                connections.close_all()
+            if stop:
+                break
+
+    def _next_batch(self):
+        """收集一批日志：达到批量大小或超过刷新间隔即返回"""
+        batch = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            timeout = self.flush_interval if deadline is None else deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                if batch:
+                    break
+                continue
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+        return batch, False
+
+    def _write(self, batch):
+        try:
+            ModerationLog.objects.bulk_create(batch, batch_size=self.batch_size)
+            with self._lock:
+                self._written += len(batch)
+                self._flushes += 1
+        except Exception as e:
+            with self._lock:
+                self._failed += len(batch)
+            logger.error(f"批量写入审核日志失败: {str(e)}")
+
+
+# 全局审核日志写入器
+moderation_log_writer = ModerationLogWriter()
@@ -0,0 +1,182 @@
+"""
+热点读接口并发性能测试的Django管理命令
+在进程内直接调用Django的ASGI处理器（与Daphne下的请求路径相同，不经过网络），
+用指定数量的并发客户端反复请求帖子列表、帖子详情、评论列表、聊天记录和打卡任务接口，
+统计每秒请求数和响应延迟
+"""
+import asyncio
+import time
+from urllib.parse import urlencode
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from accounts.models import User
+from chat.models import ChatMessage
+from forum.models import Post
+
+
+def _percentile(sorted_values, percent):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * percent / 100))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = '在ASGI下用大量并发客户端测试热点读接口的吞吐量和延迟'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clients',
+            type=int,
+            default=500,
+            help='并发客户端数量（默认500）',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=5000,
+            help='每个接口的总请求数',
+        )
+        parser.add_argument(
+            '--endpoints',
+            type=str,
+            default='posts,detail,comments,chat,checkins',
+            help='要测试的接口，逗号分隔（posts,detail,comments,chat,checkins）',
+        )
+        parser.add_argument(
+            '--revalidate',
+            action='store_true',
+            help='带上第一次响应的ETag发送条件请求（测试304路径）',
+        )
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            default=None,
+            help='发送请求的用户ID（默认取第一个用户）',
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(id=options['user_id']) if options['user_id'] else User.objects.order_by('id')
+        user = user.first()
+        if user is None:
+            raise CommandError('数据库中没有可用的用户，请先注册一个用户或指定 --user-id')
+
+        available = self._endpoints()
+        names = [name.strip() for name in options['endpoints'].split(',') if name.strip()]
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            raise CommandError(f"未知或没有测试数据的接口: {', '.join(unknown)}")
+
+        headers = [(b'authorization', f'Bearer {user.generate_token()}'.encode('ascii'))]
+        handler = ASGIHandler()
+
+        self.stdout.write(
+            f"并发客户端 {options['clients']}，每个接口 {options['requests']} 个请求"
+            f"{'（条件请求）' if options['revalidate'] else ''}"
+        )
+        self.stdout.write(f"{'接口':<10} {'请求/秒':>10} {'p50':>10} {'p99':>10} {'状态码':>12}")
+        for name in names:
+            path, query = available[name]
+            result = asyncio.run(self._run(
+                handler, path, query, headers, options['clients'], options['requests'], options['revalidate']
+            ))
+            self.stdout.write(
+                f"{name:<10} {result['rps']:>10.1f} {result['p50'] * 1000:>8.1f}ms "
+                f"{result['p99'] * 1000:>8.1f}ms {result['statuses']:>12}"
+            )
+
+    def _endpoints(self):
+        """{名称: (路径, 查询参数)}，只包含数据库中有测试数据的接口"""
+        endpoints = {'checkins': ('/checkin/checkins/', {})}
+        post = Post.objects.filter(status='approved').order_by('-comments_count', '-id').first()
+        if post is not None:
+            endpoints['posts'] = ('/forum/posts/', {'school_id': post.school_id})
+            endpoints['detail'] = (f'/forum/posts/{post.id}/', {})
+            endpoints['comments'] = (f'/forum/posts/{post.id}/comments/', {})
+        message = ChatMessage.objects.order_by('-id').first()
+        if message is not None:
+            endpoints['chat'] = (f'/chat/history/{message.room_name}/', {'limit': 50})
+        return endpoints
+
+    async def _run(self, handler, path, query, headers, clients, total, revalidate):
+        query_string = urlencode(query).encode('ascii')
+        request_headers = list(headers)
+
+        if revalidate:
+            status, etag, _ = await self._request(handler, path, query_string, request_headers)
+            if etag:
+                request_headers.append((b'if-none-match', etag))
+
+        remaining = [total]
+        latencies = []
+        statuses = {}
+
+        async def client():
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                status, _, elapsed = await self._request(handler, path, query_string, request_headers)
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+
+        # 关闭异步ORM在工作线程中打开的数据库连接
+        await sync_to_async(self._close_connections)()
+
+        latencies.sort()
+        return {
+            'rps': total / elapsed,
+            'p50': _percentile(latencies, 50),
+            'p99': _percentile(latencies, 99),
+            'statuses': ','.join(f'{status}x{count}' for status, count in sorted(statuses.items())),
+        }
+
+    async def _request(self, handler, path, query_string, headers):
+        """发送一个GET请求，返回 (状态码, ETag, 耗时)"""
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode('utf-8'),
+            'query_string': query_string,
+            'root_path': '',
+            'headers': [(b'host', b'localhost')] + headers,
+            'client': ('127.0.0.1', 50000),
+            'server': ('localhost', 8000),
+        }
+        disconnected = asyncio.Event()
+        sent_body = False
+
+        async def receive():
+            nonlocal sent_body
+            if not sent_body:
+                sent_body = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            # 请求处理完之前客户端不会断开
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        response = {}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+                headers = {name.lower(): value for name, value in message.get('headers', [])}
+                response['etag'] = headers.get(b'etag')
+
+        start = time.perf_counter()
+        await handler(scope, receive, send)
+        elapsed = time.perf_counter() - start
+        disconnected.set()
+        return response.get('status'), response.get('etag'), elapsed
+
+    @staticmethod
+    def _close_connections():
+        from django.db import connections
+        connections.close_all()
@@ -0,0 +1,106 @@
+"""
+违规词检测性能对比的Django管理命令
+对比逐词循环匹配与Aho-Corasick自动机匹配在不同词库规模下的耗时
+"""
+import random
+import re
+import time
+from django.core.management.base import BaseCommand
+from forum.benchmarks import generate_lexicon, generate_text, insert_words
+from forum.matchers import ViolationMatcher
+from forum.normalizer import fuzzy_strip, normalize_text
+
+
+class Command(BaseCommand):
+    help = '对比逐词循环与自动机两种违规词检测方式的性能'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=str,
+            default='1000,10000,100000',
+            help='词库规模，逗号分隔（默认 1000,10000,100000）',
+        )
+        parser.add_argument(
+            '--texts',
+            type=int,
+            default=50,
+            help='每种规模下检测的文本数量',
+        )
+        parser.add_argument(
+            '--length',
+            type=int,
+            default=300,
+            help='每条测试文本的长度（字符数）',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='随机数种子，保证结果可复现',
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+
+        self.stdout.write(
+            f"{'词库规模':>10} {'构建耗时':>12} {'循环匹配/条':>14} {'自动机/条':>12} {'加速比':>8}"
+        )
+
+        for size in sizes:
+            words = generate_lexicon(rng, size)
+            texts = [
+                normalize_text(
+                    insert_words(rng, generate_text(rng, 'zh', options['length']), words)
+                )
+                for _ in range(options['texts'])
+            ]
+
+            start = time.perf_counter()
+            matcher = ViolationMatcher(words)
+            build_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            linear_results = [self.linear_match(words, text) for text in texts]
+            linear_time = (time.perf_counter() - start) / len(texts)
+
+            start = time.perf_counter()
+            matcher_results = [matcher.match(text) for text in texts]
+            matcher_time = (time.perf_counter() - start) / len(texts)
+
+            if linear_results != matcher_results:
+                self.stdout.write(self.style.ERROR(f'词库规模 {size}: 两种方式的检测结果不一致'))
+
+            speedup = linear_time / matcher_time if matcher_time else float('inf')
+            self.stdout.write(
+                f'{size:>10} {build_time * 1000:>10.1f}ms {linear_time * 1000:>12.3f}ms '
+                f'{matcher_time * 1000:>10.3f}ms {speedup:>7.1f}x'
+            )
+
+    def linear_match(self, words, normalized_text):
+        """原有的逐词循环匹配方式（词使用与文本相同的标准化规则）"""
+        hits = []
+        fuzzy_text = fuzzy_strip(normalized_text)
+        for index, word_data in enumerate(words):
+            word = normalize_text(word_data['word'])
+            match_type = word_data['match_type']
+            pattern = word_data.get('pattern', '')
+
+            if match_type == 'exact':
+                is_violation = word == normalized_text
+            elif match_type == 'contains':
+                is_violation = word in normalized_text
+            elif match_type == 'regex' and pattern:
+                try:
+                    is_violation = bool(re.search(pattern, normalized_text, re.IGNORECASE))
+                except re.error:
+                    is_violation = False
+            elif match_type == 'fuzzy':
+                is_violation = fuzzy_strip(word) in fuzzy_text
+            else:
+                is_violation = False
+
+            if is_violation:
+                hits.append(index)
+        return hits
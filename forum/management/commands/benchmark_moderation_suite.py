@@ -0,0 +1,194 @@
+"""
+审核引擎基准测试与性能回归检查的Django管理命令
+在不同规模的合成词库和中英文语料上测量 check_post 吞吐量、p50/p99延迟、
+文本标准化速度和峰值内存，结果写入JSON，并可与基线结果对比
+
+仓库中提交了一份基线结果（forum/benchmark_baseline.json），--check 按基线的配置重新测量并对比，
+forum.tests 中的回归测试也会执行该检查。比较的是按机器速度换算的相对吞吐量（见 run_case），
+不同机器上的结果也可以对比。
+修改审核引擎后如性能有意变化，用 --output forum/benchmark_baseline.json 按同样的配置重新生成基线。
+"""
+import json
+import os
+import platform
+import random
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from forum.benchmarks import generate_lexicon, generate_posts, run_case
+
+# 仓库中提交的基线结果
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'benchmark_baseline.json')
+
+# 按基线重新测量时沿用的配置项
+BASELINE_OPTIONS = ('sizes', 'languages', 'posts', 'length', 'seed', 'rounds')
+
+
+class Command(BaseCommand):
+    help = '审核引擎基准测试，可与基线结果对比检查性能回归'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=str,
+            default='1000,10000,100000',
+            help='词库规模，逗号分隔（默认 1000,10000,100000）',
+        )
+        parser.add_argument(
+            '--languages',
+            type=str,
+            default='zh,en',
+            help='语料语言，逗号分隔（zh、en）',
+        )
+        parser.add_argument(
+            '--posts',
+            type=int,
+            default=500,
+            help='每组测试的帖子数量',
+        )
+        parser.add_argument(
+            '--length',
+            type=int,
+            default=300,
+            help='每条帖子内容的长度（字符数）',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='随机数种子，保证结果可复现',
+        )
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=3,
+            help='每组语料重复检测的轮数，吞吐量取最快的一轮',
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='结果JSON文件路径',
+        )
+        parser.add_argument(
+            '--baseline',
+            type=str,
+            help='基线结果JSON文件路径，用于检查性能回归',
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='按仓库中基线结果（forum/benchmark_baseline.json）的配置测量并检查性能回归',
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.2,
+            help='允许的吞吐量下降比例（默认0.2，即下降超过20%%视为回归）',
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            options['baseline'] = options['baseline'] or DEFAULT_BASELINE
+            baseline = self.load_baseline(options['baseline'])
+            for name in BASELINE_OPTIONS:
+                if name in baseline['meta']:
+                    options[name] = baseline['meta'][name]
+
+        sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        languages = [lang.strip() for lang in options['languages'].split(',') if lang.strip()]
+        for language in languages:
+            if language not in ('zh', 'en'):
+                raise CommandError(f'不支持的语料语言: {language}')
+
+        self.stdout.write(
+            f"{'词库规模':>10} {'语言':>4} {'构建耗时':>10} {'峰值内存':>10} "
+            f"{'帖子/秒':>10} {'p50':>10} {'p99':>10} {'标准化/秒':>12}"
+        )
+
+        results = []
+        for size in sizes:
+            # 同一规模下各语言使用同一词库，种子固定保证每次运行数据一致
+            rng = random.Random(f"{options['seed']}-{size}")
+            words = generate_lexicon(rng, size)
+            for language in languages:
+                posts = generate_posts(
+                    rng, words, options['posts'], language, content_length=options['length']
+                )
+                result = {'lexicon_size': size, 'language': language}
+                result.update(run_case(words, posts, rounds=options['rounds']))
+                results.append(result)
+                self.stdout.write(
+                    f"{size:>10} {language:>6} {result['build_ms']:>10.1f}ms "
+                    f"{result['peak_memory_mb']:>8.1f}MB {result['posts_per_sec']:>12.1f} "
+                    f"{result['p50_ms']:>8.3f}ms {result['p99_ms']:>8.3f}ms "
+                    f"{result['normalize_per_sec']:>14.1f}"
+                )
+
+        report = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'sizes': ','.join(str(size) for size in sizes),
+                'languages': ','.join(languages),
+                'seed': options['seed'],
+                'posts': options['posts'],
+                'length': options['length'],
+                'rounds': options['rounds'],
+            },
+            'results': results,
+        }
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(f"结果已写入: {options['output']}")
+
+        if options['baseline']:
+            self.check_regressions(report, options['baseline'], options['threshold'])
+
+    def load_baseline(self, baseline_path):
+        try:
+            with open(baseline_path, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            raise CommandError(f'基线文件不存在: {baseline_path}')
+        except json.JSONDecodeError as e:
+            raise CommandError(f'基线文件格式错误: {str(e)}')
+        baseline.setdefault('meta', {})
+        return baseline
+
+    def check_regressions(self, report, baseline_path, threshold):
+        """
+        与基线对比吞吐量，任一组下降超过阈值时以非零状态退出
+
+        两次结果都有相对吞吐量（按机器速度换算）时比较相对吞吐量，否则比较帖子/秒。
+        """
+        baseline = self.load_baseline(baseline_path)
+        baseline_results = {
+            (item['lexicon_size'], item['language']): item
+            for item in baseline.get('results', [])
+        }
+
+        regressions = []
+        for result in report['results']:
+            key = (result['lexicon_size'], result['language'])
+            base = baseline_results.get(key)
+            metric = 'relative_throughput' if base and base.get('relative_throughput') else 'posts_per_sec'
+            if not base or not base.get(metric):
+                self.stdout.write(self.style.WARNING(f'基线中没有 {key[0]}/{key[1]} 的结果，跳过'))
+                continue
+
+            change = result[metric] / base[metric] - 1
+            line = (
+                f"  {key[0]}/{key[1]}: {base[metric]:.1f} -> {result[metric]:.1f} "
+                f"{'（相对吞吐量）' if metric == 'relative_throughput' else '帖子/秒'}（{change:+.1%}）"
+            )
+            if change < -threshold:
+                regressions.append(line)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+
+        if regressions:
+            raise CommandError(f'{len(regressions)} 组测试吞吐量下降超过 {threshold:.0%}')
+        self.stdout.write(self.style.SUCCESS('未发现性能回归'))
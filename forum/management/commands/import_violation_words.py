@@ -3,8 +3,15 @@
 """
 import json
 import csv
+import re
+import time
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from forum.models import ViolationWord
+from forum.matchers import compile_pattern
+
+# 流式导入时更新已有违规词的字段
+UPSERT_UPDATE_FIELDS = ['category', 'severity', 'match_type', 'pattern', 'updated_at']
 
 
 class Command(BaseCommand):
@@ -24,13 +31,26 @@ class Command(BaseCommand):
             default='csv',
             help='文件格式（csv或json）',
         )
+        parser.add_argument(
+            '--stream',
+            action='store_true',
+            help='流式批量导入：分块读取，在单个事务中批量写入（适合大词库）',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='流式导入时每批写入的行数',
+        )
 
     def handle(self, *args, **options):
         file_path = options['file']
         file_format = options['format']
         
         try:
-            if file_format == 'csv':
+            if options['stream']:
+                self.import_streaming(file_path, file_format, options['chunk_size'])
+            elif file_format == 'csv':
                 self.import_from_csv(file_path)
             elif file_format == 'json':
                 self.import_from_json(file_path)
@@ -140,6 +160,137 @@ class Command(BaseCommand):
         
         self.print_summary(created_count, updated_count, error_count)
 
+    def import_streaming(self, file_path, file_format, chunk_size):
+        """流式批量导入：分块读取文件，每批按词去重后使用 bulk_create 批量插入或更新"""
+        self.stdout.write(f'正在流式导入{file_format.upper()}文件: {file_path}')
+        start = time.perf_counter()
+        
+        counts = {'created': 0, 'updated': 0, 'duplicate': 0}
+        error_count = 0
+        row_count = 0
+        
+        with open(file_path, 'r', encoding='utf-8') as f:
+            rows = csv.DictReader(f) if file_format == 'csv' else self.iter_json_array(f)
+            
+            with transaction.atomic():
+                # 一次性预加载导入前已有的违规词，之后在内存中判断新增还是更新
+                existing = set(ViolationWord.objects.values_list('word', flat=True))
+                imported = set()
+                chunk = {}
+                
+                for row in rows:
+                    row_count += 1
+                    try:
+                        word_obj = self.build_word(row)
+                    except (ValueError, KeyError, AttributeError, TypeError, re.error) as e:
+                        error_count += 1
+                        self.stdout.write(f'✗ 错误: {row} - {str(e)}')
+                        continue
+                    
+                    # 同一批中重复的词以最后一次出现为准
+                    if word_obj.word in chunk:
+                        counts['duplicate'] += 1
+                    chunk[word_obj.word] = word_obj
+                    
+                    if len(chunk) >= chunk_size:
+                        self.write_chunk(chunk, existing, imported, counts)
+                        chunk = {}
+                
+                if chunk:
+                    self.write_chunk(chunk, existing, imported, counts)
+        
+        elapsed = time.perf_counter() - start
+        rate = row_count / elapsed if elapsed > 0 else 0
+        self.stdout.write(f'共读取 {row_count} 行，耗时 {elapsed:.2f} 秒（{rate:.0f} 行/秒）')
+        if counts['duplicate']:
+            self.stdout.write(f'重复的违规词: {counts["duplicate"]} 行（以最后一次出现为准）')
+        self.print_summary(counts['created'], counts['updated'], error_count)
+
+    def build_word(self, row):
+        """把一行数据转换为未保存的ViolationWord对象"""
+        word = row['word'].strip()
+        if not word:
+            raise ValueError('违规词不能为空')
+        
+        match_type = row.get('match_type') or 'contains'
+        pattern = row.get('pattern') or ''
+        if match_type == 'regex':
+            compile_pattern(pattern)
+        
+        # 严重程度可以是0，只有缺失或为空（CSV中的空列）时使用默认值
+        severity = row.get('severity')
+        if severity is None or severity == '':
+            severity = 2
+        
+        return ViolationWord(
+            word=word,
+            category=row.get('category') or 'other',
+            severity=int(severity),
+            match_type=match_type,
+            pattern=pattern,
+            is_active=True
+        )
+
+    def write_chunk(self, chunk, existing, imported, counts):
+        """
+        批量写入一批已去重的违规词，已存在的词更新类别、严重程度、匹配方式和正则
+        
+        每个词只计数一次：导入前已存在的计为更新，否则计为新增；在之前的批次中
+        已写入的词计为重复。
+        """
+        for word in chunk:
+            if word in imported:
+                counts['duplicate'] += 1
+            elif word in existing:
+                counts['updated'] += 1
+            else:
+                counts['created'] += 1
+        imported.update(chunk)
+        ViolationWord.objects.bulk_create(
+            list(chunk.values()),
+            update_conflicts=True,
+            unique_fields=['word'],
+            update_fields=UPSERT_UPDATE_FIELDS
+        )
+
+    def iter_json_array(self, f, buffer_size=65536):
+        """逐个解析JSON数组中的对象，避免一次性把整个文件读入内存"""
+        decoder = json.JSONDecoder()
+        whitespace = re.compile(r'[\s,]*')
+        buffer = ''
+        pos = 0
+        started = False
+        eof = False
+        
+        while True:
+            # 跳过空白和分隔符
+            pos = whitespace.match(buffer, pos).end()
+            if pos < len(buffer):
+                if not started:
+                    if buffer[pos] != '[':
+                        raise ValueError('JSON文件的顶层必须是数组')
+                    started = True
+                    pos += 1
+                    continue
+                if buffer[pos] == ']':
+                    return
+                try:
+                    item, pos = decoder.raw_decode(buffer, pos)
+                    yield item
+                    continue
+                except json.JSONDecodeError:
+                    # 对象可能被截断在缓冲区末尾，继续读取
+                    if eof:
+                        raise
+            elif eof:
+                return
+            
+            data = f.read(buffer_size)
+            if not data:
+                eof = True
+            buffer = buffer[pos:] + data
+            pos = 0
+    
     def print_summary(self, created_count, updated_count, error_count):
         """打印导入摘要"""
         self.stdout.write(
@@ -0,0 +1,25 @@
+"""
+重建帖子全文检索索引的Django管理命令
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from forum.search import post_search_index
+
+
+class Command(BaseCommand):
+    help = '重建帖子全文检索索引（仅SQLite）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='每次从数据库读取的帖子数量',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('全文检索索引只支持SQLite数据库')
+
+        total = post_search_index.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'全文检索索引重建完成！共索引 {total} 个帖子'))
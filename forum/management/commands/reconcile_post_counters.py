@@ -0,0 +1,79 @@
+"""
+修正帖子点赞数和评论数冗余计数的Django管理命令
+按实际的点赞记录和未删除评论重新统计，只更新计数不一致的帖子
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, Q
+from forum.http_cache import touch_posts
+from forum.models import Post
+
+
+class Command(BaseCommand):
+    help = '按实际点赞和评论修正帖子的冗余计数'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='每批检查的帖子数量',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='只统计不一致的帖子，不修改数据库',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+        checked = 0
+        fixed = 0
+        last_id = 0
+
+        while True:
+            # 按主键分块统计实际计数，避免一次聚合全表
+            ids = list(
+                Post.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            last_id = ids[-1]
+            checked += len(ids)
+
+            drifted = list(
+                Post.objects.filter(id__in=ids)
+                .annotate(
+                    actual_likes=Count('likes', distinct=True),
+                    actual_comments=Count('comments', filter=Q(comments__is_deleted=False), distinct=True)
+                )
+                .exclude(likes_count=F('actual_likes'), comments_count=F('actual_comments'))
+                .only('id', 'likes_count', 'comments_count')
+            )
+            if not drifted:
+                continue
+
+            for post in drifted:
+                if options['verbosity'] > 1:
+                    self.stdout.write(
+                        f'  帖子 {post.id}: 点赞 {post.likes_count} -> {post.actual_likes}，'
+                        f'评论 {post.comments_count} -> {post.actual_comments}'
+                    )
+                post.likes_count = post.actual_likes
+                post.comments_count = post.actual_comments
+            fixed += len(drifted)
+
+            if not dry_run:
+                Post.objects.bulk_update(drifted, ['likes_count', 'comments_count'], batch_size=chunk_size)
+                # 计数出现在帖子列表和详情中，使这些帖子的ETag失效
+                touch_posts([post.id for post in drifted])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'帖子计数检查完成！'
+                f'\n检查: {checked} 个帖子'
+                f'\n{"需要修正" if dry_run else "已修正"}: {fixed} 个帖子'
+            )
+        )
+        if dry_run:
+            self.stdout.write(self.style.WARNING('试运行模式，未修改数据库'))
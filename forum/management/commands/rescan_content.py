@@ -0,0 +1,133 @@
+"""
+使用当前违规词库重新审核存量帖子和评论的Django管理命令
+"""
+import json
+import os
+import time
+from django.core.management.base import BaseCommand
+from forum.rescan import ContentRescanner
+
+
+class Command(BaseCommand):
+    help = '使用当前违规词库重新审核存量帖子和评论'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target',
+            type=str,
+            choices=['posts', 'comments', 'all'],
+            default='all',
+            help='重新审核的内容类型（posts、comments或all）',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='每次从数据库读取的行数',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='并行检测的进程数，1表示不使用进程池',
+        )
+        parser.add_argument(
+            '--after-post-id',
+            type=int,
+            default=0,
+            help='从该帖子ID之后开始处理',
+        )
+        parser.add_argument(
+            '--after-comment-id',
+            type=int,
+            default=0,
+            help='从该评论ID之后开始处理',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            type=str,
+            help='进度文件路径，每处理完一块记录最后处理的ID',
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='从进度文件记录的位置继续处理',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='只检测并统计，不修改数据库',
+        )
+
+    def handle(self, *args, **options):
+        self.checkpoint_path = options['checkpoint']
+        self.checkpoint = {'post': options['after_post_id'], 'comment': options['after_comment_id']}
+
+        if options['resume']:
+            if not self.checkpoint_path:
+                self.stdout.write(self.style.ERROR('--resume 需要同时指定 --checkpoint'))
+                return
+            self.load_checkpoint()
+
+        self.started_at = time.time()
+        target = options['target']
+
+        with ContentRescanner(
+            workers=options['workers'],
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run'],
+            progress=self.report_progress
+        ) as rescanner:
+            self.stdout.write(
+                f'违规词库版本: {rescanner.lexicon.version}，共 {len(rescanner.lexicon)} 个违规词'
+            )
+
+            if target in ('posts', 'all'):
+                self.stdout.write(f"开始重新审核帖子（从ID {self.checkpoint['post']} 之后）")
+                stats = rescanner.rescan_posts(start_after=self.checkpoint['post'])
+                self.print_summary('帖子', stats)
+
+            if target in ('comments', 'all'):
+                self.stdout.write(f"开始重新审核评论（从ID {self.checkpoint['comment']} 之后）")
+                stats = rescanner.rescan_comments(start_after=self.checkpoint['comment'])
+                self.print_summary('评论', stats)
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('试运行模式，未修改数据库'))
+
+    def report_progress(self, kind, stats, last_id):
+        """每处理完一块输出进度并记录断点"""
+        self.checkpoint[kind] = last_id
+        self.save_checkpoint()
+
+        elapsed = time.time() - self.started_at
+        rate = stats['scanned'] / elapsed if elapsed > 0 else 0
+        self.stdout.write(
+            f"  已处理 {stats['scanned']} 条，拒绝 {stats['blocked']} 条，恢复 {stats['restored']} 条，"
+            f"最后ID {last_id}（{rate:.0f} 条/秒）"
+        )
+
+    def load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                self.checkpoint.update(json.load(f))
+            self.stdout.write(f'已从进度文件恢复: {self.checkpoint}')
+        except FileNotFoundError:
+            self.stdout.write(self.style.WARNING(f'进度文件不存在，从头开始: {self.checkpoint_path}'))
+
+    def save_checkpoint(self):
+        if not self.checkpoint_path:
+            return
+        with open(self.checkpoint_path, 'w', encoding='utf-8') as f:
+            json.dump(self.checkpoint, f)
+
+    def print_summary(self, label, stats):
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{label}重新审核完成！'
+                f'\n检测: {stats["scanned"]} 条'
+                f'\n拒绝: {stats["blocked"]} 条'
+                f'\n恢复: {stats["restored"]} 条'
+                f'\n审核日志: {stats["logs"]} 条'
+            )
+        )
@@ -0,0 +1,292 @@
+"""
+违规词多模式匹配器
+把违规词库编译成Aho-Corasick自动机，一次扫描文本即可找出所有命中的违规词
+"""
+import re
+import logging
+from .normalizer import normalize_text, normalize_forms, fuzzy_strip
+
+
+logger = logging.getLogger(__name__)
+
+# 达到该严重程度的违规词会导致内容被拒绝
+BLOCK_SEVERITY = 2
+
+# 每个合并正则中容纳的模式数量
+REGEX_BANK_CHUNK_SIZE = 100
+
+# 含反向引用或条件分组的模式合并后分组编号会错位，只能单独编译
+UNBANKABLE_RE = re.compile(r'\\[1-9]|\(\?P=|\(\?\(')
+
+
+def compile_pattern(pattern):
+    """编译违规词正则表达式，无效时抛出 re.error"""
+    return re.compile(pattern, re.IGNORECASE)
+
+
+class AhoCorasickAutomaton:
+    """Aho-Corasick多模式匹配自动机"""
+
+    def __init__(self):
+        # 状态0为根节点
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        self._output_link = [0]
+        self._built = False
+
+    def __len__(self):
+        return len(self._goto)
+
+    def add(self, key, value):
+        """添加一个模式串，命中时返回value"""
+        state = 0
+        for ch in key:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._output_link.append(0)
+            state = next_state
+        self._output[state].append(value)
+        self._built = False
+
+    def build(self):
+        """按广度优先顺序计算失败指针和输出链接"""
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        output_link = self._output_link
+
+        queue = list(goto[0].values())
+        for state in queue:
+            fail[state] = 0
+            output_link[state] = 0
+
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for ch, child in goto[state].items():
+                queue.append(child)
+                fallback = fail[state]
+                while fallback and ch not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[child] = goto[fallback].get(ch, 0)
+                # 输出链接指向最近的、本身有输出的失败祖先
+                target = fail[child]
+                output_link[child] = target if output[target] else output_link[target]
+
+        self._built = True
+
+    def find_all(self, text):
+        """扫描一次文本，返回所有命中模式对应的value集合"""
+        if not self._built:
+            self.build()
+
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        output_link = self._output_link
+
+        found = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            hit = state if output[state] else output_link[state]
+            while hit:
+                found.update(output[hit])
+                hit = output_link[hit]
+        return found
+
+
+class RegexBank:
+    """
+    预编译的正则表达式库
+
+    每个模式被包装成可选的前瞻命名分组 (?:(?=[\\s\\S]*?(?P<rN>模式)))?，
+    多个模式合并为一个正则，从文本开头 match() 一次即可得到所有命中的模式。
+    无法合并的模式（命名分组、反向引用、局部标志等）单独编译；无法编译的模式被丢弃。
+    """
+
+    def __init__(self, entries, chunk_size=REGEX_BANK_CHUNK_SIZE):
+        self._banks = []
+        self._standalone = []
+        self.invalid = []
+
+        bankable = []
+        for value, pattern in entries:
+            try:
+                compiled = compile_pattern(pattern)
+            except re.error as e:
+                self.invalid.append((value, pattern, str(e)))
+                continue
+
+            if compiled.groupindex or UNBANKABLE_RE.search(pattern) or not self._compiles(self._wrap('r0', pattern)):
+                self._standalone.append((value, compiled))
+            else:
+                bankable.append((value, pattern, compiled))
+
+        for start in range(0, len(bankable), chunk_size):
+            self._add_bank(bankable[start:start + chunk_size])
+
+        if self.invalid:
+            logger.warning(f"跳过 {len(self.invalid)} 个无法编译的违规词正则表达式")
+
+    def __len__(self):
+        return sum(len(groups) for _, groups in self._banks) + len(self._standalone)
+
+    @staticmethod
+    def _wrap(name, pattern):
+        """把单个模式包装成可选的前瞻命名分组"""
+        return f'(?:(?=[\\s\\S]*?(?P<{name}>{pattern})))?'
+
+    @staticmethod
+    def _compiles(pattern):
+        try:
+            compile_pattern(pattern)
+            return True
+        except re.error:
+            return False
+
+    def _add_bank(self, chunk):
+        groups = {}
+        parts = []
+        for value, pattern, compiled in chunk:
+            name = f'r{len(groups)}'
+            groups[name] = value
+            parts.append(self._wrap(name, pattern))
+
+        try:
+            self._banks.append((compile_pattern('\\A' + ''.join(parts)), groups))
+        except re.error:
+            # 合并失败时退回逐条匹配，保证结果正确
+            self._standalone.extend((value, compiled) for value, _, compiled in chunk)
+
+    def find_all(self, text):
+        """扫描文本，返回所有命中模式对应的value集合"""
+        found = set()
+        for bank, groups in self._banks:
+            match = bank.match(text)
+            for name, group in match.groupdict().items():
+                if group is not None:
+                    found.add(groups[name])
+        for value, compiled in self._standalone:
+            if compiled.search(text):
+                found.add(value)
+        return found
+
+
+class ViolationMatcher:
+    """
+    编译后的违规词匹配器
+
+    contains/fuzzy 类型的词分别进入两个自动机，exact 类型的词放入字典，
+    regex 类型的词编译进正则库。match() 返回命中词在词库中的下标（保持词库顺序）。
+    """
+
+    def __init__(self, words):
+        self.words = list(words)
+        self._exact = {}
+        self._contains = AhoCorasickAutomaton()
+        self._fuzzy = AhoCorasickAutomaton()
+        # 空模式串对任意文本都成立，单独记录
+        self._always = []
+        regex_entries = []
+
+        for index, word_data in enumerate(self.words):
+            match_type = word_data['match_type']
+            # 词库中的词和文本使用同一套标准化规则
+            word = normalize_text(word_data['word'])
+
+            if match_type == 'exact':
+                self._exact.setdefault(word, []).append(index)
+            elif match_type == 'contains':
+                if word:
+                    self._contains.add(word, index)
+                else:
+                    self._always.append(index)
+            elif match_type == 'fuzzy':
+                fuzzy_word = fuzzy_strip(word)
+                if fuzzy_word:
+                    self._fuzzy.add(fuzzy_word, index)
+                else:
+                    self._always.append(index)
+            elif match_type == 'regex' and word_data.get('pattern'):
+                regex_entries.append((index, word_data['pattern']))
+
+        self._contains.build()
+        self._fuzzy.build()
+        # 没有模糊匹配词时不必生成模糊匹配文本
+        self._has_fuzzy = len(self._fuzzy) > 1
+        self._regex = RegexBank(regex_entries)
+
+    def __len__(self):
+        return len(self.words)
+
+    def match(self, normalized_text, fuzzy_text=None):
+        """
+        返回命中的违规词下标列表（按词库顺序）
+
+        Args:
+            normalized_text: normalize_text() 处理后的文本
+            fuzzy_text: 模糊匹配文本，未提供时由 normalized_text 生成
+        """
+        hits = set(self._always)
+        hits.update(self._exact.get(normalized_text, ()))
+        hits.update(self._contains.find_all(normalized_text))
+        if self._has_fuzzy:
+            if fuzzy_text is None:
+                fuzzy_text = fuzzy_strip(normalized_text)
+            hits.update(self._fuzzy.find_all(fuzzy_text))
+        hits.update(self._regex.find_all(normalized_text))
+        return sorted(hits)
+
+
+class CompiledLexicon:
+    """
+    进程内编译好的违规词库
+
+    持有自动机、正则库以及按词库下标排列的词/类别/严重程度数组，
+    version 对应共享缓存中的词库版本号。
+    """
+
+    def __init__(self, version, words):
+        self.version = version
+        self.matcher = ViolationMatcher(words)
+        self.words = [w['word'] for w in words]
+        self.categories = [w['category'] for w in words]
+        self.severities = [w['severity'] for w in words]
+        self.match_types = [w['match_type'] for w in words]
+
+    def __len__(self):
+        return len(self.words)
+
+    def find_violations(self, normalized_text, fuzzy_text=None):
+        """返回命中的违规词信息列表"""
+        return [
+            {
+                'word': self.words[index],
+                'category': self.categories[index],
+                'severity': self.severities[index],
+                'match_type': self.match_types[index]
+            }
+            for index in self.matcher.match(normalized_text, fuzzy_text)
+        ]
+
+    def check_text(self, text):
+        """检查单个文本，返回 (is_valid, violations_list)"""
+        if not text or not text.strip():
+            return True, []
+
+        # 标准化文本和模糊匹配文本每次检测只生成一次
+        violations = self.find_violations(*normalize_forms(text))
+
+        # 根据严重程度判断是否拒绝
+        is_valid = not any(v['severity'] >= BLOCK_SEVERITY for v in violations)
+        return is_valid, violations
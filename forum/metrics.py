@@ -0,0 +1,90 @@
+"""
+轻量级延迟统计
+按固定桶记录耗时分布，用于估算p50/p99，不依赖外部监控组件
+"""
+import bisect
+import threading
+
+
+# 桶上界（毫秒），最后一个桶收集所有更慢的请求
+DEFAULT_BUCKETS_MS = (
+    0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000
+)
+
+
+class LatencyHistogram:
+    """固定桶的耗时直方图（线程安全）"""
+
+    def __init__(self, buckets_ms=DEFAULT_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self._counts = [0] * (len(self.buckets_ms) + 1)
+        self._count = 0
+        self._sum_ms = 0.0
+        self._max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        """记录一次耗时（秒）"""
+        ms = seconds * 1000
+        index = bisect.bisect_left(self.buckets_ms, ms)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum_ms += ms
+            if ms > self._max_ms:
+                self._max_ms = ms
+
+    def percentile(self, q):
+        """返回第q百分位所在桶的上界（毫秒），无数据时返回None"""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._count
+            max_ms = self._max_ms
+        if not total:
+            return None
+
+        target = total * q / 100
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if seen >= target and count:
+                return self.buckets_ms[index] if index < len(self.buckets_ms) else max_ms
+        return max_ms
+
+    def snapshot(self):
+        """返回可直接序列化为JSON的统计结果"""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._count
+            sum_ms = self._sum_ms
+            max_ms = self._max_ms
+
+        labels = [f'<={bound}ms' for bound in self.buckets_ms] + [f'>{self.buckets_ms[-1]}ms']
+        return {
+            'count': total,
+            'avg_ms': round(sum_ms / total, 4) if total else None,
+            'max_ms': round(max_ms, 4) if total else None,
+            'p50_ms': self.percentile(50),
+            'p99_ms': self.percentile(99),
+            'buckets': {label: count for label, count in zip(labels, counts) if count},
+        }
+
+
+class LatencyRecorder:
+    """按类别（如内容类型）分别维护耗时直方图"""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, seconds):
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, LatencyHistogram())
+        histogram.record(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            items = list(self._histograms.items())
+        return {key: histogram.snapshot() for key, histogram in items}
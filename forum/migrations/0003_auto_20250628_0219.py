@@ -11,23 +11,29 @@ class Migration(migrations.Migration):
         ('forum', '0002_violationword_post_auto_approved_and_more'),
     ]
 
+    # 0001_initial 重新生成后已经包含 PostTag（含联合唯一约束），这里只更新迁移状态，
+    # 否则在空数据库上执行时会重复建表
     operations = [
-        migrations.CreateModel(
-            name='PostTag',
-            fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='添加时间')),
-                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_tags', to='forum.post', verbose_name='帖子')),
-                ('interest_tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='accounts.interesttag', verbose_name='兴趣标签')),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='PostTag',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='添加时间')),
+                        ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_tags', to='forum.post', verbose_name='帖子')),
+                        ('interest_tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='accounts.interesttag', verbose_name='兴趣标签')),
+                    ],
+                    options={
+                        'verbose_name': '帖子标签',
+                        'verbose_name_plural': '帖子标签',
+                        'ordering': ['-created_at'],
+                    },
+                ),
+                migrations.AlterUniqueTogether(
+                    name='posttag',
+                    unique_together={('post', 'interest_tag')},
+                ),
             ],
-            options={
-                'verbose_name': '帖子标签',
-                'verbose_name_plural': '帖子标签',
-                'ordering': ['-created_at'],
-            },
-        ),
-        migrations.AlterUniqueTogether(
-            name='posttag',
-            unique_together={('post', 'interest_tag')},
         ),
     ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:24
+
+from django.db import migrations, models
+
+
+def remove_duplicate_words(apps, schema_editor):
+    """同一个违规词只保留最新的一条，为唯一约束做准备"""
+    ViolationWord = apps.get_model('forum', 'ViolationWord')
+    seen = set()
+    for word_id, word in ViolationWord.objects.order_by('-updated_at', '-id').values_list('id', 'word'):
+        if word in seen:
+            ViolationWord.objects.filter(id=word_id).delete()
+        else:
+            seen.add(word)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0004_postcomment_postlike'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_words, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='violationword',
+            name='word',
+            field=models.CharField(max_length=200, unique=True, verbose_name='违规词/模式'),
+        ),
+    ]
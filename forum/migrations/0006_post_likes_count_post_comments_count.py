@@ -0,0 +1,44 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:02
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    """按现有的点赞和未删除评论初始化计数"""
+    Post = apps.get_model('forum', 'Post')
+    PostLike = apps.get_model('forum', 'PostLike')
+    PostComment = apps.get_model('forum', 'PostComment')
+
+    likes = PostLike.objects.filter(post=OuterRef('pk')).order_by().values('post').annotate(
+        total=Count('id')
+    ).values('total')
+    comments = PostComment.objects.filter(post=OuterRef('pk'), is_deleted=False).order_by().values(
+        'post'
+    ).annotate(total=Count('id')).values('total')
+    Post.objects.update(
+        likes_count=Coalesce(Subquery(likes), 0),
+        comments_count=Coalesce(Subquery(comments), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0005_violationword_word_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='点赞数'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='评论数'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:40
+
+import re
+from django.db import migrations
+
+FTS_TABLE = 'forum_post_fts'
+
+CJK_CHAR_RE = re.compile('([\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff])')
+
+
+def segment(text):
+    """在每个中日韩字符两侧加零宽空格，使其成为独立词元"""
+    return CJK_CHAR_RE.sub('\u200b\\1\u200b', text or '')
+
+
+def create_search_index(apps, schema_editor):
+    """在SQLite上创建FTS5帖子检索表并写入现有帖子（其他数据库使用原有的模糊查询）"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    Post = apps.get_model('forum', 'Post')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+            f'USING fts5(title, content, author, tokenize="unicode61")'
+        )
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE}(rowid, title, content, author) VALUES (%s, %s, %s, %s)',
+            [(post_id, segment(title), segment(content), segment(author))
+             for post_id, title, content, author in Post.objects.values_list('id', 'title', 'content', 'author')]
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0006_post_likes_count_post_comments_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:20
+
+import re
+from django.db import migrations
+
+# 迁移只使用这里的分词和建表代码，forum.search 以后的修改不影响本迁移的结果
+FTS_TABLE = 'forum_post_fts'
+
+CJK_RANGES = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff'
+CJK_RUN_RE = re.compile(f'[{CJK_RANGES}]+')
+TOKEN_RUN_RE = re.compile(f'[{CJK_RANGES}]+|[^\\W{CJK_RANGES}]+')
+DICTIONARY_WORD_RE = re.compile(r'^\w{2,}$')
+
+
+def tokenize(text):
+    """连续的中日韩字符切成bigram并补上最后一个字，其他字母数字整段保留"""
+    tokens = []
+    for run in TOKEN_RUN_RE.findall(text or ''):
+        if CJK_RUN_RE.match(run) and len(run) > 1:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            tokens.append(run[-1])
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def dictionary_words(words, *texts):
+    """文本中出现的词典词（按字母顺序）"""
+    text = '\n'.join(t.lower() for t in texts if t)
+    return sorted(word for word in words if word in text)
+
+
+def rebuild_search_index(apps, schema_editor):
+    """按二元组和词典词重建FTS5帖子检索表（仅SQLite）"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    Post = apps.get_model('forum', 'Post')
+    InterestTag = apps.get_model('accounts', 'InterestTag')
+    School = apps.get_model('accounts', 'School')
+
+    words = set(InterestTag.objects.filter(is_active=True).values_list('name', flat=True))
+    words.update(School.objects.values_list('name', flat=True))
+    words = {word.lower() for word in words if DICTIONARY_WORD_RE.match(word or '')}
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+            f'USING fts5(title, content, author, words, tokenize="unicode61")'
+        )
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE}(rowid, title, content, author, words) VALUES (%s, %s, %s, %s, %s)',
+            [(post_id, ' '.join(tokenize(title)), ' '.join(tokenize(content)), ' '.join(tokenize(author)),
+              ' '.join(dictionary_words(words, title, content, author)))
+             for post_id, title, content, author in Post.objects.values_list('id', 'title', 'content', 'author')]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_interesttag_user_interests_selected_and_more'),
+        ('forum', '0007_post_fts_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_hot_query_indexes'),
+        ('forum', '0008_post_fts_bigram_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['school', 'status', '-time', '-id'], name='forum_post_school_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['user', '-time', '-id'], name='forum_post_user_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['status', '-time'], name='forum_post_status_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postcomment',
+            index=models.Index(condition=models.Q(('is_deleted', False), ('parent__isnull', True)), fields=['post', '-created_at', '-id'], name='forum_comment_top_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postcomment',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['post', '-created_at', '-id'], name='forum_comment_post_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postcomment',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['parent', '-created_at', '-id'], name='forum_comment_parent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postlike',
+            index=models.Index(fields=['post', '-created_at'], name='forum_like_post_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postlike',
+            index=models.Index(fields=['user', 'post'], name='forum_like_user_post_idx'),
+        ),
+    ]
@@ -1,6 +1,10 @@
 from django.db import models
+from django.core.exceptions import ValidationError
+from django.db.models.functions import Coalesce
 from accounts.models import School, User
+from .matchers import compile_pattern
 import json
+import re
 
 # Create your models here.
 
@@ -24,14 +28,44 @@ class Post(models.Model):
     reject_reason = models.TextField(verbose_name='拒绝原因', blank=True)
     auto_approved = models.BooleanField(default=False, verbose_name='自动审核通过')
     moderation_result = models.CharField(max_length=50, blank=True, verbose_name='审核结果详情')
+    # 冗余计数，点赞/评论时用F()表达式原子更新，可用 reconcile_post_counters 命令修正
+    likes_count = models.PositiveIntegerField(default=0, verbose_name='点赞数')
+    comments_count = models.PositiveIntegerField(default=0, verbose_name='评论数')
     
     class Meta:
         verbose_name = '论坛帖子'
         verbose_name_plural = '论坛帖子'
         ordering = ['-time']
+        indexes = [
+            # 学校帖子列表：school_id + status 过滤，按 (time, id) 倒序分页
+            models.Index(fields=['school', 'status', '-time', '-id'], name='forum_post_school_feed_idx'),
+            # 我的帖子
+            models.Index(fields=['user', '-time', '-id'], name='forum_post_user_time_idx'),
+            # 管理员按状态查看帖子：status 过滤，按 (time, id) 倒序分页
+            models.Index(fields=['status', '-time', '-id'], name='forum_post_status_feed_idx'),
+        ]
         
     def __str__(self):
         return self.title
+    
+    @classmethod
+    def refresh_counters(cls, post_ids):
+        """按实际的点赞和未删除评论重新计算指定帖子的计数"""
+        likes = PostLike.objects.filter(post=models.OuterRef('pk')).order_by().values('post').annotate(
+            total=models.Count('id')
+        ).values('total')
+        comments = PostComment.objects.filter(post=models.OuterRef('pk'), is_deleted=False).order_by().values(
+            'post'
+        ).annotate(total=models.Count('id')).values('total')
+        updated = cls.objects.filter(id__in=post_ids).update(
+            likes_count=Coalesce(models.Subquery(likes), 0),
+            comments_count=Coalesce(models.Subquery(comments), 0)
+        )
+
+        # 批量修改评论后调用，同时使这些帖子和评论区的ETag失效
+        from .http_cache import touch_posts
+        touch_posts(post_ids, comments=True)
+        return updated
         
     def to_dict(self, user=None):
         return {
@@ -44,8 +78,8 @@ class Post(models.Model):
             'status': self.status,
             'status_display': self.get_status_display(),
             'tags': [tag.to_dict() for tag in self.post_tags.all()],
-            'likes_count': self.likes.count(),
-            'comments_count': self.comments.filter(is_deleted=False).count(),
+            'likes_count': self.likes_count,
+            'comments_count': self.comments_count,
             'user_liked': self.likes.filter(user=user).exists() if user else False,
             'recent_comments': [comment.to_dict() for comment in self.comments.filter(is_deleted=False)[:3]]
         }
@@ -93,7 +127,7 @@ class ViolationWord(models.Model):
         ('other', '其他违规')
     ]
     
-    word = models.CharField(max_length=200, verbose_name='违规词/模式')
+    word = models.CharField(max_length=200, unique=True, verbose_name='违规词/模式')
     pattern = models.TextField(blank=True, verbose_name='正则表达式')
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES, verbose_name='违规类别')
     severity = models.IntegerField(default=2, verbose_name='严重程度', 
@@ -112,6 +146,17 @@ class ViolationWord(models.Model):
     def __str__(self):
         return f"{self.word} ({self.get_category_display()})"
     
+    def clean(self):
+        """校验正则表达式，无法编译的模式不允许保存"""
+        if self.match_type != 'regex':
+            return
+        if not self.pattern:
+            raise ValidationError({'pattern': '正则表达式匹配方式必须填写正则表达式'})
+        try:
+            compile_pattern(self.pattern)
+        except re.error as e:
+            raise ValidationError({'pattern': f'正则表达式无效: {str(e)}'})
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -197,6 +242,12 @@ class PostLike(models.Model):
         verbose_name_plural = '帖子点赞'
         unique_together = ('post', 'user')  # 防止重复点赞
         ordering = ['-created_at']
+        indexes = [
+            # 帖子的点赞列表
+            models.Index(fields=['post', '-created_at'], name='forum_like_post_time_idx'),
+            # 当前用户在一页帖子中点赞过哪些
+            models.Index(fields=['user', 'post'], name='forum_like_user_post_idx'),
+        ]
         
     def __str__(self):
         return f"{self.user.username} 赞了 {self.post.title}"
@@ -225,6 +276,26 @@ class PostComment(models.Model):
         verbose_name = '帖子评论'
         verbose_name_plural = '帖子评论'
         ordering = ['-created_at']
+        indexes = [
+            # 帖子的顶级评论列表（部分索引，只包含未删除的顶级评论）
+            models.Index(
+                fields=['post', '-created_at', '-id'],
+                condition=models.Q(parent__isnull=True, is_deleted=False),
+                name='forum_comment_top_idx'
+            ),
+            # 每个帖子的最新评论、每条评论的最新回复和回复数
+            # （布尔条件在SQLite中生成 NOT is_deleted 而不是等值比较，放在部分索引的条件中才能用上）
+            models.Index(
+                fields=['post', '-created_at', '-id'],
+                condition=models.Q(is_deleted=False),
+                name='forum_comment_post_idx'
+            ),
+            models.Index(
+                fields=['parent', '-created_at', '-id'],
+                condition=models.Q(is_deleted=False),
+                name='forum_comment_parent_idx'
+            ),
+        ]
         
     def __str__(self):
         return f"{self.user.username} 评论了 {self.post.title}"
@@ -1,20 +1,43 @@
 """
 文本内容审核服务
-用于检测帖子内容中的违规词汇
+用于检测帖子、评论和聊天消息中的违规词汇
+同步接口供HTTP视图使用，异步接口供WebSocket消费者使用
+
+编译好的词库保存在各进程内，默认缓存中只保存词库版本号。版本号的有效期为
+MODERATION_VERSION_TTL 秒，到期后重新生成（递增不延长有效期），各进程随之重建词库。
+使用进程内缓存时，管理命令或其他进程修改词库后，最多这么长时间生效（见 forum.W001 检查）。
 """
-import re
-import json
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from django.core.cache import cache
 from django.conf import settings
 from .models import ViolationWord, ModerationLog
+from .matchers import CompiledLexicon
+from .log_writer import moderation_log_writer
+from .metrics import LatencyRecorder
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VERSION_TTL = 300
 
 
 class TextModerationService:
     """文本内容审核服务"""
     
     def __init__(self):
-        self.cache_timeout = getattr(settings, 'MODERATION_CACHE_TIMEOUT', 3600)
-        self.cache_key = 'violation_words_cache'
+        # 缓存中只保存词库版本号，编译好的词库保存在各进程内
+        self.version_key = 'violation_words_version'
+        self._lexicon = None
+        self._lexicon_lock = threading.Lock()
+        # 异步接口使用的专用线程池，保证事件循环不被匹配计算阻塞
+        self.executor_workers = getattr(settings, 'MODERATION_EXECUTOR_WORKERS', 2)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        # 按内容类型统计检测耗时
+        self.latency = LatencyRecorder()
     
     def check_post(self, user, title, content):
         """
@@ -73,11 +96,11 @@ class TextModerationService:
     
     def check_text(self, text, content_type='content'):
         """
-        检查单个文本内容
+        检查单个文本内容（同步接口）
         
         Args:
             text: 要检查的文本
-            content_type: 内容类型 ('title' 或 'content')
+            content_type: 内容类型 ('title'、'content'、'comment' 或 'chat')，用于耗时统计
             
         Returns:
             tuple: (is_valid, violations_list)
@@ -85,103 +108,71 @@ class TextModerationService:
         if not text or not text.strip():
             return True, []
         
-        # 文本预处理
-        normalized_text = self._normalize_text(text)
-        
-        # 获取违规词库
-        violation_words = self._get_violation_words()
+        start = time.perf_counter()
+        try:
+            # 使用编译后的违规词库，一次扫描找出所有命中词
+            return self._get_lexicon().check_text(text)
+        finally:
+            self.latency.record(content_type, time.perf_counter() - start)
+    
+    async def acheck_text(self, text, content_type='chat'):
+        """
+        检查单个文本内容（异步接口）
         
-        violations = []
+        匹配计算在专用线程池中执行。计算耗时记录在 content_type 下，
+        包含线程切换开销的端到端耗时记录在 "<content_type>_async" 下。
+        """
+        if not text or not text.strip():
+            return True, []
         
-        for word_data in violation_words:
-            is_violation = False
-            word = word_data['word']
-            match_type = word_data['match_type']
-            pattern = word_data.get('pattern', '')
-            
-            try:
-                if match_type == 'exact':
-                    is_violation = self._exact_match(normalized_text, word)
-                elif match_type == 'contains':
-                    is_violation = self._contains_match(normalized_text, word)
-                elif match_type == 'regex' and pattern:
-                    is_violation = self._regex_match(normalized_text, pattern)
-                elif match_type == 'fuzzy':
-                    is_violation = self._fuzzy_match(normalized_text, word)
-                
-                if is_violation:
-                    violations.append({
-                        'word': word,
-                        'category': word_data['category'],
-                        'severity': word_data['severity'],
-                        'match_type': match_type
-                    })
-                    
-            except Exception as e:
-                # 记录检测错误，但不阻止发帖
-                print(f"检测违规词时发生错误: {word} - {str(e)}")
-                continue
-        
-        # 根据严重程度判断是否拒绝
-        is_valid = not any(v['severity'] >= 2 for v in violations)
-        
-        return is_valid, violations
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_executor(), self.check_text, text, content_type)
+        finally:
+            self.latency.record(f'{content_type}_async', time.perf_counter() - start)
+    
+    def _get_executor(self):
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.executor_workers,
+                        thread_name_prefix='moderation'
+                    )
+        return self._executor
+    
+    def latency_stats(self):
+        """返回各内容类型的检测耗时分布"""
+        return self.latency.snapshot()
     
     def _get_violation_words(self):
-        """获取违规词库（带缓存）"""
-        cached_words = cache.get(self.cache_key)
-        if cached_words is not None:
-            return cached_words
-        
-        # 从数据库获取激活的违规词
+        """从数据库获取激活的违规词"""
         words = ViolationWord.objects.filter(is_active=True).values(
             'word', 'pattern', 'category', 'severity', 'match_type'
         )
-        words_list = list(words)
-        
-        # 缓存结果
-        cache.set(self.cache_key, words_list, self.cache_timeout)
-        
-        return words_list
+        return list(words)
     
-    def _normalize_text(self, text):
-        """文本标准化处理"""
-        if not text:
-            return ""
-        
-        # 转换为小写
-        text = text.lower()
-        
-        # 移除多余的空白字符
-        text = re.sub(r'\s+', ' ', text)
-        
-        # 移除常见的干扰字符
-        text = re.sub(r'[\.。,，!！?？;；:：\-_\+\*#@&%\$]', '', text)
-        
-        return text.strip()
-    
-    def _exact_match(self, text, word):
-        """精确匹配"""
-        return word.lower() == text
-    
-    def _contains_match(self, text, word):
-        """包含匹配"""
-        return word.lower() in text
+    def _version_ttl(self):
+        return getattr(settings, 'MODERATION_VERSION_TTL', DEFAULT_VERSION_TTL)
     
-    def _regex_match(self, text, pattern):
-        """正则表达式匹配"""
-        try:
-            return bool(re.search(pattern, text, re.IGNORECASE))
-        except re.error:
-            return False
+    def _get_version(self):
+        """获取缓存中的词库版本号（不存在或已过期时初始化）"""
+        # 用毫秒时间戳初始化，避免缓存丢失后版本号回退到旧值
+        return cache.get_or_set(self.version_key, lambda: int(time.time() * 1000), self._version_ttl())
     
-    def _fuzzy_match(self, text, word):
-        """模糊匹配（处理变形词）"""
-        # 移除可能的干扰字符后再匹配
-        fuzzy_text = re.sub(r'[^\w\u4e00-\u9fff]', '', text)
-        fuzzy_word = re.sub(r'[^\w\u4e00-\u9fff]', '', word.lower())
-        
-        return fuzzy_word in fuzzy_text
+    def _get_lexicon(self):
+        """获取编译后的违规词库，版本号变化时重建"""
+        version = self._get_version()
+        lexicon = self._lexicon
+        if lexicon is not None and lexicon.version == version:
+            return lexicon
+        
+        with self._lexicon_lock:
+            # 其他线程可能已经完成重建
+            if self._lexicon is None or self._lexicon.version != version:
+                self._lexicon = CompiledLexicon(version, self._get_violation_words())
+            return self._lexicon
     
     def _get_primary_violation_category(self, violations):
         """获取主要违规类别（按严重程度）"""
@@ -223,31 +214,34 @@ class TextModerationService:
         return f"发布失败：{', '.join(messages)}。请修改后重新发布。"
     
     def _log_moderation(self, user, content_type, original_content, detected_words, action, violation_category):
-        """记录审核日志"""
+        """记录审核日志（放入异步写入队列，由后台线程批量写库）"""
         try:
-            log = ModerationLog.objects.create(
+            log = ModerationLog(
                 user=user,
                 content_type=content_type,
                 original_content=original_content,
                 action=action,
                 violation_category=violation_category
             )
-            # 设置检测到的违规词
+            # 设置检测到的违规词（写库前设置，避免额外的UPDATE）
             log.set_detected_words_list(detected_words)
-            log.save()
+            moderation_log_writer.enqueue(log)
         except Exception as e:
-            print(f"记录审核日志失败: {str(e)}")
+            logger.error("记录审核日志失败: %s", e)
     
     def clear_cache(self):
-        """清除违规词缓存"""
-        cache.delete(self.cache_key)
+        """使违规词缓存失效（递增版本号，各进程在下次检测时重建词库）"""
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            # 版本号不存在时直接初始化
+            self._get_version()
     
     @classmethod
     def refresh_cache(cls):
-        """刷新违规词缓存"""
-        service = cls()
-        service.clear_cache()
-        service._get_violation_words()
+        """刷新违规词缓存，并重建当前进程的词库"""
+        moderation_service.clear_cache()
+        moderation_service._get_lexicon()
 
 
 # 全局审核服务实例
@@ -0,0 +1,96 @@
+"""
+审核文本标准化
+用预先计算的转换表一次完成全角转半角、繁体转简体和干扰字符删除，
+每次检测只生成一次标准化文本和模糊匹配文本，供所有匹配器共用
+"""
+import re
+
+
+# 标准化时删除的干扰字符（半角和全角）
+NOISE_CHARS = '.。,，!！?？;；:：-_+*#@&%$'
+
+# 模糊匹配时需要剔除的干扰字符
+FUZZY_STRIP_RE = re.compile(r'[^\w\u4e00-\u9fff]')
+
+# 常用繁体字到简体字的单字映射（只收录一对一且无歧义的字）
+TRADITIONAL_PAIRS = (
+    '國国 學学 會会 說说 們们 這这 來来 時时 個个 為为 後后 對对 開开 關关 與与 無无 見见 發发 經经 動动 '
+    '還还 現现 點点 過过 體体 長长 電电 問问 題题 氣气 當当 實实 從从 業业 頭头 應应 區区 總总 條条 證证 '
+    '資资 統统 東东 車车 門门 馬马 鳥鸟 魚鱼 龍龙 書书 語语 話话 讀读 寫写 聽听 買买 賣卖 錢钱 銀银 鐵铁 '
+    '號号 萬万 億亿 幾几 麼么 嗎吗 塊块 歲岁 師师 親亲 愛爱 嚴严 亂乱 黨党 團团 軍军 戰战 殺杀 槍枪 彈弹 '
+    '黃黄 賭赌 販贩 騙骗 詐诈 網网 絡络 聯联 繫系 係系 費费 價价 貨货 幣币 獎奖 際际 務务 員员 報报 紙纸 '
+    '載载 傳传 權权 義义 產产 選选 舉举 議议 論论 辦办 職职 責责 護护 衛卫 導导 領领 顯显 響响 險险 隊队 '
+    '陽阳 陰阴 蘭兰 習习 歡欢 樂乐 禮礼 藝艺 術术 醫医 藥药 療疗 補补 調调 鬥斗 爭争 殘残 讓让 認认 識识 '
+    '計计 設设 許许 訴诉 試试 誰谁 談谈 請请 謝谢 讚赞 貴贵 質质 購购 賺赚 贈赠 輸输 轉转 較较 運运 達达 '
+    '遠远 邊边 鄉乡 針针 錯错 鐘钟 閱阅 陳陈 隨随 難难 雞鸡 離离 雲云 靈灵 頁页 順顺 須须 風风 飛飞 飯饭 '
+    '館馆 驗验 髮发 鬧闹 麗丽 齊齐 齒齿 廣广 張张 徵征 恥耻 惡恶 態态 慶庆 憂忧 懷怀 戲戏 擊击 據据 擁拥 '
+    '擇择 擔担 敵敌 數数 斷断 歷历 曆历 曬晒 極极 構构 標标 樣样 橋桥 機机 檢检 歸归 決决 沒没 溝沟 滅灭 '
+    '漢汉 潔洁 濟济 烏乌 煙烟 熱热 爾尔 牆墙 獨独 獲获 環环 畫画 盜盗 監监 盡尽 眾众 確确 種种 穩稳 競竞 '
+    '筆笔 節节 範范 簡简 糧粮 紀纪 約约 紅红 級级 終终 組组 結结 給给 絕绝 絲丝 綠绿 維维 線线 練练 縣县 '
+    '織织 續续 罰罚 罵骂 聖圣 聲声 肅肃 腦脑 膽胆 臉脸 興兴 舊旧 艦舰 華华 葉叶 蒼苍 蓋盖 蕩荡 蟲虫 衝冲 '
+    '裝装 規规 視视 覺觉 觀观 記记 訓训 詞词 詩诗 該该 誌志 誤误 課课 賊贼 賽赛 趙赵 跡迹 蹤踪 軟软 輕轻 '
+    '農农 連连 週周 進进 遊游 遲迟 適适 遺遗 邏逻 醜丑 釋释 鈔钞 錄录 鍵键 鎮镇 閃闪 閉闭 間间 闆板 陸陆 '
+    '隱隐 雙双 雜杂 靜静 項项 預预 頓顿 頻频 顏颜 類类 願愿 飽饱 養养 餓饿 騎骑 驚惊 髒脏 魯鲁 鮮鲜 鹽盐 '
+    '麥麦 齡龄 嬰婴 婦妇 媽妈 孫孙 寧宁 寶宝 將将 專专 尋寻 層层 屬属 嶺岭 帥帅 帶带 幫帮 彎弯 復复 複复 '
+    '徹彻 憶忆 戶户 拋抛 捨舍 掃扫 換换 擺摆 攝摄 敗败 啟启 歐欧 殼壳 滿满 漲涨 災灾 燈灯 爺爷 狀状 猶犹 '
+    '獸兽 畢毕 異异 瘋疯 盤盘 碼码 礦矿 禍祸 窮穷 竊窃 細细 緊紧 編编 罷罢 聞闻 膚肤 臺台 颱台 蘇苏 處处 '
+    '蝦虾 襲袭 訂订 詳详 誘诱 豐丰 貓猫 貝贝 負负 財财 貧贫 貸贷 賀贺 賓宾 賠赔 賴赖 贏赢 趕赶 躍跃 軌轨 '
+    '辭辞 郵邮 鄰邻 醬酱 鋼钢 錶表 闊阔 陣阵 雖虽 韓韩 頂顶 飄飘 驅驱 鬆松 黴霉 龜龟 製制 準准 鬱郁 傷伤 '
+    '優优 邁迈 壞坏 壓压 戀恋 聰聪 勝胜 勞劳 勢势 協协 單单 圍围 圖图 場场 壇坛 夢梦 夠够 奪夺 審审 屍尸 '
+    '島岛 幹干 廳厅 徑径 揚扬 搶抢 擴扩 攤摊 斃毙 晉晋 暫暂 棄弃 毀毁 漁渔 滾滚 灣湾 燒烧 癮瘾 礙碍 穀谷 '
+    '窩窝 縮缩 脅胁 藍蓝 虛虚 訊讯 評评 詭诡 謀谋 謊谎 譯译 變变 貪贪 賄贿 賂赂 贓赃 輪轮 辯辩 違违 鄭郑 '
+    '鎖锁 韋韦 騷骚 齋斋 賤贱 妳你'
+).split()
+
+
+def _build_table():
+    table = {}
+    # 全角ASCII字符转半角，全角空格转半角空格
+    for code in range(0xFF01, 0xFF5F):
+        table[code] = chr(code - 0xFEE0)
+    table[0x3000] = ' '
+    # 繁体转简体
+    for pair in TRADITIONAL_PAIRS:
+        table[ord(pair[0])] = pair[1]
+    # 转换后是干扰字符的一律删除
+    for code, value in table.items():
+        if value in NOISE_CHARS:
+            table[code] = None
+    for ch in NOISE_CHARS:
+        table[ord(ch)] = None
+    return table
+
+
+NORMALIZE_TABLE = _build_table()
+
+# 非ASCII文本逐字符查字典较慢，改用匹配转换表中字符的正则只处理需要转换的字符
+_FOLD_MAP = {chr(code): value or '' for code, value in NORMALIZE_TABLE.items()}
+_FOLD_RE = re.compile('[' + ''.join(re.escape(ch) for ch in sorted(_FOLD_MAP)) + ']')
+
+
+def _fold_match(match):
+    return _FOLD_MAP[match.group()]
+
+
+def normalize_text(text):
+    """文本标准化：转小写、全角转半角、繁体转简体、移除干扰字符、合并空白"""
+    if not text:
+        return ""
+    text = text.lower()
+    # 一次扫描完成逐字符转换和删除，split/join 合并并去掉首尾空白
+    if text.isascii():
+        text = text.translate(NORMALIZE_TABLE)
+    else:
+        text = _FOLD_RE.sub(_fold_match, text)
+    return ' '.join(text.split())
+
+
+def fuzzy_strip(text):
+    """移除模糊匹配中的干扰字符"""
+    return FUZZY_STRIP_RE.sub('', text)
+
+
+def normalize_forms(text):
+    """返回 (标准化文本, 模糊匹配文本)，同一次检测中的所有匹配器共用"""
+    normalized = normalize_text(text)
+    return normalized, fuzzy_strip(normalized)
@@ -0,0 +1,136 @@
+"""
+帖子详情页渲染
+模板（htmls/post_template.html）在每个进程中只读取和解析一次，切分为固定文本和占位符，
+渲染时按顺序拼接。渲染结果放在有容量上限的LRU缓存中，帖子被修改或删除时失效，
+响应带 ETag 和 Last-Modified，浏览器可以用条件请求避免重复下载。
+"""
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from django.conf import settings
+
+# 模板中的占位符
+PLACEHOLDER_RE = re.compile(r'\{\{(title|author|time|post_id|content)\}\}')
+
+
+def template_path():
+    return getattr(settings, 'POST_TEMPLATE_PATH', os.path.join(settings.BASE_DIR, 'htmls', 'post_template.html'))
+
+
+class CompiledTemplate:
+    """切分好的模板：parts 中偶数位置是固定文本，奇数位置是占位符名称"""
+
+    def __init__(self, text):
+        self.parts = PLACEHOLDER_RE.split(text)
+        # 模板内容的指纹，模板变化后所有页面的ETag随之变化
+        self.fingerprint = hashlib.md5(text.encode('utf-8')).hexdigest()[:12]
+
+    def render(self, context):
+        parts = self.parts[:]
+        for index in range(1, len(parts), 2):
+            parts[index] = context[parts[index]]
+        return ''.join(parts)
+
+
+def page_context(post):
+    return {
+        'title': post.title,
+        'author': post.author,
+        'time': post.time.strftime('%Y-%m-%d %H:%M'),
+        'post_id': str(post.id),
+        'content': post.content,
+    }
+
+
+def page_etag(post, template):
+    """由模板指纹和页面用到的帖子字段计算ETag（不需要先渲染页面）"""
+    digest = hashlib.md5(template.fingerprint.encode('ascii'))
+    for value in page_context(post).values():
+        digest.update(value.encode('utf-8'))
+        digest.update(b'\0')
+    return f'"{digest.hexdigest()}"'
+
+
+def page_last_modified(post):
+    """帖子没有单独的修改时间，取发布时间和审核时间中较晚的一个"""
+    if post.reviewed_time and post.reviewed_time > post.time:
+        return post.reviewed_time
+    return post.time
+
+
+class PostPageRenderer:
+    """帖子详情页渲染器（进程内缓存编译后的模板和渲染结果）"""
+
+    def __init__(self, max_pages=None):
+        self.max_pages = max_pages
+        self._template = None
+        self._template_mtime = None
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _max_pages(self):
+        if self.max_pages is not None:
+            return self.max_pages
+        return getattr(settings, 'POST_PAGE_CACHE_SIZE', 256)
+
+    def get_template(self):
+        """
+        返回编译后的模板
+
+        DEBUG模式下检查模板文件的修改时间，修改后重新编译；否则每个进程只读取一次。
+        """
+        template = self._template
+        if template is not None and not settings.DEBUG:
+            return template
+
+        path = template_path()
+        mtime = os.path.getmtime(path)
+        if template is None or mtime != self._template_mtime:
+            with open(path, 'r', encoding='utf-8') as f:
+                template = CompiledTemplate(f.read())
+            with self._lock:
+                self._template = template
+                self._template_mtime = mtime
+                self._pages.clear()
+        return template
+
+    def render(self, post):
+        """
+        渲染帖子详情页
+
+        Returns:
+            tuple: (html, etag)
+        """
+        template = self.get_template()
+        etag = page_etag(post, template)
+
+        with self._lock:
+            cached = self._pages.get(post.id)
+            if cached is not None and cached[0] == etag:
+                self._pages.move_to_end(post.id)
+                return cached[1], etag
+
+        html = template.render(page_context(post))
+
+        with self._lock:
+            self._pages[post.id] = (etag, html)
+            self._pages.move_to_end(post.id)
+            while len(self._pages) > self._max_pages():
+                self._pages.popitem(last=False)
+        return html, etag
+
+    def invalidate(self, post_id):
+        with self._lock:
+            self._pages.pop(post_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+            self._template = None
+            self._template_mtime = None
+
+
+# 全局帖子详情页渲染器
+post_page_renderer = PostPageRenderer()
@@ -0,0 +1,244 @@
+"""
+存量内容批量重新审核
+按主键分块（keyset分页）流式读取帖子和评论，用编译后的违规词库重新检测，
+并批量写回状态变化和审核日志。可选使用进程池并行检测。
+"""
+from concurrent.futures import ProcessPoolExecutor
+from .http_cache import touch_posts
+from .matchers import CompiledLexicon
+
+# 进程池子进程中的违规词库（由 _init_worker 初始化）
+_worker_lexicon = None
+
+# 重新审核拒绝/恢复的帖子使用的审核结果标记
+RESCAN_BLOCKED = 'rescan_blocked'
+RESCAN_APPROVED = 'rescan_approved'
+
+
+def _init_worker(version, words):
+    """进程池初始化：在子进程中编译违规词库"""
+    global _worker_lexicon
+    _worker_lexicon = CompiledLexicon(version, words)
+
+
+def _scan_batch(items, lexicon=None):
+    """
+    检测一批内容
+
+    Args:
+        items: [(id, [text, ...]), ...]
+
+    Returns:
+        list: [(id, [(is_valid, violations), ...]), ...]
+    """
+    lexicon = lexicon or _worker_lexicon
+    return [(item_id, [lexicon.check_text(text) for text in texts]) for item_id, texts in items]
+
+
+class ContentRescanner:
+    """存量帖子和评论的批量重新审核"""
+
+    def __init__(self, workers=0, chunk_size=500, dry_run=False, progress=None):
+        """
+        Args:
+            workers: 进程池大小，0或1表示在当前进程中检测
+            chunk_size: 每次从数据库读取的行数
+            dry_run: 只检测不写库
+            progress: 每处理完一块调用 progress(kind, stats, last_id)
+        """
+        from .moderation import moderation_service
+
+        self.lexicon = moderation_service._get_lexicon()
+        self.service = moderation_service
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.progress = progress
+        self._pool = None
+
+        if workers > 1:
+            self._pool = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(self.lexicon.version, self.lexicon.matcher.words)
+            )
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def rescan_posts(self, queryset=None, start_after=0):
+        """重新审核帖子：违规的帖子改为拒绝，之前被重新审核拒绝但现已合规的帖子恢复通过"""
+        from .models import Post
+
+        if queryset is None:
+            queryset = Post.objects.all()
+
+        stats = {'scanned': 0, 'blocked': 0, 'restored': 0, 'logs': 0}
+        fields = ('id', 'title', 'content', 'status', 'moderation_result', 'user_id')
+        for rows in self._iter_chunks(queryset, fields, start_after):
+            results = self._scan([(row[0], [row[1], row[2]]) for row in rows])
+            self._apply_post_results(rows, results, stats)
+            stats['scanned'] += len(rows)
+            if self.progress:
+                self.progress('post', stats, rows[-1][0])
+        return stats
+
+    def rescan_comments(self, queryset=None, start_after=0):
+        """重新审核评论：违规的评论被软删除"""
+        from .models import PostComment
+
+        if queryset is None:
+            queryset = PostComment.objects.all()
+        queryset = queryset.filter(is_deleted=False)
+
+        stats = {'scanned': 0, 'blocked': 0, 'restored': 0, 'logs': 0}
+        fields = ('id', 'content', 'post_id', 'user_id')
+        for rows in self._iter_chunks(queryset, fields, start_after):
+            results = self._scan([(row[0], [row[1]]) for row in rows])
+            self._apply_comment_results(rows, results, stats)
+            stats['scanned'] += len(rows)
+            if self.progress:
+                self.progress('comment', stats, rows[-1][0])
+        return stats
+
+    def _iter_chunks(self, queryset, fields, start_after):
+        """按主键递增的keyset分页，每次读取 chunk_size 行"""
+        last_id = start_after
+        while True:
+            rows = list(
+                queryset.filter(id__gt=last_id).order_by('id').values_list(*fields)[:self.chunk_size]
+            )
+            if not rows:
+                break
+            yield rows
+            last_id = rows[-1][0]
+
+    def _scan(self, items):
+        """检测一块内容，返回 {id: [(is_valid, violations), ...]}"""
+        if self._pool is None:
+            return dict(_scan_batch(items, self.lexicon))
+
+        # 把一块内容均分给各个子进程
+        size = max(1, -(-len(items) // self.workers))
+        batches = [items[i:i + size] for i in range(0, len(items), size)]
+        results = {}
+        for batch_result in self._pool.map(_scan_batch, batches):
+            results.update(batch_result)
+        return results
+
+    def _apply_post_results(self, rows, results, stats):
+        from django.utils import timezone
+        from .models import Post, ModerationLog
+
+        now = timezone.now()
+        changed_posts = []
+        logs = []
+
+        for post_id, title, content, status, moderation_result, user_id in rows:
+            (title_valid, title_violations), (content_valid, content_violations) = results[post_id]
+            violations = title_violations + content_violations
+
+            if not (title_valid and content_valid):
+                if status == 'rejected':
+                    continue
+                changed_posts.append(Post(
+                    id=post_id,
+                    status='rejected',
+                    reject_reason=self.service._generate_error_message(violations),
+                    moderation_result=RESCAN_BLOCKED,
+                    reviewed_time=now
+                ))
+                stats['blocked'] += 1
+                action = 'blocked'
+            elif status == 'rejected' and moderation_result == RESCAN_BLOCKED:
+                changed_posts.append(Post(
+                    id=post_id,
+                    status='approved',
+                    reject_reason='',
+                    moderation_result=RESCAN_APPROVED,
+                    reviewed_time=now
+                ))
+                stats['restored'] += 1
+                action = 'approved'
+            else:
+                continue
+
+            if user_id is None:
+                continue
+
+            if title_violations and content_violations:
+                content_type = 'both'
+            elif content_violations:
+                content_type = 'content'
+            else:
+                content_type = 'title'
+
+            log = ModerationLog(
+                user_id=user_id,
+                post_id=post_id,
+                content_type=content_type,
+                original_content=f"标题: {title}\n内容: {content[:200]}...",
+                action=action,
+                violation_category=self.service._get_primary_violation_category(violations)
+            )
+            log.set_detected_words_list(violations)
+            logs.append(log)
+
+        if self.dry_run:
+            return
+
+        if changed_posts:
+            Post.objects.bulk_update(
+                changed_posts,
+                ['status', 'reject_reason', 'moderation_result', 'reviewed_time'],
+                batch_size=self.chunk_size
+            )
+            touch_posts([post.id for post in changed_posts], comments=True)
+        if logs:
+            ModerationLog.objects.bulk_create(logs, batch_size=self.chunk_size)
+            stats['logs'] += len(logs)
+
+    def _apply_comment_results(self, rows, results, stats):
+        from .models import Post, PostComment, ModerationLog
+
+        blocked_ids = []
+        blocked_post_ids = set()
+        logs = []
+
+        for comment_id, content, post_id, user_id in rows:
+            ((is_valid, violations),) = results[comment_id]
+            if is_valid:
+                continue
+
+            blocked_ids.append(comment_id)
+            blocked_post_ids.add(post_id)
+            log = ModerationLog(
+                user_id=user_id,
+                post_id=post_id,
+                content_type='content',
+                original_content=f"评论: {content[:200]}",
+                action='blocked',
+                violation_category=self.service._get_primary_violation_category(violations)
+            )
+            log.set_detected_words_list(violations)
+            logs.append(log)
+
+        stats['blocked'] += len(blocked_ids)
+
+        if self.dry_run:
+            return
+
+        if blocked_ids:
+            PostComment.objects.filter(id__in=blocked_ids).update(is_deleted=True)
+            Post.refresh_counters(blocked_post_ids)
+        if logs:
+            ModerationLog.objects.bulk_create(logs, batch_size=self.chunk_size)
+            stats['logs'] += len(logs)
@@ -0,0 +1,314 @@
+"""
+帖子全文检索
+使用SQLite FTS5虚拟表保存倒排索引（按词元存储压缩的posting list，查询时对各词元的posting list求交集）。
+
+写入索引前先把文本切成词元：
+- 连续的中日韩字符、连续的其他字母数字各为一段，每段切成相邻二元组（bigram），并在末尾补上
+  最后一个字符，例如“图书馆” -> 图书 书馆 馆，“hello” -> he el ll lo o；
+- 另外用词典（兴趣标签、学校名称和可选的词典文件）找出文本中的完整词语，写入单独的 words 列，
+  让整词命中的帖子在BM25排序中更靠前。
+
+查询时每个关键词被切成同样的词元并作为短语查询：关键词的任意子串在文本中对应一串相邻的词元，
+因此与原先的 icontains 一样是子串匹配（如 3 匹配 123，llo 匹配 hello）。唯一的区别是标点和空白
+不参与匹配：关键词中标点隔开的几段只要求在文本中依次相邻出现（如 a-b 也能匹配 a b）。
+标题高亮和正文摘要在Python中基于原文生成，只处理当前页的帖子。
+"""
+import html
+import re
+import threading
+import time
+from django.conf import settings
+from django.db import connection
+from .matchers import AhoCorasickAutomaton
+
+FTS_TABLE = 'forum_post_fts'
+FTS_COLUMNS = ('title', 'content', 'author', 'words')
+
+# 标题、正文、作者、词典词的BM25权重（前三项与原先按字段计分的 10/5/3 一致）
+BM25_WEIGHTS = (10.0, 5.0, 3.0, 8.0)
+
+# 正文摘要的长度（字符数）
+SNIPPET_LENGTH = 80
+
+# 索引表不存在时，隔多少秒重新检查一次（执行迁移或 rebuild_search_index 后无需重启进程）
+AVAILABILITY_RECHECK_INTERVAL = 60
+
+CJK_RANGES = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff'
+# 连续的中日韩字符，或连续的其他字母数字（unicode61 把下划线当作分隔符，这里也不收录）
+TOKEN_RUN_RE = re.compile(f'[{CJK_RANGES}]+|[^\\W_{CJK_RANGES}]+')
+# 词典词只收录由字母数字和汉字组成的词
+DICTIONARY_WORD_RE = re.compile(r'^\w{2,}$')
+
+
+def create_table_sql(table=FTS_TABLE):
+    return f'CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5({", ".join(FTS_COLUMNS)}, tokenize="unicode61")'
+
+
+def _run_tokens(run, is_last):
+    """
+    切分一段连续文本
+
+    切成bigram并补上最后一个字符；查询关键词末尾的一段不补最后一个字符，
+    以便匹配文本中更长的一段（如“图书”匹配“图书馆”，“hel”匹配“hello”）。
+    """
+    if len(run) == 1:
+        return [run]
+    tokens = [run[i:i + 2] for i in range(len(run) - 1)]
+    if not is_last:
+        tokens.append(run[-1])
+    return tokens
+
+
+def tokenize(text):
+    """把文本切成写入索引的词元序列"""
+    tokens = []
+    for match in TOKEN_RUN_RE.finditer(text or ''):
+        tokens.extend(_run_tokens(match.group(), is_last=False))
+    return tokens
+
+
+def build_match_query(keywords, dictionary=None):
+    """
+    把关键词转换为FTS5查询：每个关键词是一个短语（全部关键词都要匹配），
+    以单个字符的一段结尾的短语使用前缀匹配；关键词本身是词典词时同时匹配 words 列
+
+    Returns:
+        str: FTS5 MATCH 表达式，没有可检索的词元时返回空字符串
+    """
+    clauses = []
+    for keyword in keywords:
+        runs = TOKEN_RUN_RE.findall(keyword)
+        if not runs:
+            continue
+
+        tokens = []
+        for index, run in enumerate(runs):
+            tokens.extend(_run_tokens(run, is_last=index == len(runs) - 1))
+
+        last_run = runs[-1]
+        phrase = '"' + ' '.join(tokens) + '"'
+        if len(last_run) == 1:
+            phrase += '*'
+
+        if dictionary is not None and len(runs) == 1 and dictionary.contains(last_run):
+            phrase = f'({phrase} OR words : "{last_run}")'
+        clauses.append(phrase)
+    return ' AND '.join(clauses)
+
+
+class SearchDictionary:
+    """检索词典：用Aho-Corasick自动机找出文本中出现的全部词典词"""
+
+    def __init__(self, words):
+        self.words = {word.lower() for word in words if DICTIONARY_WORD_RE.match(word or '')}
+        self._automaton = AhoCorasickAutomaton()
+        for word in self.words:
+            self._automaton.add(word, word)
+        self._automaton.build()
+
+    def __len__(self):
+        return len(self.words)
+
+    def contains(self, word):
+        return word.lower() in self.words
+
+    def find_words(self, *texts):
+        found = set()
+        for text in texts:
+            if text:
+                found.update(self._automaton.find_all(text.lower()))
+        return sorted(found)
+
+
+def load_dictionary_words():
+    """词典来源：启用的兴趣标签、学校名称，以及 SEARCH_DICTIONARY_FILE 指定的词典文件（每行一个词）"""
+    from accounts.models import InterestTag, School
+
+    words = set(InterestTag.objects.filter(is_active=True).values_list('name', flat=True))
+    words.update(School.objects.values_list('name', flat=True))
+
+    path = getattr(settings, 'SEARCH_DICTIONARY_FILE', None)
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            words.update(line.strip() for line in f if line.strip())
+    return words
+
+
+def index_row(post_id, title, content, author, dictionary):
+    """生成写入FTS5表的一行：(rowid, title, content, author, words)"""
+    return (
+        post_id,
+        ' '.join(tokenize(title)),
+        ' '.join(tokenize(content)),
+        ' '.join(tokenize(author)),
+        ' '.join(dictionary.find_words(title, content, author))
+    )
+
+
+def _keyword_regex(keywords):
+    """匹配任一关键词的正则（长词优先），用于生成高亮"""
+    parts = sorted({k for k in keywords if k}, key=len, reverse=True)
+    if not parts:
+        return None
+    return re.compile('|'.join(re.escape(part) for part in parts), re.IGNORECASE)
+
+
+def highlight(text, keywords, length=None):
+    """
+    转义HTML并用 <mark> 标出关键词
+
+    Args:
+        length: 指定时截取第一个命中位置附近的一段作为摘要
+    """
+    text = text or ''
+    pattern = _keyword_regex(keywords)
+    first = pattern.search(text) if pattern else None
+
+    prefix = suffix = ''
+    if length and len(text) > length:
+        start = max(0, first.start() - length // 4) if first else 0
+        end = start + length
+        prefix = '…' if start > 0 else ''
+        suffix = '…' if end < len(text) else ''
+        text = text[start:end]
+
+    if pattern is None:
+        return prefix + html.escape(text) + suffix
+
+    parts = []
+    position = 0
+    for match in pattern.finditer(text):
+        parts.append(html.escape(text[position:match.start()]))
+        parts.append(f'<mark>{html.escape(match.group())}</mark>')
+        position = match.end()
+    parts.append(html.escape(text[position:]))
+    return prefix + ''.join(parts) + suffix
+
+
+class PostSearchIndex:
+    """基于FTS5的帖子检索索引（非SQLite数据库或索引表不存在时不可用）"""
+
+    def __init__(self, table=FTS_TABLE):
+        self.table = table
+        self._available = None
+        self._checked_at = 0.0
+        self._dictionary = None
+        self._dictionary_lock = threading.Lock()
+
+    def is_available(self):
+        """索引表存在后一直可用；不存在时每隔 AVAILABILITY_RECHECK_INTERVAL 秒重新检查"""
+        if self._available:
+            return True
+        now = time.monotonic()
+        if self._available is None or now - self._checked_at >= AVAILABILITY_RECHECK_INTERVAL:
+            self._available = (
+                connection.vendor == 'sqlite'
+                and self.table in connection.introspection.table_names()
+            )
+            self._checked_at = now
+        return self._available
+
+    def get_dictionary(self):
+        """进程内缓存的检索词典（重建索引时重新加载）"""
+        if self._dictionary is None:
+            with self._dictionary_lock:
+                if self._dictionary is None:
+                    self._dictionary = SearchDictionary(load_dictionary_words())
+        return self._dictionary
+
+    def _insert_sql(self):
+        return (
+            f'INSERT INTO {self.table}(rowid, {", ".join(FTS_COLUMNS)}) '
+            f'VALUES (%s, {", ".join(["%s"] * len(FTS_COLUMNS))})'
+        )
+
+    def index_post(self, post):
+        """新增或更新一个帖子的索引"""
+        if not self.is_available():
+            return
+        row = index_row(post.id, post.title, post.content, post.author, self.get_dictionary())
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [post.id])
+            cursor.execute(self._insert_sql(), row)
+
+    def remove_post(self, post_id):
+        if not self.is_available():
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [post_id])
+
+    def rebuild(self, chunk_size=1000):
+        """按主键分块重建全部索引（同时重新加载词典），返回索引的帖子数"""
+        from .models import Post
+
+        self._dictionary = None
+        dictionary = self.get_dictionary()
+        total = 0
+        last_id = 0
+        with connection.cursor() as cursor:
+            # 重建表而不是清空，分词方式或列变化后也能直接重建
+            cursor.execute(f'DROP TABLE IF EXISTS {self.table}')
+            cursor.execute(create_table_sql(self.table))
+            self._available = None
+            while True:
+                rows = list(
+                    Post.objects.filter(id__gt=last_id).order_by('id')
+                    .values_list('id', 'title', 'content', 'author')[:chunk_size]
+                )
+                if not rows:
+                    break
+                cursor.executemany(self._insert_sql(), [index_row(*row, dictionary) for row in rows])
+                total += len(rows)
+                last_id = rows[-1][0]
+            # 合并索引段，减小posting list的存储和查询开销
+            cursor.execute(f"INSERT INTO {self.table}({self.table}) VALUES ('optimize')")
+        return total
+
+    def search(self, school_id, keywords, offset=0, limit=10):
+        """
+        检索指定学校已通过审核的帖子
+
+        Returns:
+            tuple: (总数, [post_id, ...])，按BM25相关度和发布时间排序
+        """
+        from .models import Post
+
+        match = build_match_query(keywords, self.get_dictionary())
+        if not match:
+            return 0, []
+
+        post_table = Post._meta.db_table
+        where = (
+            f'{self.table} MATCH %s AND {post_table}.school_id = %s '
+            f"AND {post_table}.status = 'approved'"
+        )
+        params = [match, school_id]
+        weights = ', '.join(str(w) for w in BM25_WEIGHTS)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT {self.table}.rowid '
+                f'FROM {self.table} JOIN {post_table} ON {post_table}.id = {self.table}.rowid '
+                f'WHERE {where} '
+                f'ORDER BY bm25({self.table}, {weights}), {post_table}.time DESC '
+                f'LIMIT %s OFFSET %s',
+                params + [limit, offset]
+            )
+            post_ids = [row[0] for row in cursor.fetchall()]
+
+            # 总数单独统计（同样只查询索引），第一页不满一页时直接使用结果数
+            if not offset and len(post_ids) < limit:
+                total = len(post_ids)
+            else:
+                cursor.execute(
+                    f'SELECT COUNT(*) FROM {self.table} '
+                    f'JOIN {post_table} ON {post_table}.id = {self.table}.rowid WHERE {where}',
+                    params
+                )
+                total = cursor.fetchone()[0]
+
+        return total, post_ids
+
+
+# 全局帖子检索索引
+post_search_index = PostSearchIndex()
@@ -0,0 +1,207 @@
+"""
+帖子和评论列表批量序列化
+Post.to_dict / PostComment.to_dict 逐条查询标签、点赞状态、最新评论和回复，列表接口会产生大量查询。
+这里按页批量查询，每页的查询次数固定，输出与逐条调用 to_dict 一致。
+"""
+from django.db.models import Count, F, OuterRef, Prefetch, Q, Subquery, Window
+from django.db.models.functions import Coalesce, RowNumber
+from .models import PostComment, PostLike, PostTag
+
+# 每个帖子附带的最新评论数和每条评论附带的回复数（与 Post.to_dict / PostComment.to_dict 一致）
+RECENT_COMMENTS_LIMIT = 3
+RECENT_REPLIES_LIMIT = 5
+
+
+def post_list_queryset(queryset):
+    """为帖子列表查询添加标签预取（需在分页切片之前调用）"""
+    return queryset.prefetch_related(
+        Prefetch('post_tags', queryset=PostTag.objects.select_related('interest_tag'))
+    )
+
+
+def serialize_posts(posts, user=None):
+    """
+    批量序列化一页帖子
+
+    Args:
+        posts: 经过 post_list_queryset 处理的帖子查询集（或其切片）
+        user: 当前用户，用于判断是否已点赞
+
+    Returns:
+        list: 与 [post.to_dict(user=user) for post in posts] 相同的数据
+    """
+    posts = list(posts)
+    if not posts:
+        return []
+
+    post_ids = [post.id for post in posts]
+
+    # 当前用户点赞过的帖子（每页一次查询）
+    liked_ids = set()
+    if user:
+        liked_ids = set(
+            PostLike.objects.filter(user=user, post_id__in=post_ids).order_by().values_list('post_id', flat=True)
+        )
+
+    comments = list(_top_comments('post_id', post_ids, RECENT_COMMENTS_LIMIT))
+    replies = list(_top_comments('parent_id', [c.id for c in comments], RECENT_REPLIES_LIMIT)) if comments else []
+
+    return _post_dicts(posts, liked_ids, _recent_comments(comments, replies))
+
+
+def _post_dicts(posts, liked_ids, recent_comments):
+    return [
+        {
+            'id': post.id,
+            'school_id': post.school_id,
+            'title': post.title,
+            'author': post.author,
+            'content': post.content,
+            'time': post.time.strftime('%Y-%m-%d %H:%M'),
+            'status': post.status,
+            'status_display': post.get_status_display(),
+            'tags': [tag.to_dict() for tag in post.post_tags.all()],
+            'likes_count': post.likes_count,
+            'comments_count': post.comments_count,
+            'user_liked': post.id in liked_ids,
+            'recent_comments': recent_comments.get(post.id, [])
+        }
+        for post in posts
+    ]
+
+
+def load_comment_page(page_queryset, replies_limit=RECENT_REPLIES_LIMIT):
+    """
+    一次查询加载一页顶级评论和每条评论最新的 replies_limit 条回复
+
+    顶级评论与它的回复按 COALESCE(parent_id, id) 分到同一个窗口分区，分区内顶级评论排在第一位，
+    行号不超过 replies_limit + 1 的行就是顶级评论和它最新的回复。窗口查询作为 id IN 子查询，
+    外层只对选出的行聚合回复数。
+
+    Args:
+        page_queryset: 已排序、已切片但未执行的顶级评论查询集（按 -created_at, -id 排序）
+        replies_limit: 每条评论附带的回复数
+
+    Returns:
+        list: 按页内顺序排列的顶级评论，每条带有 recent_replies 属性
+    """
+    return _attach_replies(list(_comment_page_rows(page_queryset, replies_limit)))
+
+
+def _comment_page_rows(page_queryset, replies_limit):
+    page_ids = page_queryset.values('id')
+    windowed_ids = (
+        PostComment.objects.filter(Q(id__in=page_ids) | Q(parent_id__in=page_ids), is_deleted=False)
+        .annotate(
+            row_number=Window(
+                expression=RowNumber(),
+                partition_by=Coalesce(F('parent_id'), F('id')),
+                order_by=[F('parent_id').asc(nulls_first=True), F('created_at').desc(), F('id').desc()]
+            )
+        )
+        .filter(row_number__lte=replies_limit + 1)
+        .values('id')
+    )
+    return _with_replies_total(windowed_ids)
+
+
+def _attach_replies(rows):
+    comments = [row for row in rows if row.parent_id is None]
+    replies_by_parent = {}
+    for row in rows:
+        if row.parent_id is not None:
+            replies_by_parent.setdefault(row.parent_id, []).append(row)
+    for comment in comments:
+        comment.recent_replies = replies_by_parent.get(comment.id, [])
+    return comments
+
+
+def serialize_comments(comments, user=None):
+    """
+    序列化 load_comment_page 加载的一页顶级评论
+
+    Returns:
+        list: 与 get_post_comments 中逐条调用 comment.to_dict(include_replies=True)
+              并设置 is_author 得到的数据相同
+    """
+    user_id = getattr(user, 'id', None)
+    result = []
+    for comment in comments:
+        data = _comment_dict(comment)
+        data['is_author'] = user_id is not None and comment.user_id == user_id
+        data['replies'] = []
+        for reply in comment.recent_replies:
+            reply_data = _comment_dict(reply)
+            reply_data['is_author'] = user_id is not None and reply.user_id == user_id
+            data['replies'].append(reply_data)
+        result.append(data)
+    return result
+
+
+def _with_replies_total(ids):
+    """
+    按ID子查询加载评论并附带回复数
+
+    回复数是相关子查询，放在窗口查询的外层，只对窗口筛选后留下的行执行
+    （窗口函数的筛选条件由Django包装成外层查询，同一层的注解会对筛选前的所有行计算）。
+    """
+    return (
+        PostComment.objects.filter(id__in=ids)
+        .annotate(replies_total=_replies_total())
+        .select_related('user')
+        .order_by('-created_at', '-id')
+    )
+
+
+def _replies_total():
+    """未删除回复数的子查询（聚合），用于 annotate"""
+    replies = PostComment.objects.filter(parent=OuterRef('pk'), is_deleted=False).order_by().values(
+        'parent'
+    ).annotate(total=Count('id')).values('total')
+    return Coalesce(Subquery(replies), 0)
+
+
+def _top_comments(parent_field, parent_ids, limit):
+    """按 parent_field 分组，取每组最新的 limit 条未删除评论及其回复数（窗口函数，一次查询，未执行）"""
+    windowed_ids = (
+        PostComment.objects.filter(**{f'{parent_field}__in': parent_ids}, is_deleted=False)
+        .annotate(
+            row_number=Window(
+                expression=RowNumber(),
+                partition_by=F(parent_field),
+                order_by=[F('created_at').desc(), F('id').desc()]
+            )
+        )
+        .filter(row_number__lte=limit)
+        .values('id')
+    )
+    return _with_replies_total(windowed_ids)
+
+
+def _recent_comments(comments, replies):
+    """由每个帖子的最新评论和它们的最新回复生成 {post_id: [comment_dict, ...]}"""
+    replies_by_parent = {}
+    for reply in replies:
+        replies_by_parent.setdefault(reply.parent_id, []).append(_comment_dict(reply))
+
+    result = {}
+    for comment in comments:
+        data = _comment_dict(comment)
+        data['replies'] = replies_by_parent.get(comment.id, [])
+        result.setdefault(comment.post_id, []).append(data)
+    return result
+
+
+def _comment_dict(comment):
+    """与 PostComment.to_dict(include_replies=False) 相同的数据（回复数来自 replies_total 注解）"""
+    return {
+        'id': comment.id,
+        'user_id': comment.user_id,
+        'username': comment.user.username,
+        'content': comment.content,
+        'created_at': comment.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'updated_at': comment.updated_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'is_author': False,
+        'parent_id': comment.parent_id,
+        'replies_count': comment.replies_total
+    }
@@ -0,0 +1,37 @@
+"""
+论坛模型信号处理
+帖子保存或删除时同步全文检索索引，使缓存的帖子详情页失效，并递增读接口ETag使用的版本号
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from accounts.models import School
+from .http_cache import bump, schools_scope, touch_post, touch_posts
+from .models import Post, PostTag
+from .post_pages import post_page_renderer
+from .search import post_search_index
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    post_search_index.index_post(instance)
+    post_page_renderer.invalidate(instance.id)
+    touch_post(instance.id, instance.school_id, comments=True)
+
+
+@receiver(post_delete, sender=Post)
+def remove_post_index(sender, instance, **kwargs):
+    post_search_index.remove_post(instance.id)
+    post_page_renderer.invalidate(instance.id)
+    touch_post(instance.id, instance.school_id, comments=True)
+
+
+@receiver(post_save, sender=PostTag)
+@receiver(post_delete, sender=PostTag)
+def touch_tagged_post(sender, instance, **kwargs):
+    touch_posts([instance.post_id])
+
+
+@receiver(post_save, sender=School)
+@receiver(post_delete, sender=School)
+def touch_schools(sender, instance, **kwargs):
+    bump(schools_scope())
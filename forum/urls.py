@@ -9,9 +9,12 @@ urlpatterns = [
     path('posts/create/', views.create_post, name='create_post'),
     path('posts/user/', views.get_user_posts, name='get_user_posts'),
     path('posts/<int:post_id>/', views.get_post_detail, name='get_post_detail'),
+    path('posts/<int:post_id>/bundle/', views.get_post_bundle, name='get_post_bundle'),
     path('posts/<int:post_id>/review/', views.review_post, name='review_post'),
     path('posts/pending/', views.get_pending_posts, name='get_pending_posts'),
     path('posts/generate-html/', views.generate_post_html, name='generate_post_html'),
+    path('moderation/log-stats/', views.get_moderation_log_stats, name='get_moderation_log_stats'),
+    path('moderation/latency-stats/', views.get_moderation_latency_stats, name='get_moderation_latency_stats'),
     
     # 点赞相关API路由
     path('posts/<int:post_id>/like/', views.toggle_post_like, name='toggle_post_like'),
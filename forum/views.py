@@ -1,29 +1,59 @@
 from django.shortcuts import render
-from django.http import JsonResponse, HttpResponse, Http404
+from django.http import JsonResponse, HttpResponse, Http404, StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
 from .models import Post
+from .serializers import load_comment_page, post_list_queryset, serialize_comments, serialize_posts
+from .search import post_search_index, highlight, SNIPPET_LENGTH
+from .post_pages import post_page_renderer, page_etag, page_last_modified
+from .http_cache import (
+    comments_scope, conditional_read, get_versions, make_etag, post_scope, school_scope, schools_scope,
+    touch_post, touch_posts
+)
+from Arx.pagination import (
+    InvalidCursor, cursor_for, cursor_paginate, cursor_pagination_info, cursor_queryset, page_from_items,
+    wants_cursor, wants_total
+)
 from accounts.models import School, User
 from accounts.decorators import login_required, admin_required
 from django.views.decorators.csrf import csrf_exempt
-from django.db.models import Q, Case, When, IntegerField, Count
+from django.db import transaction
+from django.db.models import Q, Case, When, IntegerField, Count, F
+from django.db.models.functions import Greatest
 import json
-import os
 import math
 import time
-from django.conf import settings
+from calendar import timegm
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 
 # Create your views here.
 
+# 帖子列表的排序（id 保证顺序唯一，游标分页依赖这一点）
+POST_LIST_ORDERING = ('-time', '-id')
+COMMENT_LIST_ORDERING = ('-created_at', '-id')
+
+# 管理员导出帖子时每次从数据库读取的数量
+EXPORT_CHUNK_SIZE = 500
+
 # 获取指定学校的所有帖子
 def get_posts(request):
-    """获取指定学校的帖子（仅展示已审核通过的）"""
+    """获取指定学校的帖子（仅展示已审核通过的），学校帖子版本号未变化时返回304"""
     school_id = request.GET.get('school_id')
     if not school_id:
         return JsonResponse({"error": "需要提供school_id参数"}, status=400)
     
     try:
         school_id = int(school_id)
-        
+    except ValueError:
+        return JsonResponse({"error": "无效的学校ID"}, status=400)
+    
+    etag = make_etag(request, *get_versions(school_scope(school_id)))
+    return conditional_read(request, etag, lambda: _get_posts(request, school_id))
+
+
+def _get_posts(request, school_id):
+    try:
         # 获取分页参数
         page = int(request.GET.get('page', 1))
         page_size = int(request.GET.get('page_size', 10))
@@ -34,32 +64,50 @@ def get_posts(request):
         if page_size < 1 or page_size > 100:  # 限制最大每页数量
             page_size = 10
         
+        posts_query = Post.objects.filter(school_id=school_id, status='approved')
+        
+        # 获取当前登录用户（如果有的话）
+        current_user = getattr(request, 'user', None) if hasattr(request, 'user') else None
+        
+        # 游标分页：按 (time, id) 从上一页末尾继续，不使用OFFSET，默认不统计总数
+        if wants_cursor(request):
+            cursor_page = cursor_paginate(
+                post_list_queryset(posts_query), POST_LIST_ORDERING,
+                cursor=request.GET.get('cursor'), page_size=page_size
+            )
+            total_posts = posts_query.count() if wants_total(request) else None
+            return JsonResponse({
+                'posts': serialize_posts(cursor_page.items, user=current_user),
+                'pagination': cursor_pagination_info(cursor_page, page_size, total_posts)
+            })
+        
         # 计算偏移量
         offset = (page - 1) * page_size
         
         # 查询帖子总数
-        total_posts = Post.objects.filter(school_id=school_id, status='approved').count()
+        total_posts = posts_query.count()
         
         # 查询当前页的帖子
-        posts = Post.objects.filter(school_id=school_id, status='approved').order_by('-time')[offset:offset + page_size]
-        
-        # 获取当前登录用户（如果有的话）
-        current_user = getattr(request, 'user', None) if hasattr(request, 'user') else None
+        posts = list(post_list_queryset(posts_query.order_by(*POST_LIST_ORDERING))[offset:offset + page_size])
+        has_next = page < math.ceil(total_posts / page_size) if total_posts > 0 else False
         
         # 构造响应数据
         data = {
-            'posts': [post.to_dict(user=current_user) for post in posts],
+            'posts': serialize_posts(posts, user=current_user),
             'pagination': {
                 'page': page,
                 'page_size': page_size,
                 'total': total_posts,
                 'total_pages': math.ceil(total_posts / page_size) if total_posts > 0 else 1,
-                'has_next': page < math.ceil(total_posts / page_size) if total_posts > 0 else False,
-                'has_prev': page > 1
+                'has_next': has_next,
+                'has_prev': page > 1,
+                'next_cursor': cursor_for(posts[-1], POST_LIST_ORDERING) if has_next and posts else None
             }
         }
         
         return JsonResponse(data, safe=False)
+    except InvalidCursor as e:
+        return JsonResponse({"error": str(e)}, status=400)
     except (ValueError, School.DoesNotExist):
         return JsonResponse({"error": "无效的学校ID"}, status=400)
 
@@ -96,56 +144,21 @@ def search_posts(request):
         # 处理搜索关键词（支持多关键词）
         keywords = [keyword.strip() for keyword in query.split() if keyword.strip()]
         
-        # 构建搜索查询
-        search_query = Q()
-        
-        # 为每个关键词构建查询条件
-        for keyword in keywords:
-            keyword_query = (
-                Q(title__icontains=keyword) |
-                Q(content__icontains=keyword) |
-                Q(author__icontains=keyword)
-            )
-            search_query &= keyword_query  # AND逻辑：所有关键词都必须匹配
-        
-        # 基础查询：限制学校和状态
-        base_query = Post.objects.filter(
-            school_id=school_id,
-            status='approved'
-        )
-        
-        # 添加搜索条件
-        posts_query = base_query.filter(search_query)
-        
-        # 计算相关性评分并排序
-        posts_query = posts_query.annotate(
-            relevance_score=Case(
-                # 标题匹配得分最高
-                *[When(title__icontains=keyword, then=10) for keyword in keywords],
-                # 内容匹配得分中等
-                *[When(content__icontains=keyword, then=5) for keyword in keywords],
-                # 作者匹配得分较低
-                *[When(author__icontains=keyword, then=3) for keyword in keywords],
-                default=0,
-                output_field=IntegerField()
-            )
-        ).order_by('-relevance_score', '-time')
-        
-        # 获取总数
-        total_posts = posts_query.count()
-        
-        # 获取当前页的帖子
-        posts = posts_query[offset:offset + page_size]
-        
         # 获取当前登录用户
         current_user = getattr(request, 'user', None) if hasattr(request, 'user') else None
         
+        # 优先使用全文检索索引，不可用时退回逐行模糊查询
+        if post_search_index.is_available():
+            total_posts, posts_data = _search_posts_by_index(school_id, keywords, offset, page_size, current_user)
+        else:
+            total_posts, posts_data = _search_posts_by_scan(school_id, keywords, offset, page_size, current_user)
+        
         # 计算搜索用时
         search_time = time.time() - start_time
         
         # 构造响应数据
         data = {
-            'posts': [post.to_dict(user=current_user) for post in posts],
+            'posts': posts_data,
             'pagination': {
                 'page': page,
                 'page_size': page_size,
@@ -170,26 +183,147 @@ def search_posts(request):
     except Exception as e:
         return JsonResponse({"error": f"搜索失败: {str(e)}"}, status=500)
 
+def _search_posts_by_index(school_id, keywords, offset, page_size, current_user):
+    """使用FTS5索引检索，按BM25排序并附带高亮标题和正文摘要"""
+    total_posts, post_ids = post_search_index.search(school_id, keywords, offset, page_size)
+    
+    posts_by_id = {post.id: post for post in post_list_queryset(Post.objects.filter(id__in=post_ids))}
+    posts = [posts_by_id[post_id] for post_id in post_ids if post_id in posts_by_id]
+    posts_data = serialize_posts(posts, user=current_user)
+    
+    for post, post_data in zip(posts, posts_data):
+        post_data['highlight'] = {
+            'title': highlight(post.title, keywords),
+            'content': highlight(post.content, keywords, length=SNIPPET_LENGTH)
+        }
+    return total_posts, posts_data
+
+def _search_posts_by_scan(school_id, keywords, offset, page_size, current_user):
+    """逐行模糊查询（没有全文检索索引的数据库使用）"""
+    # 构建搜索查询
+    search_query = Q()
+    
+    # 为每个关键词构建查询条件
+    for keyword in keywords:
+        keyword_query = (
+            Q(title__icontains=keyword) |
+            Q(content__icontains=keyword) |
+            Q(author__icontains=keyword)
+        )
+        search_query &= keyword_query  # AND逻辑：所有关键词都必须匹配
+    
+    # 基础查询：限制学校和状态
+    base_query = Post.objects.filter(
+        school_id=school_id,
+        status='approved'
+    )
+    
+    # 添加搜索条件
+    posts_query = base_query.filter(search_query)
+    
+    # 计算相关性评分并排序
+    posts_query = posts_query.annotate(
+        relevance_score=Case(
+            # 标题匹配得分最高
+            *[When(title__icontains=keyword, then=10) for keyword in keywords],
+            # 内容匹配得分中等
+            *[When(content__icontains=keyword, then=5) for keyword in keywords],
+            # 作者匹配得分较低
+            *[When(author__icontains=keyword, then=3) for keyword in keywords],
+            default=0,
+            output_field=IntegerField()
+        )
+    ).order_by('-relevance_score', '-time')
+    
+    # 获取总数
+    total_posts = posts_query.count()
+    
+    # 获取当前页的帖子
+    posts = post_list_queryset(posts_query)[offset:offset + page_size]
+    
+    return total_posts, serialize_posts(posts, user=current_user)
+
 # 管理员获取待审核帖子
 @csrf_exempt
 @admin_required
 def get_pending_posts(request):
-    """获取所有待审核的帖子"""
+    """
+    获取待审核（或指定状态）的帖子
+
+    不带参数时与原先一样返回全部帖子的列表；带 cursor 参数时按 (time, id) 游标分页
+    （cursor 为空时从最新的帖子开始）；format=ndjson 时以NDJSON流的形式导出全部符合条件的帖子（每行一个帖子）
+    """
     status = request.GET.get('status', 'pending')
     if status not in ['pending', 'approved', 'rejected', 'all']:
         status = 'pending'
     
     try:
         if status == 'all':
-            posts = Post.objects.all().order_by('-time')
+            posts = Post.objects.all()
         else:
-            posts = Post.objects.filter(status=status).order_by('-time')
+            posts = Post.objects.filter(status=status)
         current_user = getattr(request, 'user', None) if hasattr(request, 'user') else None
-        data = [post.to_dict(user=current_user) for post in posts]
-        return JsonResponse(data, safe=False)
+        
+        if request.GET.get('format') == 'ndjson':
+            response = StreamingHttpResponse(
+                _export_posts_ndjson(posts, current_user, EXPORT_CHUNK_SIZE),
+                content_type='application/x-ndjson; charset=utf-8'
+            )
+            response['Content-Disposition'] = f'attachment; filename="posts_{status}.ndjson"'
+            return response
+        
+        if not wants_cursor(request):
+            posts = post_list_queryset(posts.order_by(*POST_LIST_ORDERING))
+            return JsonResponse(serialize_posts(posts, user=current_user), safe=False)
+        
+        page_size = int(request.GET.get('page_size', 20))
+        if page_size < 1 or page_size > 100:
+            page_size = 20
+        
+        cursor_page = cursor_paginate(
+            post_list_queryset(posts), POST_LIST_ORDERING,
+            cursor=request.GET.get('cursor'), page_size=page_size
+        )
+        total = posts.count() if wants_total(request) else None
+        return JsonResponse({
+            'posts': serialize_posts(cursor_page.items, user=current_user),
+            'pagination': cursor_pagination_info(cursor_page, page_size, total)
+        })
+    except InvalidCursor as e:
+        return JsonResponse({"error": str(e)}, status=400)
     except Exception as e:
         return JsonResponse({"error": f"获取帖子失败: {str(e)}"}, status=500)
 
+
+def _export_posts_ndjson(posts, user, chunk_size=EXPORT_CHUNK_SIZE):
+    """按游标分块读取并批量序列化帖子，逐行输出JSON（内存占用只与块大小有关）"""
+    cursor = None
+    while True:
+        cursor_page = cursor_paginate(post_list_queryset(posts), POST_LIST_ORDERING, cursor=cursor, page_size=chunk_size)
+        lines = [
+            json.dumps(post, ensure_ascii=False, cls=DjangoJSONEncoder)
+            for post in serialize_posts(cursor_page.items, user=user)
+        ]
+        if lines:
+            yield '\n'.join(lines) + '\n'
+        if not cursor_page.has_next:
+            break
+        cursor = cursor_page.next_cursor
+
+# 管理员查看审核日志写入队列状态
+@admin_required
+def get_moderation_log_stats(request):
+    """获取审核日志异步写入器的队列深度和丢弃计数"""
+    from .log_writer import moderation_log_writer
+    return JsonResponse(moderation_log_writer.stats())
+
+# 管理员查看内容审核耗时分布
+@admin_required
+def get_moderation_latency_stats(request):
+    """获取各内容类型（标题、正文、评论、聊天）的审核耗时直方图和p50/p99"""
+    from .moderation import moderation_service
+    return JsonResponse(moderation_service.latency_stats())
+
 # 管理员审核帖子
 @csrf_exempt
 @admin_required
@@ -215,10 +349,6 @@ def review_post(request, post_id):
             post.reject_reason = reject_reason
             
         post.save()
-        
-        # 如果审核通过，生成HTML页面
-        if status == 'approved':
-            create_post_html(post)
             
         current_user = getattr(request, 'user', None) if hasattr(request, 'user') else None
         return JsonResponse({
@@ -234,27 +364,39 @@ def review_post(request, post_id):
         return JsonResponse({"error": f"审核失败: {str(e)}"}, status=500)
 
 def get_schools(request):
-    """获取所有学校信息"""
+    """获取所有学校信息，学校列表版本号未变化时返回304"""
+    etag = make_etag(request, *get_versions(schools_scope()))
+    return conditional_read(request, etag, lambda: _get_schools(request))
+
+
+def _get_schools(request):
     schools = School.objects.all()
     data = [school.to_dict() for school in schools]
     return JsonResponse(data, safe=False)
 
 # 获取帖子详情
 def get_post_detail(request, post_id):
-    """获取帖子详情"""
+    """获取帖子详情，帖子版本号未变化时返回304"""
+    etag = make_etag(request, *get_versions(post_scope(post_id)))
+    return conditional_read(request, etag, lambda: _get_post_detail(request, post_id))
+
+
+def _get_post_detail(request, post_id):
     try:
-        post = Post.objects.get(id=post_id)
+        post = post_list_queryset(Post.objects.filter(id=post_id)).get()
         
         # 检查帖子状态和用户权限
         is_staff = hasattr(request, 'user') and request.user and getattr(request.user, 'is_staff', False)
-        is_author = hasattr(request, 'user') and request.user and request.user.id and post.user and post.user.id == request.user.id
+        is_author = hasattr(request, 'user') and request.user and request.user.id and post.user_id == request.user.id
         
         # 如果帖子未审核通过且当前用户不是管理员或帖子作者，则不允许查看
         if post.status != 'approved' and not (is_staff or is_author):
             return JsonResponse({"error": "该帖子尚未审核通过"}, status=403)
         
         current_user = getattr(request, 'user', None) if hasattr(request, 'user') else None
-        return JsonResponse(post.to_dict(user=current_user))
+        # 与帖子列表共用批量序列化（评论、回复和回复数用窗口函数一次查询，不逐条查询）
+        (post_data,) = serialize_posts([post], user=current_user)
+        return JsonResponse(post_data)
     except Post.DoesNotExist:
         return JsonResponse({"error": "帖子不存在"}, status=404)
 
@@ -309,9 +451,6 @@ def create_post(request):
             moderation_result='auto_approved'  # 记录审核结果
         )
         
-        # 如果帖子审核通过，生成HTML页面
-        create_post_html(post)
-        
         return JsonResponse({
             "success": True,
             "message": "发布成功！帖子已通过自动审核",
@@ -346,8 +485,8 @@ def generate_post_html(request):
         except Post.DoesNotExist:
             return JsonResponse({"error": "指定的帖子不存在"}, status=400)
         
-        # 创建帖子详情页
-        create_post_html(post)
+        # 预先渲染帖子详情页（放入缓存）
+        post_page_renderer.render(post)
         
         return JsonResponse({
             "success": True,
@@ -360,9 +499,7 @@ def generate_post_html(request):
         return JsonResponse({"error": f"生成帖子详情页失败: {str(e)}"}, status=500)
 
 def serve_post_html(request, post_id):
-    """提供帖子HTML页面"""
-    html_file_path = os.path.join(settings.BASE_DIR, 'htmls', f'post_{post_id}.html')
-    
+    """提供帖子HTML页面（由缓存的模板渲染，支持 If-None-Match / If-Modified-Since 条件请求）"""
     try:
         post = Post.objects.get(id=post_id)
         # 检查帖子状态和用户权限
@@ -373,550 +510,25 @@ def serve_post_html(request, post_id):
         if post.status != 'approved' and not (is_staff or is_author):
             return HttpResponse("该帖子尚未审核通过", status=403)
             
-        if not os.path.exists(html_file_path):
-            # 如果帖子已审核通过，则生成HTML
-            if post.status == 'approved':
-                create_post_html(post)
-                if not os.path.exists(html_file_path):
-                    raise Http404("帖子页面生成失败")
-            else:
-                raise Http404("帖子未审核通过，无法查看")
+        if post.status != 'approved':
+            raise Http404("帖子未审核通过，无法查看")
     except Post.DoesNotExist:
         raise Http404("帖子不存在")
     
-    # 读取文件内容
-    with open(html_file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
-    
-    return HttpResponse(content, content_type='text/html')
-
-def create_post_html(post):
-    """创建帖子HTML页面"""
-    # 只为已审核通过的帖子创建HTML文件
-    if post.status != 'approved':
-        return None
-        
-    # 确保htmls目录存在
-    html_dir = os.path.join(settings.BASE_DIR, 'htmls')
-    if not os.path.exists(html_dir):
-        os.makedirs(html_dir)
-    
-    # 创建帖子详情页HTML文件路径
-    html_file_path = os.path.join(html_dir, f'post_{post.id}.html')
-    
-    # 读取帖子模板（如果没有则创建一个基本模板）
-    template_path = os.path.join(settings.BASE_DIR, 'htmls', 'post_template.html')
-    if os.path.exists(template_path):
-        with open(template_path, 'r', encoding='utf-8') as file:
-            template_content = file.read()
-    else:
-        # 基本模板
-        template_content = """
-<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{{title}} - 校园论坛</title>
-    <!-- 引入Vue.js和Axios -->
-    <script src="https://cdn.jsdelivr.net/npm/vue@2.6.14/dist/vue.js"></script>
-    <script src="https://cdn.jsdelivr.net/npm/axios/dist/axios.min.js"></script>
-    <!-- 引入Element UI -->
-    <link rel="stylesheet" href="https://unpkg.com/element-ui/lib/theme-chalk/index.css">
-    <script src="https://unpkg.com/element-ui/lib/index.js"></script>
-    <style>
-        body {
-            margin: 0;
-            padding: 0;
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Helvetica, Arial, sans-serif;
-            background-color: #f5f5f5;
-            color: #333;
-        }
-        
-        .container {
-            max-width: 800px;
-            margin: 0 auto;
-            padding: 20px;
-        }
-        
-        .post-header {
-            background-color: white;
-            border-radius: 8px;
-            padding: 20px;
-            margin-bottom: 20px;
-            box-shadow: 0 1px 3px rgba(0,0,0,0.1);
-        }
-        
-        .post-title {
-            font-size: 24px;
-            font-weight: bold;
-            margin-bottom: 15px;
-        }
-        
-        .post-meta {
-            display: flex;
-            justify-content: space-between;
-            font-size: 14px;
-            color: #999;
-            margin-bottom: 10px;
-        }
-        
-        .post-content {
-            background-color: white;
-            border-radius: 8px;
-            padding: 20px;
-            box-shadow: 0 1px 3px rgba(0,0,0,0.1);
-            line-height: 1.6;
-            white-space: pre-wrap;
-            margin-bottom: 20px;
-        }
-        
-        .interaction-section {
-            background-color: white;
-            border-radius: 8px;
-            padding: 20px;
-            margin-bottom: 20px;
-            box-shadow: 0 1px 3px rgba(0,0,0,0.1);
-        }
-        
-        .post-actions {
-            display: flex;
-            align-items: center;
-            padding: 15px 0;
-            border-bottom: 1px solid #eee;
-            margin-bottom: 20px;
-        }
-        
-        .action-group {
-            display: flex;
-            align-items: center;
-            gap: 20px;
-        }
-        
-        .action-btn {
-            display: flex;
-            align-items: center;
-            gap: 5px;
-            padding: 8px 12px;
-            border: none;
-            background: #f5f5f5;
-            border-radius: 4px;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            font-size: 14px;
-        }
-        
-        .action-btn:hover {
-            background: #e6e6e6;
-        }
-        
-        .action-btn.liked {
-            background: #f39c12;
-            color: white;
-        }
-        
-        .action-btn.liked:hover {
-            background: #e67e22;
-        }
-        
-        .comments-section {
-            margin-top: 20px;
-        }
-        
-        .comment-form {
-            margin-bottom: 20px;
-        }
-        
-        .comment-item {
-            background: #f9f9f9;
-            border: 1px solid #eee;
-            border-radius: 8px;
-            padding: 15px;
-            margin-bottom: 10px;
-        }
-        
-        .comment-header {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            margin-bottom: 10px;
-        }
-        
-        .comment-author {
-            font-weight: bold;
-            color: #409EFF;
-        }
-        
-        .comment-time {
-            color: #999;
-            font-size: 12px;
-        }
-        
-        .comment-content {
-            line-height: 1.5;
-            color: #333;
-        }
-        
-        .comment-reply {
-            margin-left: 20px;
-            margin-top: 10px;
-            border-left: 3px solid #409EFF;
-            padding-left: 15px;
-        }
-        
-        .login-tip {
-            text-align: center;
-            padding: 20px;
-            background: #f0f9ff;
-            border-radius: 8px;
-            margin-bottom: 20px;
-            color: #666;
-        }
-        
-        .login-tip a {
-            color: #409EFF;
-            text-decoration: none;
-        }
-        
-        .login-tip a:hover {
-            text-decoration: underline;
-        }
-        
-        .back-button {
-            margin-top: 20px;
-            text-align: center;
-        }
-        
-        .back-link {
-            display: inline-block;
-            padding: 10px 20px;
-            background-color: #409EFF;
-            color: white;
-            border-radius: 4px;
-            text-decoration: none;
-            font-weight: bold;
-        }
-        
-        .back-link:hover {
-            background-color: #66b1ff;
-        }
-    </style>
-</head>
-<body>
-    <div id="app" class="container">
-        <div class="post-header">
-            <div class="post-title">{{title}}</div>
-            <div class="post-meta">
-                <span>作者: {{author}}</span>
-                <span>发布时间: {{time}}</span>
-            </div>
-        </div>
-        <div class="post-content">
-            {{content}}
-        </div>
-        
-        <!-- 交互功能区域 -->
-        <div class="interaction-section">
-            <!-- 点赞和评论操作 -->
-            <div class="post-actions">
-                <div class="action-group">
-                    <button 
-                        v-if="isLoggedIn"
-                        class="action-btn" 
-                        :class="{ liked: post.user_liked }"
-                        @click="toggleLike"
-                        :disabled="likeLoading">
-                        <i class="el-icon-star-off" v-if="!post.user_liked"></i>
-                        <i class="el-icon-star-on" v-else></i>
-                        <span>{{ post.user_liked ? '已点赞' : '点赞' }} ({{ post.likes_count || 0 }})</span>
-                    </button>
-                    <div v-else class="action-btn">
-                        <i class="el-icon-star-off"></i>
-                        <span>点赞 ({{ post.likes_count || 0 }})</span>
-                    </div>
-                    
-                    <div class="action-btn">
-                        <i class="el-icon-chat-line-round"></i>
-                        <span>评论 ({{ comments.length }})</span>
-                    </div>
-                </div>
-            </div>
-            
-            <!-- 评论区域 -->
-            <div class="comments-section">
-                <h4 style="margin-bottom: 15px;">评论区</h4>
-                
-                <!-- 登录提示 -->
-                <div v-if="!isLoggedIn" class="login-tip">
-                    <p>请先<a href="/accounts/">登录</a>后再进行评论和点赞</p>
-                </div>
-                
-                <!-- 评论表单 -->
-                <div v-if="isLoggedIn" class="comment-form">
-                    <el-input
-                        type="textarea"
-                        v-model="newComment.content"
-                        placeholder="写下你的评论..."
-                        :rows="3"
-                        maxlength="500"
-                        show-word-limit>
-                    </el-input>
-                    <div style="margin-top: 10px; text-align: right;">
-                        <el-button 
-                            type="primary" 
-                            size="small" 
-                            @click="addComment"
-                            :loading="commentLoading"
-                            :disabled="!newComment.content.trim()">
-                            发表评论
-                        </el-button>
-                    </div>
-                </div>
-                
-                <!-- 评论列表 -->
-                <div v-if="comments.length > 0">
-                    <div v-for="comment in comments" :key="comment.id" class="comment-item">
-                        <div class="comment-header">
-                            <span class="comment-author">{{ comment.username }}</span>
-                            <span class="comment-time">{{ comment.created_at }}</span>
-                        </div>
-                        <div class="comment-content">{{ comment.content }}</div>
-                        
-                        <!-- 回复 -->
-                        <div v-if="comment.replies && comment.replies.length > 0">
-                            <div v-for="reply in comment.replies" :key="reply.id" class="comment-reply">
-                                <div class="comment-header">
-                                    <span class="comment-author">{{ reply.username }}</span>
-                                    <span class="comment-time">{{ reply.created_at }}</span>
-                                </div>
-                                <div class="comment-content">{{ reply.content }}</div>
-                            </div>
-                        </div>
-                    </div>
-                </div>
-                
-                <div v-else-if="!commentsLoading" style="text-align: center; color: #999; padding: 20px;">
-                    暂无评论，快来发表第一条评论吧！
-                </div>
-                
-                <div v-if="commentsLoading" style="text-align: center; padding: 20px;">
-                    <i class="el-icon-loading"></i> 加载评论中...
-                </div>
-            </div>
-        </div>
-        
-        <div class="back-button">
-            <button @click="goBack" class="back-link">返回上页</button>
-        </div>
-    </div>
-
-    <script>
-        new Vue({
-            el: '#app',
-            data: {
-                postId: {{post_id}},
-                post: {
-                    id: {{post_id}},
-                    title: '{{title}}',
-                    author: '{{author}}',
-                    content: '{{content}}',
-                    time: '{{time}}',
-                    likes_count: 0,
-                    user_liked: false
-                },
-                comments: [],
-                newComment: {
-                    content: '',
-                    parent_id: null
-                },
-                isLoggedIn: false,
-                currentUser: null,
-                likeLoading: false,
-                commentLoading: false,
-                commentsLoading: false
-            },
-            mounted() {
-                this.checkLoginStatus();
-                this.loadPostInteractions();
-                this.loadComments();
-            },
-            methods: {
-                checkLoginStatus() {
-                    // 检查用户登录状态
-                    const user = localStorage.getItem('user');
-                    if (user) {
-                        try {
-                            this.currentUser = JSON.parse(user);
-                            this.isLoggedIn = true;
-                        } catch (e) {
-                            console.error('解析用户信息失败:', e);
-                            localStorage.removeItem('user');
-                        }
-                    }
-                },
-                
-                loadPostInteractions() {
-                    // 加载帖子点赞状态
-                    if (this.isLoggedIn) {
-                        axios.get(`/forum/posts/${this.postId}/like-status/`)
-                            .then(response => {
-                                this.post.likes_count = response.data.likes_count;
-                                this.post.user_liked = response.data.user_liked;
-                            })
-                            .catch(error => {
-                                console.error('加载点赞状态失败:', error);
-                            });
-                    } else {
-                        // 未登录用户只获取点赞数
-                        axios.get(`/forum/posts/${this.postId}/`)
-                            .then(response => {
-                                this.post.likes_count = response.data.likes_count || 0;
-                                this.post.user_liked = false;
-                            })
-                            .catch(error => {
-                                console.error('加载帖子信息失败:', error);
-                            });
-                    }
-                },
-                
-                loadComments() {
-                    this.commentsLoading = true;
-                    axios.get(`/forum/posts/${this.postId}/comments/`)
-                        .then(response => {
-                            this.comments = response.data.comments || [];
-                            this.commentsLoading = false;
-                        })
-                        .catch(error => {
-                            console.error('加载评论失败:', error);
-                            this.commentsLoading = false;
-                            this.$message.error('加载评论失败');
-                        });
-                },
-                
-                toggleLike() {
-                    if (!this.isLoggedIn) {
-                        this.$message.warning('请先登录');
-                        return;
-                    }
-                    
-                    this.likeLoading = true;
-                    
-                    axios.post(`/forum/posts/${this.postId}/like/`)
-                        .then(response => {
-                            if (response.data.success) {
-                                this.post.user_liked = response.data.user_liked;
-                                this.post.likes_count = response.data.likes_count;
-                                this.$message.success(response.data.message);
-                            }
-                            this.likeLoading = false;
-                        })
-                        .catch(error => {
-                            console.error('点赞操作失败:', error);
-                            this.$message.error('操作失败，请重试');
-                            this.likeLoading = false;
-                        });
-                },
-                
-                addComment() {
-                    if (!this.isLoggedIn) {
-                        this.$message.warning('请先登录');
-                        return;
-                    }
-                    
-                    if (!this.newComment.content.trim()) {
-                        this.$message.warning('请输入评论内容');
-                        return;
-                    }
-                    
-                    this.commentLoading = true;
-                    
-                    const commentData = {
-                        content: this.newComment.content.trim(),
-                        parent_id: this.newComment.parent_id
-                    };
-                    
-                    axios.post(`/forum/posts/${this.postId}/comments/create/`, commentData)
-                        .then(response => {
-                            if (response.data.success) {
-                                this.$message.success('评论发表成功');
-                                this.newComment.content = '';
-                                this.newComment.parent_id = null;
-                                this.loadComments(); // 重新加载评论列表
-                            }
-                            this.commentLoading = false;
-                        })
-                        .catch(error => {
-                            console.error('发表评论失败:', error);
-                            const errorMsg = error.response?.data?.error || '发表评论失败';
-                            this.$message.error(errorMsg);
-                            this.commentLoading = false;
-                        });
-                },
-                
-                goBack() {
-                    // 智能返回功能
-                    try {
-                        // 检查是否有可用的历史记录
-                        if (window.history.length > 1 && document.referrer) {
-                            // 检查来源是否为本站
-                            const referrer = new URL(document.referrer);
-                            const currentHost = window.location.host;
-                            
-                            if (referrer.host === currentHost) {
-                                // 来源是本站，使用history.back()
-                                window.history.back();
-                                return;
-                            }
-                        }
-                        
-                        // Fallback：跳转到论坛tab
-                        this.goToForumTab();
-                        
-                    } catch (error) {
-                        console.error('返回操作失败:', error);
-                        // 出错时的fallback
-                        this.goToForumTab();
-                    }
-                },
-                
-                goToForumTab() {
-                    // 跳转到论坛tab的方法
-                    const url = '/accounts/';
-                    
-                    // 检查用户上次使用的tab，优先返回到论坛，其次是用户上次的tab
-                    const lastTab = localStorage.getItem('lastActiveTab');
-                    const targetTab = 'forum'; // 默认返回论坛，因为用户是从帖子详情返回的
-                    
-                    // 使用localStorage来标记要显示的tab
-                    localStorage.setItem('activeTab', targetTab);
-                    window.location.href = url;
-                }
-            }
-        });
-    </script>
-</body>
-</html>
-        """
-    
-    # 替换模板中的变量
-    html_content = template_content.replace('{{title}}', post.title)
-    html_content = html_content.replace('{{author}}', post.author)
-    html_content = html_content.replace('{{time}}', post.time.strftime('%Y-%m-%d %H:%M'))
-    html_content = html_content.replace('{{post_id}}', str(post.id))
-    
-    # 替换内容时保留换行，但保持原有格式
-    html_content = html_content.replace('{{content}}', post.content)
-    
-    try:
-        # 写入HTML文件
-        with open(html_file_path, 'w', encoding='utf-8') as file:
-            file.write(html_content)
-        
-        print(f"成功生成帖子HTML文件: {html_file_path}")
-    except Exception as e:
-        print(f"生成帖子HTML文件失败: {str(e)}")
+    template = post_page_renderer.get_template()
+    etag = page_etag(post, template)
+    last_modified = timegm(page_last_modified(post).utctimetuple())
     
-    return html_file_path
+    # 浏览器缓存的页面仍然有效时直接返回304，不渲染页面
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        content, etag = post_page_renderer.render(post)
+        response = HttpResponse(content, content_type='text/html')
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # 帖子审核状态和内容可能变化，每次使用前都要向服务器确认
+    response['Cache-Control'] = 'no-cache'
+    return response
 
 # 获取用户自己的帖子
 @csrf_exempt
@@ -938,29 +550,47 @@ def get_user_posts(request):
         if page_size < 1 or page_size > 100:  # 限制最大每页数量
             page_size = 10
         
+        posts_query = Post.objects.filter(user=request.user)
+        
+        # 游标分页
+        if wants_cursor(request):
+            cursor_page = cursor_paginate(
+                post_list_queryset(posts_query), POST_LIST_ORDERING,
+                cursor=request.GET.get('cursor'), page_size=page_size
+            )
+            total_posts = posts_query.count() if wants_total(request) else None
+            return JsonResponse({
+                'posts': serialize_posts(cursor_page.items, user=request.user),
+                'pagination': cursor_pagination_info(cursor_page, page_size, total_posts)
+            })
+        
         # 计算偏移量
         offset = (page - 1) * page_size
         
         # 查询帖子总数
-        total_posts = Post.objects.filter(user=request.user).count()
+        total_posts = posts_query.count()
         
         # 查询当前页的帖子
-        posts = Post.objects.filter(user=request.user).order_by('-time')[offset:offset + page_size]
+        posts = list(post_list_queryset(posts_query.order_by(*POST_LIST_ORDERING))[offset:offset + page_size])
+        has_next = page < math.ceil(total_posts / page_size) if total_posts > 0 else False
         
         # 构造响应数据
         data = {
-            'posts': [post.to_dict(user=request.user) for post in posts],
+            'posts': serialize_posts(posts, user=request.user),
             'pagination': {
                 'page': page,
                 'page_size': page_size,
                 'total': total_posts,
                 'total_pages': math.ceil(total_posts / page_size) if total_posts > 0 else 1,
-                'has_next': page < math.ceil(total_posts / page_size) if total_posts > 0 else False,
-                'has_prev': page > 1
+                'has_next': has_next,
+                'has_prev': page > 1,
+                'next_cursor': cursor_for(posts[-1], POST_LIST_ORDERING) if has_next and posts else None
             }
         }
         
         return JsonResponse(data, safe=False)
+    except InvalidCursor as e:
+        return JsonResponse({"error": str(e)}, status=400)
     except Exception as e:
         return JsonResponse({"error": f"获取帖子失败: {str(e)}"}, status=500)
 
@@ -979,25 +609,34 @@ def toggle_post_like(request, post_id):
         post = Post.objects.get(id=post_id, status='approved')
         user = request.user
         
-        # 检查是否已经点赞
-        like, created = PostLike.objects.get_or_create(
-            post=post,
-            user=user,
-            defaults={'created_at': timezone.now()}
-        )
-        
-        if not created:
-            # 如果已存在，则取消点赞
-            like.delete()
-            action = 'unliked'
-            message = '取消点赞成功'
-        else:
-            # 如果不存在，则点赞
-            action = 'liked'
-            message = '点赞成功'
+        with transaction.atomic():
+            # 检查是否已经点赞
+            like, created = PostLike.objects.get_or_create(
+                post=post,
+                user=user,
+                defaults={'created_at': timezone.now()}
+            )
+            
+            if not created:
+                # 如果已存在，则取消点赞（并发取消时只有真正删除了记录的请求才减少计数；
+                # 计数可能因其他途径的修改而偏小，减到0为止）
+                deleted, _ = PostLike.objects.filter(id=like.id).delete()
+                delta = -deleted
+                action = 'unliked'
+                message = '取消点赞成功'
+            else:
+                # 如果不存在，则点赞
+                delta = 1
+                action = 'liked'
+                message = '点赞成功'
+            
+            if delta:
+                Post.objects.filter(id=post.id).update(likes_count=Greatest(F('likes_count') + delta, 0))
+        touch_post(post.id, post.school_id)
         
         # 获取最新的点赞数
-        likes_count = post.likes.count()
+        post.refresh_from_db(fields=['likes_count'])
+        likes_count = post.likes_count
         
         return JsonResponse({
             "success": True,
@@ -1015,7 +654,12 @@ def toggle_post_like(request, post_id):
 
 @csrf_exempt
 def get_post_likes(request, post_id):
-    """获取帖子的点赞用户列表"""
+    """获取帖子的点赞用户列表，帖子版本号未变化时返回304"""
+    etag = make_etag(request, *get_versions(post_scope(post_id)))
+    return conditional_read(request, etag, lambda: _get_post_likes(request, post_id))
+
+
+def _get_post_likes(request, post_id):
     try:
         from .models import Post, PostLike
         
@@ -1034,7 +678,7 @@ def get_post_likes(request, post_id):
         likes_page = likes[start:end]
         
         data = {
-            'total': likes.count(),
+            'total': post.likes_count,
             'page': page,
             'page_size': page_size,
             'likes': [like.to_dict() for like in likes_page]
@@ -1059,7 +703,7 @@ def get_post_like_status(request, post_id):
         user = request.user
         
         user_liked = PostLike.objects.filter(post=post, user=user).exists()
-        likes_count = post.likes.count()
+        likes_count = post.likes_count
         
         return JsonResponse({
             "user_liked": user_liked,
@@ -1107,7 +751,7 @@ def create_post_comment(request, post_id):
         
         # 🎯 新增：内容审核检测
         from .moderation import moderation_service
-        is_valid, violations_list = moderation_service.check_text(content)
+        is_valid, violations_list = moderation_service.check_text(content, 'comment')
         
         if not is_valid:
             # 生成错误信息
@@ -1119,13 +763,17 @@ def create_post_comment(request, post_id):
                 "violation_details": violations_list
             }, status=400)
         
-        # 创建评论
-        comment = PostComment.objects.create(
-            post=post,
-            user=user,
-            parent=parent,
-            content=content
-        )
+        # 创建评论并更新帖子的评论数
+        with transaction.atomic():
+            comment = PostComment.objects.create(
+                post=post,
+                user=user,
+                parent=parent,
+                content=content
+            )
+            Post.objects.filter(id=post.id).update(comments_count=F('comments_count') + 1)
+        touch_post(post.id, post.school_id, comments=True)
+        post.refresh_from_db(fields=['comments_count'])
         
         # 返回评论数据
         comment_data = comment.to_dict(include_replies=False)
@@ -1135,7 +783,7 @@ def create_post_comment(request, post_id):
             "success": True,
             "message": "评论发表成功",
             "comment": comment_data,
-            "comments_count": post.comments.filter(is_deleted=False).count()
+            "comments_count": post.comments_count
         })
         
     except Post.DoesNotExist:
@@ -1148,62 +796,103 @@ def create_post_comment(request, post_id):
 
 @csrf_exempt
 def get_post_comments(request, post_id):
-    """获取帖子的评论列表"""
+    """获取帖子的评论列表，评论区版本号未变化时返回304"""
+    etag = make_etag(request, *get_versions(comments_scope(post_id)))
+    return conditional_read(request, etag, lambda: _get_post_comments(request, post_id))
+
+
+def _get_post_comments(request, post_id):
     try:
-        from .models import Post, PostComment
-        
         post = Post.objects.get(id=post_id, status='approved')
         
-        # 分页参数
-        page = int(request.GET.get('page', 1))
-        page_size = int(request.GET.get('page_size', 10))
-        
-        # 获取顶级评论（没有父评论的评论）
-        comments = PostComment.objects.filter(
-            post=post, 
-            parent=None, 
-            is_deleted=False
-        ).order_by('-created_at')
-        
-        # 分页
-        start = (page - 1) * page_size
-        end = start + page_size
-        comments_page = comments[start:end]
-        
         # 获取当前用户
         current_user = getattr(request, 'user', None) if hasattr(request, 'user') else None
         
-        # 转换为字典格式
-        comments_data = []
-        for comment in comments_page:
-            comment_dict = comment.to_dict(include_replies=True)
-            # 设置是否为当前用户的评论
-            comment_dict['is_author'] = (current_user and 
-                                       hasattr(current_user, 'id') and 
-                                       current_user.id == comment.user.id)
-            # 设置回复的作者标识
-            if 'replies' in comment_dict:
-                for reply in comment_dict['replies']:
-                    reply['is_author'] = (current_user and 
-                                        hasattr(current_user, 'id') and 
-                                        current_user.id == reply.get('user_id'))
-            comments_data.append(comment_dict)
-        
-        data = {
-            'total': comments.count(),
-            'page': page,
-            'page_size': page_size,
-            'comments': comments_data
-        }
-        
-        return JsonResponse(data)
+        return JsonResponse(_comment_page_data(request, post, current_user))
         
     except Post.DoesNotExist:
         return JsonResponse({"error": "帖子不存在或未审核通过"}, status=404)
+    except InvalidCursor as e:
+        return JsonResponse({"error": str(e)}, status=400)
     except Exception as e:
         return JsonResponse({"error": f"获取评论列表失败: {str(e)}"}, status=500)
 
 
+def _comment_page_data(request, post, current_user):
+    """一页顶级评论及其最新回复（get_post_comments 和 get_post_bundle 共用）"""
+    from .models import PostComment
+    
+    # 分页参数
+    page = int(request.GET.get('page', 1))
+    page_size = int(request.GET.get('page_size', 10))
+    
+    # 获取顶级评论（没有父评论的评论）
+    comments = PostComment.objects.filter(
+        post=post, 
+        parent=None, 
+        is_deleted=False
+    )
+    
+    # 分页：带 cursor 参数时按 (created_at, id) 游标分页，否则按页码；多取一条判断是否还有下一页
+    if wants_cursor(request):
+        page_queryset = cursor_queryset(comments, COMMENT_LIST_ORDERING, request.GET.get('cursor'))[:page_size + 1]
+    else:
+        start = (page - 1) * page_size
+        page_queryset = comments.order_by(*COMMENT_LIST_ORDERING)[start:start + page_size + 1]
+    
+    # 一次查询加载这一页的顶级评论、最新回复和回复数
+    comment_page = page_from_items(load_comment_page(page_queryset), COMMENT_LIST_ORDERING, page_size)
+    
+    # 序列化评论和回复，并标记当前用户的评论
+    data = {
+        'page_size': page_size,
+        'comments': serialize_comments(comment_page.items, user=current_user),
+        'next_cursor': comment_page.next_cursor,
+        'has_next': comment_page.has_next
+    }
+    if wants_cursor(request):
+        if wants_total(request):
+            data['total'] = comments.count()
+    else:
+        data['total'] = comments.count()
+        data['page'] = page
+    return data
+
+
+@csrf_exempt
+def get_post_bundle(request, post_id):
+    """
+    帖子详情页加载所需的全部数据：帖子详情、当前用户的点赞状态和第一页评论
+
+    合并了 /forum/posts/<id>/、/like-status/ 和 /comments/ 三个请求，
+    帖子只查询一次，点赞状态复用详情中的数据。支持与评论列表相同的分页参数。
+    """
+    etag = make_etag(request, *get_versions(post_scope(post_id), comments_scope(post_id)))
+    return conditional_read(request, etag, lambda: _get_post_bundle(request, post_id))
+
+
+def _get_post_bundle(request, post_id):
+    try:
+        post = post_list_queryset(Post.objects.filter(id=post_id, status='approved')).get()
+        current_user = getattr(request, 'user', None) if hasattr(request, 'user') else None
+        
+        (post_data,) = serialize_posts([post], user=current_user)
+        return JsonResponse({
+            'post': post_data,
+            'like_status': {
+                'user_liked': post_data['user_liked'],
+                'likes_count': post_data['likes_count']
+            },
+            'comments': _comment_page_data(request, post, current_user)
+        })
+    except Post.DoesNotExist:
+        return JsonResponse({"error": "帖子不存在或未审核通过"}, status=404)
+    except InvalidCursor as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({"error": f"获取帖子失败: {str(e)}"}, status=500)
+
+
 @csrf_exempt
 @login_required
 def update_comment(request, comment_id):
@@ -1232,7 +921,7 @@ def update_comment(request, comment_id):
         
         # 🎯 内容审核检测
         from .moderation import moderation_service
-        is_valid, violations_list = moderation_service.check_text(content)
+        is_valid, violations_list = moderation_service.check_text(content, 'comment')
         
         if not is_valid:
             # 生成错误信息
@@ -1247,6 +936,7 @@ def update_comment(request, comment_id):
         # 更新评论
         comment.content = content
         comment.save()
+        touch_posts([comment.post_id], comments=True)
         
         # 返回更新后的评论数据
         comment_data = comment.to_dict(include_replies=False)
@@ -1286,13 +976,17 @@ def delete_comment(request, comment_id):
         if not (is_author or is_admin):
             return JsonResponse({"error": "没有权限删除此评论"}, status=403)
         
-        # 软删除评论
-        comment.is_deleted = True
-        comment.save()
+        # 软删除评论并更新帖子的评论数（并发删除时只计一次；计数已偏小时减到0为止）
+        with transaction.atomic():
+            deleted = PostComment.objects.filter(id=comment.id, is_deleted=False).update(
+                is_deleted=True,
+                updated_at=timezone.now()
+            )
+            if deleted:
+                Post.objects.filter(id=comment.post_id).update(comments_count=Greatest(F('comments_count') - 1, 0))
+        touch_posts([comment.post_id], comments=True)
         
-        # 更新帖子的评论数
-        post = comment.post
-        comments_count = post.comments.filter(is_deleted=False).count()
+        comments_count = Post.objects.values_list('comments_count', flat=True).get(id=comment.post_id)
         
         return JsonResponse({
             "success": True,